@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+API micro-benchmarks for the hot JSON endpoints at growing data volumes.
+
+Each scale boots server.py in a fresh subprocess (MQTT_TRANSPORT=local,
+scratch user DB and event log), seeds it, then drives the Flask test client
+in-process, so no socket or WSGI server sits between the timer and the view.
+For a scale of N records it seeds:
+  - realtime_data: N bookings, N/4 operator events (1 in 50 still pending),
+    N/2 feedback entries and N/100 nearby tools
+  - new_tools: the same N/100 tools, about 20 per owner
+  - users_db: N/10 renters plus the operator and owner accounts
+
+Per-user fan-out stays constant as N grows (about 10 bookings per renter,
+125 jobs per operator, 20 tools per owner), so an endpoint whose latency
+climbs with N is scanning more than its own user's records.
+
+Every endpoint is called `--repeat` times (at least 5, at most `--budget`
+seconds), then once more under tracemalloc. The report has p50/p95/p99 and
+mean latency, response size, and the peak and retained Python allocations
+of one call.
+
+    python benchmarks/api_bench.py                                  # 1k, 100k and 1M
+    python benchmarks/api_bench.py --scales 1k,100k --json api.json
+    python benchmarks/api_bench.py --scales 100k --baseline api_base.json --save-baseline
+    python benchmarks/api_bench.py --scales 100k --baseline api_base.json --threshold 0.2
+
+With --baseline, p50 latency and peak allocations are compared per scale and
+endpoint; anything worse than the baseline by more than --threshold (and by
+more than the --min-delta-* noise floors) is listed and the exit status is 1.
+"""
+
+import argparse, json, os, platform, random, subprocess, sys, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD     = "bench-password"
+RENTER_ID    = "R0000001"
+OPERATOR     = "Operator 0001"
+OWNER        = "Owner 0001"
+TOOL_TYPES   = ["Drill", "CNC Laser Cutter", "Plasma Cutter", "Mini Excavator", "Lathe", "Floor Sanders"]
+HOME         = (17.385044, 78.486671)
+MIN_SAMPLES  = 5
+
+# name -> (session role, method, path); a None role sends no session
+ENDPOINTS = {
+    "nearby_tools":         ("renter",   "GET",  "/api/renter/nearby-tools"),
+    "nearby_tools_radius":  ("renter",   "GET",  f"/api/renter/nearby-tools?lat={HOME[0]}&lng={HOME[1]}&radius_km=10"),
+    "nearby_tools_page":    ("renter",   "GET",  "/api/renter/nearby-tools?limit=50&fields=tool_type,availability,rating"),
+    "renter_bookings":      ("renter",   "GET",  "/api/renter/bookings"),
+    "renter_feedback":      ("renter",   "GET",  "/api/renter/feedback"),
+    "operator_requests":    ("operator", "GET",  "/api/operator/requests"),
+    "operator_requests_page": ("operator", "GET", "/api/operator/requests?limit=50&fields=tool_name,location_name"),
+    "operator_assignments": ("operator", "GET",  "/api/operator/assignments"),
+    "operator_earnings":    ("operator", "GET",  "/api/operator/earnings"),
+    "owner_tools":          ("owner",    "GET",  "/api/owner/tools"),
+    "owner_revenue":        ("owner",    "GET",  "/api/owner/revenue?days=30"),
+    "login":                (None,       "POST", "/login"),
+}
+
+
+def parse_scale(text):
+    text = text.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+def scale_label(n):
+    return f"{n // 1_000_000}M" if n >= 1_000_000 and n % 1_000_000 == 0 else \
+           f"{n // 1_000}k" if n >= 1_000 and n % 1_000 == 0 else str(n)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples_ms):
+    return {f"p{p}": round(percentile(samples_ms, p), 3) if samples_ms else None for p in (50, 95, 99)}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 🌱 Seed data: N-record collections with constant per-user fan-out
+# ──────────────────────────────────────────────────────────────────────────────
+def seed(server, n, rng):
+    tools_count = max(10, n // 100)
+    renters = [f"R{i:07d}" for i in range(1, max(1, n // 10) + 1)]
+    operators = [f"Operator {i:04d}" for i in range(1, max(1, n // 500) + 1)]
+    owners = [f"Owner {i:04d}" for i in range(1, max(1, tools_count // 20) + 1)]
+    now = datetime.now()
+
+    tools = []
+    for i in range(tools_count):
+        lat, lng = HOME[0] + rng.uniform(-0.3, 0.3), HOME[1] + rng.uniform(-0.3, 0.3)
+        tool_type = TOOL_TYPES[i % len(TOOL_TYPES)]
+        tools.append({"toolid": f"T{11 + i:03d}", "tool_type": tool_type, "tool_name": f"{tool_type} #{i}",
+                      "latitude": lat, "longitude": lng, "geo_center_lat": lat, "geo_center_lng": lng,
+                      "geo_radius_m": 5000.0, "temperature_c": 30.0, "voltage_v": 230.0, "vibration_hz": 40.0,
+                      "sensor_active": True, "ts_iso": now.isoformat(), "availability": "AVAILABLE",
+                      "added_by": owners[i % len(owners)], "added_at": now.isoformat()})
+
+    bookings, operator_events, feedback = [], [], []
+    for i in range(n):
+        tool = tools[rng.randrange(tools_count)]
+        start = now - timedelta(days=rng.uniform(0, 60))
+        end = start + timedelta(hours=rng.choice((2, 4, 8, 24, 48)))
+        booking = {"booking_id": f"BK{i:08d}", "toolid": tool["toolid"], "renter_id": renters[i % len(renters)],
+                   "booked_iso": (start - timedelta(days=1)).isoformat(), "rental_start_iso": start.isoformat(),
+                   "rental_end_iso": end.isoformat(), "operator_requested": i % 4 == 0,
+                   "payment_status": "SUCCESS", "cancel_status": "NONE",
+                   "amount_inr": float(rng.randrange(500, 5000)), "currency": "INR"}
+        bookings.append(booking)
+        if i % 4 == 0:
+            expected = start + timedelta(minutes=30)
+            late = rng.random() < 0.2
+            event = {"booking_id": booking["booking_id"], "toolid": tool["toolid"], "renter_id": booking["renter_id"],
+                     "operator_requested": True, "operator_name": operators[(i // 4) % len(operators)],
+                     "operator_assigned_iso": booking["booked_iso"], "expected_arrival_iso": expected.isoformat(),
+                     "arrival_iso": (expected + timedelta(minutes=25 if late else 0)).isoformat(),
+                     "arrival_status": "LATE" if late else "ON_TIME", "late_mins_operator": 25 if late else 0,
+                     "compensation_to_renter_inr": 200 if late else 0,
+                     "latitude": tool["latitude"], "longitude": tool["longitude"]}
+            if i % 200 == 0:
+                event.update(arrival_iso=None, arrival_status=None, late_mins_operator=0,
+                             compensation_to_renter_inr=0)
+            operator_events.append(event)
+        if i % 2 == 1:
+            feedback.append({"rentalid": booking["booking_id"], "toolid": tool["toolid"],
+                             "renterid": booking["renter_id"], "rating": float(rng.randint(1, 5)),
+                             "feedback": "ok", "returnediso": end.isoformat(), "damageflag": False,
+                             "tsiso": end.isoformat()})
+
+    # Seeding is setup, not the system under test: skip journaling a multi-GB replace entry
+    collections = [*server.realtime_data.values(), server.new_tools]
+    journals = [c.journal for c in collections]
+    for collection in collections:
+        collection.attach_journal(None)
+    server.new_tools.replace_all(tools)
+    server.realtime_data["nearby_tools"].replace_all(tools)
+    server.realtime_data["bookings"].replace_all(bookings)
+    server.realtime_data["operator_events"].replace_all(operator_events)
+    server.realtime_data["feedback"].replace_all(feedback)
+    for collection, journal in zip(collections, journals):
+        collection.attach_journal(journal)
+
+    # One real hash for everyone; per-account hashing would dominate the seed time
+    password_hash = server.password_hasher.hash(PASSWORD)
+    accounts = [(rid, f"{rid.lower()}@bench.example", f"Renter {rid}", "renter") for rid in renters]
+    accounts += [(f"O{i:07d}", f"operator{i}@bench.example", name, "operator") for i, name in enumerate(operators, 1)]
+    accounts += [(f"W{i:07d}", f"owner{i}@bench.example", name, "owner") for i, name in enumerate(owners, 1)]
+    for user_id, email, name, role in accounts:
+        server.users_db.create({"id": user_id, "email": email, "name": name, "phone": "0", "role": role,
+                                "password_hash": password_hash, "rating": 4.5, "created_at": now.isoformat()})
+
+    return {"bookings": len(bookings), "operator_events": len(operator_events), "feedback": len(feedback),
+            "tools": tools_count, "users": len(accounts)}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ⏱️ Measurement: latency over repeated calls, allocations of one traced call
+# ──────────────────────────────────────────────────────────────────────────────
+def measure(call, repeat, budget):
+    response = call()  # warm-up: first-call imports and lazily built caches
+    samples, size = [], len(response.get_data())
+    deadline = time.perf_counter() + budget
+    while len(samples) < repeat and (len(samples) < MIN_SAMPLES or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        call().get_data()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = call()
+    kept.get_data()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"status": response.status_code, "n": len(samples), **summarize(samples),
+            "mean": round(sum(samples) / len(samples), 3), "bytes": size,
+            "alloc_peak_kb": round((peak - base) / 1024, 1), "alloc_retained_kb": round((current - base) / 1024, 1)}
+
+
+def run_once(n, names, repeat, budget, seed_value):
+    os.chdir(ROOT_DIR)
+    sys.path.insert(0, ROOT_DIR)
+    import server
+
+    started = time.perf_counter()
+    seeded = seed(server, n, random.Random(seed_value))
+    seeded["seconds"] = round(time.perf_counter() - started, 2)
+
+    sessions = {
+        "renter":   {"id": RENTER_ID, "name": f"Renter {RENTER_ID}", "role": "renter"},
+        "operator": {"id": "O0000001", "name": OPERATOR, "role": "operator"},
+        "owner":    {"id": "W0000001", "name": OWNER, "role": "owner"},
+    }
+    clients = {None: server.app.test_client()}
+    for role, user in sessions.items():
+        clients[role] = server.app.test_client()
+        with clients[role].session_transaction() as session:
+            session["user"] = {**user, "email": "", "phone": "0", "rating": 4.5}
+    login = {"email": f"{RENTER_ID.lower()}@bench.example", "password": PASSWORD}
+
+    results = {}
+    for name in names:
+        role, method, path = ENDPOINTS[name]
+        client = clients[role]
+        call = (lambda c=client, p=path: c.post(p, json=login)) if method == "POST" else \
+               (lambda c=client, p=path: c.get(p))
+        results[name] = measure(call, repeat, budget)
+    return {"scale": n, "seeded": seeded, "endpoints": results}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 📉 Baseline comparison
+# ──────────────────────────────────────────────────────────────────────────────
+def compare(report, baseline, threshold, min_delta_ms, min_delta_kb):
+    regressions = []
+    for label, current in report["scales"].items():
+        previous = baseline.get("scales", {}).get(label)
+        if previous is None:
+            continue
+        for name, now in current["endpoints"].items():
+            before = previous["endpoints"].get(name)
+            if before is None:
+                continue
+            for metric, floor in (("p50", min_delta_ms), ("alloc_peak_kb", min_delta_kb)):
+                old, new = before.get(metric), now.get(metric)
+                if old is None or new is None:
+                    continue
+                if new > old * (1 + threshold) and new - old > floor:
+                    regressions.append((label, name, metric, old, new))
+    return regressions
+
+
+def print_report(report):
+    print(f"{'scale':>6} {'endpoint':<22} {'status':>6} {'n':>4} {'p50 ms':>9} {'p95':>9} {'p99':>9} "
+          f"{'bytes':>10} {'peak KB':>9} {'kept KB':>8}")
+    for label, scale in report["scales"].items():
+        for name, r in scale["endpoints"].items():
+            print(f"{label:>6} {name:<22} {r['status']:>6} {r['n']:>4} {r['p50']:>9} {r['p95']:>9} {r['p99']:>9} "
+                  f"{r['bytes']:>10} {r['alloc_peak_kb']:>9} {r['alloc_retained_kb']:>8}")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 📊 Driver: one subprocess per scale, then the table and the baseline check
+# ──────────────────────────────────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1k,100k,1M", help="comma-separated record counts (k/M suffixes)")
+    parser.add_argument("--only", help=f"comma-separated endpoints out of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--repeat", type=int, default=50, help="timed calls per endpoint")
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds per endpoint before --repeat is cut short")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", metavar="PATH", help="also write the results here")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against (or with --save-baseline, write) this file")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown, 0.25 = +25%%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="p50 changes below this are noise")
+    parser.add_argument("--min-delta-kb", type=float, default=64.0, help="peak allocation changes below this are noise")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(",")] if args.only else list(ENDPOINTS)
+    unknown = [name for name in names if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(unknown)}")
+    if args.save_baseline and not args.baseline:
+        parser.error("--save-baseline needs --baseline PATH")
+
+    if args.run:
+        print(json.dumps(run_once(parse_scale(args.scales), names, args.repeat, args.budget, args.seed)))
+        return
+
+    report = {"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+              "machine": platform.machine(), "cpus": os.cpu_count(), "repeat": args.repeat, "scales": {}}
+    for n in map(parse_scale, args.scales.split(",")):
+        print(f"⏳ Seeding and measuring {scale_label(n)} records...", flush=True)
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ,
+                       MQTT_TRANSPORT="local",
+                       PASSWORD_HASH_WORKERS="0",
+                       USER_DB_PATH=os.path.join(scratch, "users.db"),
+                       EVENT_LOG_DIR=os.path.join(scratch, "eventlog"))
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", "--scales", str(n),
+                                  "--only", ",".join(names), "--repeat", str(args.repeat),
+                                  "--budget", str(args.budget), "--seed", str(args.seed)],
+                                 env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        report["scales"][scale_label(n)] = result
+        print(f"   seeded {result['seeded']}")
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        return
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold, args.min_delta_ms, args.min_delta_kb)
+    if not regressions:
+        print(f"✅ No regressions beyond +{args.threshold:.0%} against {args.baseline}")
+        return
+    print(f"❌ {len(regressions)} regression(s) beyond +{args.threshold:.0%} against {args.baseline}:")
+    for label, name, metric, old, new in regressions:
+        print(f"   {label:>6} {name:<22} {metric:<14} {old} → {new} ({(new - old) / old:+.0%})")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+End-to-end telemetry latency, publish → ingest → SSE, entirely offline.
+
+Each rate boots server.py in a fresh subprocess with MQTT_TRANSPORT=local,
+so its MQTT ingest loop subscribes to the in-process broker instead of IoT
+Core, behind a threaded WSGI server. Then:
+  - `--clients` connections read /stream/<role>
+  - a LocalTransport publishes telemetry at `--rate` msgs/sec for
+    `--duration` seconds, each payload carrying a sequence number whose
+    publish time is recorded
+  - a listener on realtime_data['tool_status'] records when each message
+    lands in the store, and every SSE reader when it is emitted to it
+
+and reports p50/p95/p99 publish→ingest and publish→SSE latency, sustained
+throughput at the SSE clients and what was lost on the way.
+
+    python benchmarks/e2e_latency.py                          # 100, 1000 and 5000 msgs/s
+    python benchmarks/e2e_latency.py --rates 2000 --clients 8 --duration 20 --json e2e.json
+"""
+
+import argparse, http.client, json, os, subprocess, sys, tempfile, threading, time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOPIC = "tools/telemetry"
+TOOL_IDS = [f"T{n:03d}" for n in range(1, 11)]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples_ms):
+    return {f"p{p}": round(percentile(samples_ms, p), 2) if samples_ms else None for p in (50, 95, 99)}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 📡 SSE reader: one /stream/<role> connection, arrival time per sequence number
+# ──────────────────────────────────────────────────────────────────────────────
+def read_stream(port, role, arrivals, stop):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    conn.request("GET", f"/stream/{role}")
+    response = conn.getresponse()
+    while not stop.is_set():
+        line = response.readline()
+        if not line:
+            break
+        if not line.startswith(b"data: "):
+            continue
+        received = time.perf_counter()
+        event = json.loads(line[6:])
+        seq = event.get("data", {}).get("bench_seq") if event.get("type") == "tool_status" else None
+        if seq is not None:
+            arrivals[seq] = received
+    conn.close()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 🏃 One rate, inside its own process
+# ──────────────────────────────────────────────────────────────────────────────
+def run_once(rate, duration, clients, role, drain):
+    os.chdir(ROOT_DIR)
+    sys.path.insert(0, ROOT_DIR)
+    import server
+    from main import TokenBucket
+    from transport import LocalTransport
+    from werkzeug.serving import make_server
+
+    ingested = {}
+
+    def on_ingest(action, record):
+        if action == "insert" and "bench_seq" in record:
+            ingested[record["bench_seq"]] = time.perf_counter()
+
+    server.realtime_data["tool_status"].add_listener(on_ingest)
+
+    httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+    port = httpd.server_port
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    # The ingest loop subscribes on its own thread; readers must be attached before the first publish
+    deadline = time.monotonic() + 30
+    while server.mqtt_client is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    stop = threading.Event()
+    arrivals = [{} for _ in range(clients)]
+    readers = [threading.Thread(target=read_stream, args=(port, role, arrivals[n], stop), daemon=True)
+               for n in range(clients)]
+    for reader in readers:
+        reader.start()
+    while server.sse_broker.stats()["roles"][role]["clients"] < clients and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    publisher = LocalTransport("e2e-bench")
+    publisher.connect()
+    bucket = TokenBucket(rate)
+    sent = []
+    started = time.perf_counter()
+    end = started + duration
+    while True:
+        now = time.perf_counter()
+        if now >= end:
+            break
+        wait = bucket.wait(time.monotonic())
+        if wait:
+            time.sleep(wait)
+            continue
+        seq = len(sent)
+        payload = json.dumps({"toolid": TOOL_IDS[seq % len(TOOL_IDS)], "temperature": 40 + seq % 30,
+                              "vibration_rms": 1.5, "hours_since_service": 10.0,
+                              "ts_iso": time.strftime("%Y-%m-%dT%H:%M:%S"), "bench_seq": seq})
+        sent.append(time.perf_counter())
+        publisher.publish(TOPIC, payload)
+        bucket.take()
+    published_for = time.perf_counter() - started
+
+    # Let in-flight messages finish before measuring what arrived
+    settle = time.perf_counter() + drain
+    while time.perf_counter() < settle and any(len(a) < len(sent) for a in arrivals):
+        time.sleep(0.05)
+    stop.set()
+    httpd.shutdown()
+
+    ingest_ms = [(at - sent[seq]) * 1000 for seq, at in ingested.items()]
+    sse_ms = [(at - sent[seq]) * 1000 for client in arrivals for seq, at in client.items()]
+    last_arrival = max((max(a.values()) for a in arrivals if a), default=started)
+    delivered = sum(len(a) for a in arrivals)
+    pipeline = server.ingest_pipeline.stats()
+    sse = server.sse_broker.stats()
+
+    return {
+        "rate": rate,
+        "clients": clients,
+        "sent": len(sent),
+        "publish_rate": round(len(sent) / published_for, 1),
+        "ingested": len(ingested),
+        "delivered_per_client": round(delivered / max(clients, 1), 1),
+        "sse_throughput": round(delivered / max(clients, 1) / max(last_arrival - started, 1e-9), 1),
+        "ingest_ms": summarize(ingest_ms),
+        "sse_ms": summarize(sse_ms),
+        "ingest_dropped": pipeline["dropped"],
+        "ingest_invalid": pipeline["invalid"],
+        "sse_dropped": sse["dropped"],
+        "batch_size_avg": pipeline["batch_size_avg"],
+    }
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 📊 Driver: one subprocess per rate, then a side-by-side table
+# ──────────────────────────────────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", default="100,1000,5000", help="comma-separated publish rates, msgs/sec")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=4, help="SSE connections")
+    parser.add_argument("--role", default="owner", choices=("owner", "renter", "operator"))
+    parser.add_argument("--drain", type=float, default=5.0, help="seconds to wait for stragglers after publishing")
+    parser.add_argument("--json", metavar="PATH", help="also write the results here")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_once(float(args.rates), args.duration, args.clients, args.role, args.drain)))
+        return
+
+    results = []
+    for rate in args.rates.split(","):
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ,
+                       MQTT_TRANSPORT="local",
+                       PASSWORD_HASH_WORKERS="0",
+                       USER_DB_PATH=os.path.join(scratch, "users.db"),
+                       EVENT_LOG_DIR=os.path.join(scratch, "eventlog"))
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", "--rates", rate,
+                                  "--duration", str(args.duration), "--clients", str(args.clients),
+                                  "--role", args.role, "--drain", str(args.drain)],
+                                 env=env, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"{'rate':>7} {'sent/s':>8} {'sse/s':>8} {'ingest p50':>11} {'p95':>8} {'p99':>8} "
+          f"{'sse p50':>8} {'p95':>8} {'p99':>8}  lost (ingest/sse)")
+    for r in results:
+        ingest, sse = r["ingest_ms"], r["sse_ms"]
+        print(f"{r['rate']:>7g} {r['publish_rate']:>8} {r['sse_throughput']:>8} {ingest['p50']!s:>11} "
+              f"{ingest['p95']!s:>8} {ingest['p99']!s:>8} {sse['p50']!s:>8} {sse['p95']!s:>8} {sse['p99']!s:>8}  "
+              f"{r['sent'] - r['ingested']}/{round(r['sent'] - r['delivered_per_client'])}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
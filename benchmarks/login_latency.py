@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Login latency under a concurrent burst, inline hashing vs the process pool.
+
+Each configuration boots server.py in a fresh subprocess (hashing settings
+are read at import) behind a threaded WSGI server, then:
+  - `--clients` threads POST /login back to back for `--duration` seconds
+  - one probe thread GETs /api/stream/stats every 20 ms, standing in for
+    the SSE/polling traffic a login burst should not starve
+
+and reports p50/p95/p99 for both, login throughput and 503s.
+
+    python benchmarks/login_latency.py                       # workers 0 (inline) vs 2
+    python benchmarks/login_latency.py --workers 0,2,4 --clients 64
+"""
+
+import argparse, http.client, json, os, subprocess, sys, tempfile, threading, time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EMAIL    = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples_ms):
+    return {f"p{p}": round(percentile(samples_ms, p), 2) if samples_ms else None for p in (50, 95, 99)}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 🏃 One configuration, inside its own process
+# ──────────────────────────────────────────────────────────────────────────────
+def run_once(clients, duration):
+    os.chdir(ROOT_DIR)
+    sys.path.insert(0, ROOT_DIR)
+    import server
+    from werkzeug.serving import make_server
+
+    user = {"id": "R000001", "email": EMAIL, "name": "Bench", "phone": "0", "role": "renter",
+            "password_hash": server.password_hasher.hash(PASSWORD)}
+    if server.users_db.get_by_email(EMAIL) is None:
+        server.users_db.create(user)
+
+    httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+    port = httpd.server_port
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    login_ms, probe_ms, statuses = [], [], {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    body = json.dumps({"email": EMAIL, "password": PASSWORD})
+
+    def login_client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            conn.request("POST", "/login", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+                if response.status == 200:
+                    login_ms.append(elapsed)
+            if response.status == 503:
+                time.sleep(0.05)
+
+    def probe():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            conn.request("GET", "/api/stream/stats")
+            conn.getresponse().read()
+            probe_ms.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=login_client) for _ in range(clients)] + [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    httpd.shutdown()
+
+    return {
+        "workers": server.PASSWORD_HASH_WORKERS,
+        "method": server.password_hasher.params,
+        "clients": clients,
+        "logins_per_sec": round(len(login_ms) / duration, 1),
+        "login_ms": summarize(login_ms),
+        "probe_ms": summarize(probe_ms),
+        "statuses": statuses,
+    }
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 📊 Driver: one subprocess per worker setting, then a side-by-side table
+# ──────────────────────────────────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="0,2", help="comma-separated PASSWORD_HASH_WORKERS values; 0 = inline")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_once(args.clients, args.duration)))
+        return
+
+    results = []
+    for workers in args.workers.split(","):
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ,
+                       PASSWORD_HASH_WORKERS=workers,
+                       PASSWORD_HASH_MAX_PENDING=str(args.max_pending),
+                       USER_DB_PATH=os.path.join(scratch, "users.db"),
+                       EVENT_LOG_DIR=os.path.join(scratch, "eventlog"))
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--run",
+                                  "--clients", str(args.clients), "--duration", str(args.duration)],
+                                 env=env, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"{'workers':>8} {'logins/s':>9} {'login p50':>10} {'p95':>8} {'p99':>8} "
+          f"{'probe p50':>10} {'p95':>8} {'p99':>8}  statuses")
+    for r in results:
+        login, probe = r["login_ms"], r["probe_ms"]
+        print(f"{r['workers']:>8} {r['logins_per_sec']:>9} {login['p50']!s:>10} {login['p95']!s:>8} "
+              f"{login['p99']!s:>8} {probe['p50']!s:>10} {probe['p95']!s:>8} {probe['p99']!s:>8}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
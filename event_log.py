@@ -0,0 +1,268 @@
+"""
+Append-only, segment-rotated mutation log with periodic snapshots.
+
+Every journaled mutation becomes one line in the active segment:
+
+    <crc32 hex> <json entry>\\n
+
+where the entry carries a log sequence number (lsn). Segments are named
+after the first lsn they hold and rotate once they pass `segment_bytes`.
+A snapshot is the full state as of some lsn, written to a temp file and
+renamed into place; once it is durable, segments whose entries are all
+covered by it are deleted. Restart cost is therefore one snapshot load
+plus the entries written since, not the whole history.
+
+fsync policy (`fsync=`):
+  - 'always'   fsync after every entry. Nothing acknowledged is lost even
+               on power failure; throughput is bounded by disk flush latency.
+  - 'interval' (default) every entry is written through to the OS, so a
+               process crash loses nothing; the file is fsynced at most
+               every `fsync_interval` seconds, so a power failure can lose
+               up to that much of the tail.
+  - 'never'    entries are written to the OS and flushed to disk whenever
+               the kernel decides. Fastest; a power failure can lose
+               whatever had not yet been written back.
+Rotation, snapshots and close() always fsync regardless of policy.
+
+A torn or corrupt line (bad CRC or JSON) ends recovery at that point; the
+segment is truncated there and any later segments are renamed *.corrupt,
+so new entries never follow garbage.
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-writer is up to the operator
+    fcntl = None
+
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+SEGMENT_SUFFIX = '.log'
+SNAPSHOT_PREFIX = 'snapshot-'
+SNAPSHOT_SUFFIX = '.json'
+LOCK_FILE = 'LOCK'
+
+
+def json_default(value):
+    """json.dumps fallback for NumPy/pandas scalars that slip into records"""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode(entry):
+    body = json.dumps(entry, separators=(',', ':'), default=json_default)
+    return f"{zlib.crc32(body.encode('utf-8')):08x} {body}\n".encode('utf-8')
+
+
+def _decode(line):
+    try:
+        text = line.decode('utf-8')
+        crc, body = text.rstrip('\n').split(' ', 1)
+        if not text.endswith('\n') or int(crc, 16) != zlib.crc32(body.encode('utf-8')):
+            return None
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class EventLog:
+    """Durable journal of mutations; pair with snapshot() to bound replay"""
+
+    def __init__(self, directory, segment_bytes=16 * 1024 * 1024, fsync='interval', fsync_interval=1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.lsn = 0
+        self.snapshot_lsn = 0
+        self.snapshot_at = None
+        self.lock = threading.RLock()
+        self._file = None
+        self._segment_size = 0
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._acquire(directory)
+
+    @staticmethod
+    def _acquire(directory):
+        """Hold an exclusive lock on the directory so two processes never append to one log"""
+        handle = open(os.path.join(directory, LOCK_FILE), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                raise RuntimeError(f"Event log {directory} is in use by another process")
+        return handle
+
+    # ---------- recovery ----------
+
+    def _segments(self):
+        names = [n for n in os.listdir(self.directory) if n.endswith(SEGMENT_SUFFIX)]
+        return sorted((int(n[:-len(SEGMENT_SUFFIX)]), os.path.join(self.directory, n)) for n in names)
+
+    def _snapshots(self):
+        names = [n for n in os.listdir(self.directory)
+                 if n.startswith(SNAPSHOT_PREFIX) and n.endswith(SNAPSHOT_SUFFIX)]
+        return sorted(((int(n[len(SNAPSHOT_PREFIX):-len(SNAPSHOT_SUFFIX)]), os.path.join(self.directory, n))
+                       for n in names), reverse=True)
+
+    def recover(self):
+        """Return (snapshot state or None, [entries newer than the snapshot])
+
+        Must be called once before the first append(); it also positions the
+        log after the last intact entry.
+        """
+        state = None
+        for lsn, path in self._snapshots():
+            try:
+                with open(path, 'r') as f:
+                    document = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠ Skipping unreadable snapshot {os.path.basename(path)}: {e}")
+                continue
+            state = document['state']
+            self.lsn = self.snapshot_lsn = lsn
+            self.snapshot_at = os.path.getmtime(path)
+            break
+
+        tail = []
+        torn = False
+        for _, path in self._segments():
+            if torn:
+                # Entries after a torn record would follow a gap; keep them aside for inspection
+                print(f"⚠ Setting aside {os.path.basename(path)}: it follows a torn segment")
+                os.replace(path, path + '.corrupt')
+                continue
+            intact = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    entry = _decode(line)
+                    if entry is None:
+                        break
+                    intact += len(line)
+                    if entry['lsn'] > self.snapshot_lsn:
+                        tail.append(entry)
+                    self.lsn = max(self.lsn, entry['lsn'])
+            if intact < os.path.getsize(path):
+                print(f"⚠ Truncating torn tail of {os.path.basename(path)} at byte {intact}")
+                with open(path, 'r+b') as f:
+                    f.truncate(intact)
+                    os.fsync(f.fileno())
+                torn = True
+        return state, tail
+
+    # ---------- writing ----------
+
+    def append(self, entry):
+        """Assign the next lsn to `entry`, write it and apply the fsync policy"""
+        with self.lock:
+            self.lsn += 1
+            data = _encode({'lsn': self.lsn, **entry})
+            if self._file is None or self._segment_size >= self.segment_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._segment_size += len(data)
+            self._dirty = True
+            if self.fsync == 'always':
+                self._sync()
+            elif self.fsync == 'interval' and time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._sync()
+            return self.lsn
+
+    def sync(self):
+        """fsync outstanding entries; call periodically so an idle log still honours fsync_interval"""
+        with self.lock:
+            if self._dirty and self.fsync != 'never':
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+        path = os.path.join(self.directory, f"{self.lsn:020d}{SEGMENT_SUFFIX}")
+        self._file = open(path, 'ab')
+        self._segment_size = self._file.tell()
+        _fsync_dir(self.directory)
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+            self._lock_file.close()
+
+    # ---------- snapshots ----------
+
+    @property
+    def entries_since_snapshot(self):
+        return self.lsn - self.snapshot_lsn
+
+    def snapshot(self, capture):
+        """Persist `capture()` as of the current lsn, then drop covered segments
+
+        capture() runs under the log lock, so no journaled writer can slip a
+        mutation in between the state it copies and the lsn it is stamped
+        with; it should copy quickly and leave serialization to us.
+        """
+        with self.lock:
+            lsn = self.lsn
+            state = capture()
+        path = os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{lsn:020d}{SNAPSHOT_SUFFIX}")
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'lsn': lsn, 'created_iso': time.strftime('%Y-%m-%dT%H:%M:%S'), 'state': state},
+                      f, separators=(',', ':'), default=json_default)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.directory)
+
+        with self.lock:
+            self.snapshot_lsn = max(self.snapshot_lsn, lsn)
+            self.snapshot_at = time.time()
+            self._compact(lsn)
+        return lsn
+
+    def _compact(self, lsn):
+        for old_lsn, old_path in self._snapshots():
+            if old_lsn < lsn:
+                os.remove(old_path)
+        segments = self._segments()
+        active = self._file.name if self._file is not None else None
+        # A segment is fully covered once the next one starts at or before lsn + 1
+        for (_, path), (next_first, _) in zip(segments, segments[1:]):
+            if next_first <= lsn + 1 and path != active:
+                os.remove(path)
@@ -0,0 +1,346 @@
+"""
+Indexed in-memory event collections backing realtime_data.
+
+Each collection keeps its records in arrival order plus one hash index
+per configured field, so lookups like "bookings for renter R003" cost
+O(matches) instead of a scan over every event. Records sit in a deque, so
+trimming a capped collection drops its oldest entries in O(1) each.
+
+Every mutation is also stamped with a process-wide sequence number and
+recorded in a ChangeLog, which is what the `since=<cursor>` delta APIs
+read from. Sequence numbers only order changes within one process, so the
+cursors handed to clients carry the clock's random epoch, and a cursor
+issued by another worker (or by this one before a restart) is refused
+rather than read as a position in this process's history.
+
+Listeners registered with add_listener() see every mutation as
+('insert' | 'update' | 'delete' | 'expire', record). Incremental
+aggregates use them to stay in step with the collection.
+
+With a journal attached (a state_backend backend) every write is first
+appended to it as a small replayable entry; replay() applies such an
+entry back through the same write methods, on restart or when another
+worker made the change.
+"""
+
+import secrets
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+
+
+class SequenceClock:
+    """Process-wide monotonically increasing mutation counter"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+        self.epoch = secrets.token_hex(4)
+
+    def next(self):
+        with self._lock:
+            self._value += 1
+            return self._value
+
+    def current(self):
+        return self._value
+
+    def cursor(self, value):
+        """Client-facing cursor for sequence number `value`"""
+        return f'{self.epoch}.{value}'
+
+    def parse(self, cursor):
+        """Sequence number of a cursor() from this clock, None for foreign or malformed ones"""
+        epoch, _, value = cursor.partition('.')
+        if epoch != self.epoch or not value.isdigit():
+            return None
+        return int(value)
+
+
+sequence = SequenceClock()
+
+
+class ChangeLog:
+    """Latest change per record, ordered by sequence number
+
+    Live records and tombstones share one ordered map, so reading every
+    change after a cursor costs O(changes) regardless of collection size.
+    Entries beyond `max_entries` are forgotten; cursors older than the
+    forgotten horizon get None from since() and must do a full reload.
+    `version` is the sequence number of the latest change, usable both as
+    a delta cursor and as an ETag input.
+    """
+
+    def __init__(self, key_field, max_entries=10000):
+        self.key_field = key_field
+        self.max_entries = max_entries
+        self.horizon = 0
+        self.version = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def touch(self, record, ref=None):
+        return self._record(id(record) if ref is None else ref, record, False)
+
+    def delete(self, record, ref=None):
+        return self._record(id(record) if ref is None else ref, record, True)
+
+    def reset(self):
+        """Forget all history; every existing cursor becomes stale"""
+        with self._lock:
+            self._entries.clear()
+            self.horizon = self.version = sequence.next()
+
+    def since(self, cursor):
+        """Return [(key, record, deleted)] changed after `cursor`, oldest first"""
+        with self._lock:
+            if cursor < self.horizon:
+                return None
+            changes = []
+            for seq, record, deleted in reversed(self._entries.values()):
+                if seq <= cursor:
+                    break
+                changes.append((record.get(self.key_field), record, deleted))
+            changes.reverse()
+            return changes
+
+    def _record(self, ref, record, deleted):
+        with self._lock:
+            seq = sequence.next()
+            # Tombstones are keyed apart from live ids, which Python may reuse
+            key = ('deleted', ref) if deleted else ref
+            self._entries.pop(ref, None)
+            self._entries.pop(key, None)
+            self._entries[key] = (seq, dict(record) if deleted else record, deleted)
+            self.version = seq
+            while len(self._entries) > self.max_entries:
+                _, (old_seq, _, _) = self._entries.popitem(last=False)
+                self.horizon = old_seq
+            return seq
+
+
+class EventCollection:
+    """Ordered list of event dicts with per-field secondary indexes"""
+
+    def __init__(self, name, indexes=(), key_field=None):
+        self.name = name
+        self._records = deque()
+        self._indexes = {field: {} for field in indexes}
+        self._lock = threading.RLock()
+        self.changes = ChangeLog(key_field or (indexes[0] if indexes else 'id'))
+        self._listeners = []
+        self.journal = None
+
+    def attach_journal(self, journal):
+        """Log every later mutation to `journal` (a state_backend backend)"""
+        self.journal = journal
+
+    def add_listener(self, callback):
+        """Call `callback(action, record)` after every mutation"""
+        self._listeners.append(callback)
+
+    def _emit(self, action, record):
+        for callback in self._listeners:
+            callback(action, record)
+
+    # ---------- read side ----------
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._records))
+
+    def __getitem__(self, item):
+        return self._records[item]
+
+    def __bool__(self):
+        return bool(self._records)
+
+    def lookup(self, field, value):
+        """Return records whose indexed `field` equals `value`, oldest first"""
+        with self._lock:
+            bucket = self._indexes[field].get(value)
+            return list(bucket.values()) if bucket else []
+
+    def lookup_many(self, field, values):
+        """Return records whose indexed `field` is any of `values`"""
+        with self._lock:
+            index = self._indexes[field]
+            matches = []
+            for value in values:
+                bucket = index.get(value)
+                if bucket:
+                    matches.extend(bucket.values())
+            return matches
+
+    def first(self, field, value):
+        with self._lock:
+            bucket = self._indexes[field].get(value)
+            if not bucket:
+                return None
+            return next(iter(bucket.values()))
+
+    def count(self, field, value):
+        bucket = self._indexes[field].get(value)
+        return len(bucket) if bucket else 0
+
+    # ---------- write side ----------
+
+    def append(self, record):
+        with self._writing():
+            self._log('append', r=record)
+            self._records.append(record)
+            self._index(record)
+            self.changes.touch(record)
+            self._emit('insert', record)
+
+    def extend(self, records):
+        records = list(records)
+        with self._writing():
+            self._log('extend', rs=records)
+            for record in records:
+                self._records.append(record)
+                self._index(record)
+                self.changes.touch(record)
+                self._emit('insert', record)
+
+    def replace_all(self, records):
+        records = list(records)
+        with self._writing():
+            self._log('replace', rs=records)
+            for record in self._records:
+                self._emit('expire', record)
+            self._records = deque()
+            for index in self._indexes.values():
+                index.clear()
+            self.changes.reset()
+            for record in records:
+                self._records.append(record)
+                self._index(record)
+                self._emit('insert', record)
+
+    def update(self, record, changes):
+        """Apply `changes` to a stored record, moving it between index buckets"""
+        with self._writing():
+            self._log('update', at=self._locator(record), changes=changes)
+            moved = [f for f in self._indexes if f in changes and changes[f] != record.get(f)]
+            for field in moved:
+                self._unindex_field(record, field)
+            record.update(changes)
+            for field in moved:
+                self._index_field(record, field)
+            self.changes.touch(record)
+            self._emit('update', record)
+            return record
+
+    def touch(self, record):
+        """Stamp an in-place edit made outside update()"""
+        with self._writing():
+            self._log('touch', at=self._locator(record), r=record)
+            seq = self.changes.touch(record)
+            self._emit('update', record)
+            return seq
+
+    def remove_where(self, field, value):
+        """Drop every record whose indexed `field` equals `value`"""
+        with self._writing():
+            doomed = self.lookup(field, value)
+            if not doomed:
+                return []
+            self._log('remove', field=field, value=value)
+            doomed_ids = {id(r) for r in doomed}
+            self._records = deque(r for r in self._records if id(r) not in doomed_ids)
+            for record in doomed:
+                self._unindex(record)
+                self.changes.delete(record)
+                self._emit('delete', record)
+            return doomed
+
+    def trim(self, maxlen):
+        """Keep only the newest `maxlen` records"""
+        with self._writing():
+            excess = len(self._records) - maxlen
+            if excess <= 0:
+                return
+            self._log('trim', maxlen=maxlen)
+            for _ in range(excess):
+                record = self._records.popleft()
+                self._unindex(record)
+                self.changes.delete(record)
+                self._emit('expire', record)
+
+    # ---------- journal ----------
+
+    def replay(self, entry):
+        """Re-apply one journal entry written by this collection"""
+        op = entry['op']
+        if op == 'append':
+            self.append(entry['r'])
+        elif op == 'extend':
+            self.extend(entry['rs'])
+        elif op == 'replace':
+            self.replace_all(entry['rs'])
+        elif op == 'update':
+            self.update(self._resolve(entry['at']), entry['changes'])
+        elif op == 'touch':
+            # Replaying through update() also moves the record between index buckets
+            self.update(self._resolve(entry['at']), entry['r'])
+        elif op == 'remove':
+            self.remove_where(entry['field'], entry['value'])
+        elif op == 'trim':
+            self.trim(entry['maxlen'])
+        else:
+            raise ValueError(f"Unknown journal op {op!r} for {self.name}")
+
+    @contextmanager
+    def _writing(self):
+        # Journal section before our lock: a snapshot holds it while it reads collections, and a
+        # shared backend applies other workers' entries on entry. Every write logs before it
+        # mutates, so the journal order is the order the change was applied in.
+        journal = self.journal
+        with (journal.writing() if journal is not None else nullcontext()), self._lock:
+            yield
+
+    def _log(self, op, **args):
+        if self.journal is not None:
+            self.journal.append({'c': self.name, 'op': op, **args})
+
+    def _locator(self, record):
+        """Address of `record` that resolves to the same record when the log is replayed"""
+        field = next(iter(self._indexes), None)
+        if field is None:
+            return [None, None, next(i for i, r in enumerate(self._records) if r is record)]
+        value = record.get(field)
+        return [field, value, list(self._indexes[field][value]).index(id(record))]
+
+    def _resolve(self, locator):
+        field, value, position = locator
+        if field is None:
+            return self._records[position]
+        return list(self._indexes[field][value].values())[position]
+
+    # ---------- internals ----------
+
+    def _index(self, record):
+        for field in self._indexes:
+            self._index_field(record, field)
+
+    def _unindex(self, record):
+        for field in self._indexes:
+            self._unindex_field(record, field)
+
+    def _index_field(self, record, field):
+        # Buckets are dicts keyed by id() so removal stays O(1) while keeping insertion order
+        self._indexes[field].setdefault(record.get(field), {})[id(record)] = record
+
+    def _unindex_field(self, record, field):
+        index = self._indexes[field]
+        value = record.get(field)
+        bucket = index.get(value)
+        if bucket is None:
+            return
+        bucket.pop(id(record), None)
+        if not bucket:
+            del index[value]
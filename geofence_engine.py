@@ -0,0 +1,135 @@
+"""
+Vectorized geofence evaluation for the whole fleet.
+
+Tool positions and fence parameters live in NumPy arrays indexed by a
+dense slot per toolid. evaluate() computes haversine distance and
+inside/outside for every fenced tool in one batched pass and reports only
+the tools whose state flipped since the previous pass.
+"""
+
+import threading
+from datetime import datetime
+
+import numpy as np
+
+
+EARTH_RADIUS_M = 6371008.8
+
+UNKNOWN, OUTSIDE, INSIDE = -1, 0, 1
+
+COLUMNS = (
+    ('lat', np.nan, np.float64),
+    ('lng', np.nan, np.float64),
+    ('center_lat', np.nan, np.float64),
+    ('center_lng', np.nan, np.float64),
+    ('radius_m', np.nan, np.float64),
+    ('distance_m', np.nan, np.float64),
+    ('state', UNKNOWN, np.int8)
+)
+
+
+class GeofenceEngine:
+    """Fleet-wide fence state with entry/exit transition detection"""
+
+    def __init__(self, capacity=1024):
+        self._slots = {}
+        self._ids = []
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+        self.evaluations = 0
+        self.last_evaluated_iso = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _allocate(self, capacity):
+        for name, fill, dtype in COLUMNS:
+            column = np.full(capacity, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                column[:len(old)] = old
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def _slot(self, tool_id):
+        slot = self._slots.get(tool_id)
+        if slot is None:
+            slot = len(self._ids)
+            if slot >= self.capacity:
+                self._allocate(self.capacity * 2)
+            self._slots[tool_id] = slot
+            self._ids.append(tool_id)
+        return slot
+
+    def set_fence(self, tool_id, center_lat, center_lng, radius_m):
+        with self._lock:
+            slot = self._slot(tool_id)
+            self.center_lat[slot] = center_lat
+            self.center_lng[slot] = center_lng
+            self.radius_m[slot] = radius_m
+
+    def update_position(self, tool_id, lat, lng):
+        try:
+            lat, lng = float(lat), float(lng)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            slot = self._slot(tool_id)
+            self.lat[slot] = lat
+            self.lng[slot] = lng
+
+    def evaluate(self):
+        """Recompute every fenced tool; return entry/exit transitions since the last pass"""
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return []
+            lat, lng = np.radians(self.lat[:n]), np.radians(self.lng[:n])
+            clat, clng = np.radians(self.center_lat[:n]), np.radians(self.center_lng[:n])
+            a = (np.sin((clat - lat) / 2) ** 2
+                 + np.cos(lat) * np.cos(clat) * np.sin((clng - lng) / 2) ** 2)
+            distance = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+            # Tools missing either a position or a fence stay UNKNOWN
+            known = ~np.isnan(distance) & ~np.isnan(self.radius_m[:n])
+            new_state = np.where(known, np.where(distance <= self.radius_m[:n], INSIDE, OUTSIDE), UNKNOWN)
+            new_state = new_state.astype(np.int8)
+
+            previous = self.state[:n]
+            changed = np.flatnonzero((new_state != previous) & (previous != UNKNOWN) & known)
+
+            self.distance_m[:n] = distance
+            self.state[:n] = new_state
+            self.evaluations += 1
+            self.last_evaluated_iso = datetime.now().isoformat()
+
+            return [self._transition(int(slot)) for slot in changed]
+
+    def _transition(self, slot):
+        inside = self.state[slot] == INSIDE
+        return {
+            'toolid': self._ids[slot],
+            'breach_type': 'entry' if inside else 'exit',
+            'within_fence': bool(inside),
+            'latitude': float(self.lat[slot]),
+            'longitude': float(self.lng[slot]),
+            'distance_m': round(float(self.distance_m[slot]), 1),
+            'geo_radius_m': float(self.radius_m[slot]),
+            'ts_iso': self.last_evaluated_iso
+        }
+
+    def status(self, tool_id):
+        """Last evaluated fence state for one tool, or None if it is not tracked"""
+        with self._lock:
+            slot = self._slots.get(tool_id)
+            if slot is None:
+                return None
+            return {
+                'latitude': float(self.lat[slot]),
+                'longitude': float(self.lng[slot]),
+                'geo_center_lat': float(self.center_lat[slot]),
+                'geo_center_lng': float(self.center_lng[slot]),
+                'geo_radius_m': float(self.radius_m[slot]),
+                'distance_m': float(self.distance_m[slot]),
+                'state': int(self.state[slot])
+            }
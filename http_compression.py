@@ -0,0 +1,199 @@
+"""
+Content-negotiated response compression.
+
+ResponseCompressor.install(app) adds an after_request hook that compresses
+responses for clients that ask for it in Accept-Encoding. Brotli ('br') is
+offered when the brotli package is installed and wins over gzip at equal
+client preference.
+
+  - buffered responses (API JSON, HTML) of at least `min_size` bytes with a
+    compressible mimetype are compressed in one call
+  - streamed responses (the SSE stream) are wrapped so every chunk the view
+    yields is compressed and flushed to a decodable boundary right away
+    (Z_SYNC_FLUSH / brotli flush()), so an event reaches the browser when
+    it is published instead of waiting in the compressor's window
+  - anything already carrying a Content-Encoding (pre-compressed static
+    assets), file responses and non-200 responses pass through untouched
+
+A compressed body is a different representation of the same resource: its
+strong ETag becomes a weak one and Vary: Accept-Encoding is added, and
+If-None-Match still matches it under weak comparison, so 304s keep working.
+A strong ETag also promises byte-identical bodies, so compressed bodies are
+kept per (ETag, encoding) in a small LRU bounded by `cache_bytes`: every
+client polling the same unchanged listing after the first gets it without
+compressing it again.
+
+The default levels (gzip 6, brotli 5) are for compressing dynamic bodies per
+request. Static assets are compressed once, at build time, at the maximum
+level (see static_assets.py).
+"""
+
+import gzip
+import threading
+import zlib
+from collections import Counter, OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+# File suffix of each encoding's pre-compressed sibling
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def supported_encodings(preferred=('br', 'gzip')):
+    """The encodings out of `preferred` this process can produce"""
+    return tuple(e for e in preferred if e == 'gzip' or (e == 'br' and brotli is not None))
+
+
+def compress(data, encoding, level=None):
+    """One-shot compression; `level` None means the encoding's maximum"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if level is None else level)
+    # mtime=0 keeps the output a pure function of the input
+    return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compressor whose output is decodable after every chunk"""
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            # wbits 31: deflate inside a gzip header and trailer
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class ResponseCompressor:
+    """Negotiates and applies Content-Encoding for buffered and streamed responses"""
+
+    def __init__(self, encodings=('br', 'gzip'), min_size=1024, gzip_level=6, brotli_quality=5, streams=True,
+                 cache_bytes=32 * 1024 * 1024):
+        self.encodings = supported_encodings(encodings)
+        self.min_size = min_size
+        self.levels = {'gzip': gzip_level, 'br': brotli_quality}
+        self.streams = streams
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.responses = Counter()
+        self.streamed = Counter()
+        self.bytes_in = Counter()
+        self.bytes_out = Counter()
+
+    def install(self, app):
+        """Register the after_request hook on a Flask app"""
+        from flask import request
+
+        @app.after_request
+        def compress_response(response):
+            return self.process(response, request.accept_encodings)
+
+    def negotiate(self, accept_encodings, offered=None):
+        """Best of `offered` (default: every supported encoding) for an Accept-Encoding header, or None"""
+        offered = self.encodings if offered is None else offered
+        return accept_encodings.best_match(offered) if offered else None
+
+    def process(self, response, accept_encodings):
+        if (response.status_code != 200 or 'Content-Encoding' in response.headers
+                or response.direct_passthrough or not response.mimetype.startswith(COMPRESSIBLE_TYPES)):
+            return response
+        streamed = response.is_streamed
+        if streamed and not self.streams:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate(accept_encodings)
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        if streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+            with self._lock:
+                self.streamed[encoding] += 1
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            key = (etag, encoding) if etag and not weak else None
+            compressed = self._cached(key)
+            if compressed is None:
+                compressed = compress(data, encoding, self.levels[encoding])
+                self._store(key, compressed)
+            response.set_data(compressed)
+            with self._lock:
+                self.responses[encoding] += 1
+                self.bytes_in[encoding] += len(data)
+                self.bytes_out[encoding] += len(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _cached(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            return compressed
+
+    def _store(self, key, compressed):
+        if key is None or len(compressed) > self.cache_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = compressed
+            self._cached_bytes += len(compressed)
+            while self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+
+    def _compress_stream(self, chunks, encoding):
+        compressor = StreamCompressor(encoding, self.levels[encoding])
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                yield compressor.compress(chunk)
+            yield compressor.finish()
+        finally:
+            # The server closes this generator when the client goes away; pass that on to the view's
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'encodings': list(self.encodings),
+                'responses': dict(self.responses),
+                'cache_hits': self.cache_hits,
+                'cached_bytes': self._cached_bytes,
+                'streams': dict(self.streamed),
+                'bytes_in': dict(self.bytes_in),
+                'bytes_out': dict(self.bytes_out)
+            }
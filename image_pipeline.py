@@ -0,0 +1,166 @@
+"""
+Resized, re-encoded derivatives of the catalog images.
+
+The tool photos in static/images/tools are 0.5-2 MB PNGs of 1024-2304 px,
+shown in cards 120-400 px wide. ImagePipeline turns each into every width
+in `widths` in every format in `formats` that this Pillow build can write
+(AVIF, WebP), plus a JPEG fallback (PNG for images with transparency), and
+image_set() describes the result as srcset strings for <picture>:
+
+    {'src': '/img/drill.1a2b3c4d5e6f-320w-q80.jpg',
+     'srcset': '/img/drill.1a2b3c4d5e6f-160w-q80.jpg 160w, ...',
+     'sources': {'image/avif': '/img/drill.1a2b3c4d5e6f-160w-q50.avif 160w, ...',
+                 'image/webp': '...'}}
+
+image_set() only hashes the source and reads its header to name the
+derivatives; nothing is encoded until derivative() is asked for a file that
+is not on disk yet, so importing the server stays cheap and each derivative
+costs one encode on its first request. They are cached on disk under names
+made of the source's content hash, the width and the encoder quality, and
+served with immutable caching afterwards; an edited source gets new names.
+Files are written atomically, so workers racing on the same derivative may
+both encode it without ever serving a torn file.
+
+Pillow is optional: without it image_set() returns only the original URL and
+the cards keep loading the full-size files.
+"""
+
+import hashlib
+import io
+import os
+import threading
+
+from static_assets import write_atomic
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+EXTENSIONS = {'avif': '.avif', 'webp': '.webp', 'jpeg': '.jpg', 'png': '.png'}
+DEFAULT_QUALITY = {'avif': 50, 'webp': 75, 'jpeg': 80}
+HASH_LENGTH = 12
+
+
+def writable_formats(formats):
+    """The formats out of `formats` the installed Pillow can encode"""
+    if Image is None:
+        return ()
+    return tuple(f for f in formats if f in ('jpeg', 'png') or features.check(f))
+
+
+class ImagePipeline:
+    """Generates and caches responsive derivatives of source images"""
+
+    def __init__(self, cache_dir, url_path='/img', widths=(160, 320, 640), formats=('avif', 'webp'),
+                 default_width=320, quality=None):
+        self.cache_dir = cache_dir
+        self.url_path = url_path
+        self.widths = tuple(sorted(widths))
+        self.formats = writable_formats(formats)
+        self.default_width = default_width
+        self.quality = {**DEFAULT_QUALITY, **(quality or {})}
+        self.generated = 0
+        self.reused = 0
+        # derivative name -> (source path, content digest, width, format, alpha), filled by image_set()
+        self._planned = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return Image is not None
+
+    def image_set(self, source, url):
+        """{'src', 'srcset', 'sources'} for the image file `source`, or just {'src': url} without Pillow"""
+        if not self.enabled:
+            return {'src': url}
+        with open(source, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+        stem = os.path.splitext(os.path.basename(source))[0]
+
+        # Image.open only reads the header; pixels are decoded when a derivative is first requested
+        with Image.open(io.BytesIO(data)) as image:
+            alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            # Never upscale: widths past the source collapse into the source width
+            widths = sorted({min(width, image.width) for width in self.widths})
+        fallback = 'png' if alpha else 'jpeg'
+        srcsets = {fmt: [] for fmt in (*self.formats, fallback)}
+        for width in widths:
+            for fmt in srcsets:
+                name = self._name(stem, digest, width, fmt)
+                self._planned[name] = (source, digest, width, fmt, alpha)
+                srcsets[fmt].append((f'{self.url_path}/{name}', width))
+
+        src = next((url for url, width in srcsets[fallback] if width >= self.default_width), srcsets[fallback][-1][0])
+        return {
+            'src': src,
+            'srcset': self._srcset(srcsets[fallback]),
+            'sources': {MIME_TYPES[fmt]: self._srcset(srcsets[fmt]) for fmt in self.formats}
+        }
+
+    def derivative(self, name):
+        """Path of the cached derivative `name`, encoding it first if missing; None if image_set() never named it"""
+        path = os.path.join(self.cache_dir, name)
+        if os.path.exists(path):
+            self.reused += 1
+            return path
+        planned = self._planned.get(name)
+        if planned is None:
+            return None
+        source, digest, width, fmt, alpha = planned
+        # One encode at a time per worker: concurrent requests for the same file wait for the first
+        with self._lock:
+            if os.path.exists(path):
+                self.reused += 1
+                return path
+            with open(source, 'rb') as f:
+                data = f.read()
+            if hashlib.sha256(data).hexdigest()[:HASH_LENGTH] != digest:
+                # The source changed since it was named; its new version has other names
+                return None
+            with Image.open(io.BytesIO(data)) as image:
+                write_atomic(path, self._encode(self._resize(image, width, alpha), fmt))
+            self.generated += 1
+        return path
+
+    def _name(self, stem, digest, width, fmt):
+        quality = self.quality.get(fmt)
+        suffix = f'-q{quality}' if quality is not None else ''
+        return f'{stem}.{digest}-{width}w{suffix}{EXTENSIONS[fmt]}'
+
+    @staticmethod
+    def _srcset(entries):
+        return ', '.join(f'{url} {width}w' for url, width in entries)
+
+    @staticmethod
+    def _resize(image, width, alpha):
+        height = max(1, round(image.height * width / image.width))
+        converted = image.convert('RGBA' if alpha else 'RGB')
+        if width == image.width:
+            return converted
+        return converted.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+
+    def _encode(self, image, fmt):
+        out = io.BytesIO()
+        if fmt == 'jpeg':
+            image.save(out, 'JPEG', quality=self.quality['jpeg'], optimize=True, progressive=True)
+        elif fmt == 'png':
+            image.save(out, 'PNG', optimize=True)
+        elif fmt == 'webp':
+            image.save(out, 'WEBP', quality=self.quality['webp'], method=6)
+        else:
+            image.save(out, 'AVIF', quality=self.quality['avif'])
+        return out.getvalue()
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'formats': list(self.formats),
+            'widths': list(self.widths),
+            'planned': len(self._planned),
+            'generated': self.generated,
+            'reused': self.reused
+        }
@@ -0,0 +1,174 @@
+"""
+Decoupled, batched MQTT ingest.
+
+The AWS IoT SDK calls its message callback on the same network thread
+that services keepalives, so the callback only does submit(): one
+non-blocking put of the raw (topic, bytes) onto a bounded queue. Two
+worker stages take it from there:
+
+  decode  drains up to `batch_size` raw messages at a time, maps the topic
+          to its data key with one dict lookup, parses the JSON and drops
+          payloads that fail validation
+  apply   receives decoded batches grouped by key and hands each group to
+          apply_batch(key, payloads) in one call, so the state write,
+          journal entry and index updates are paid per batch, not per message
+
+Both queues are bounded. When the raw queue is full the newest message is
+dropped and counted instead of blocking the SDK thread; when the decoded
+queue is full the decode stage waits, which backs up into the raw queue.
+stats() reports depths, batch sizes and every drop counter, with received
+and invalid messages also counted per topic. The counters are shared by the
+MQTT thread and both stages, so they are updated and read under one lock.
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import Counter, deque
+
+from structured_log import get_logger
+
+
+log = get_logger('toolease.ingest')
+
+class IngestPipeline:
+    """Bounded queue + decode/apply worker threads between MQTT and the state"""
+
+    def __init__(self, topic_keys, apply_batch, required_fields=None, queue_size=10000,
+                 batch_size=256, batch_wait=0.01):
+        self.topic_keys = topic_keys
+        self.apply_batch = apply_batch
+        self.required_fields = required_fields or {}
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._raw = queue.Queue(maxsize=queue_size)
+        self._decoded = queue.Queue(maxsize=max(1, queue_size // batch_size))
+        self._batch_sizes = deque(maxlen=1000)
+        self.received = 0
+        self.received_by_topic = Counter()
+        self.dropped = 0
+        self.unknown_topic = 0
+        self.invalid = 0
+        self.invalid_by_topic = Counter()
+        self.applied = Counter()
+        self.apply_errors = 0
+        self.last_apply_ms = 0.0
+        self._counters_lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for name, target in (('ingest-decode', self._decode_loop), ('ingest-apply', self._apply_loop)):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, topic, raw):
+        """Called on the MQTT network thread; never blocks"""
+        with self._counters_lock:
+            self.received += 1
+            self.received_by_topic[topic] += 1
+        try:
+            self._raw.put_nowait((topic, raw))
+            return True
+        except queue.Full:
+            with self._counters_lock:
+                self.dropped += 1
+            return False
+
+    # ---------- stages ----------
+
+    def _drain(self, source, first):
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(source.get_nowait())
+            except queue.Empty:
+                # A short linger lets a burst fill the batch without delaying a lone message much
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(source.get(timeout=remaining))
+                except queue.Empty:
+                    break
+        return batch
+
+    def _decode_loop(self):
+        while True:
+            batch = self._drain(self._raw, self._raw.get())
+            grouped = {}
+            unknown, invalid = 0, Counter()
+            for topic, raw in batch:
+                key = self.topic_keys.get(topic)
+                if key is None:
+                    unknown += 1
+                    continue
+                payload = self._decode(key, raw)
+                if payload is None:
+                    invalid[topic] += 1
+                    continue
+                grouped.setdefault(key, []).append(payload)
+            if unknown or invalid:
+                with self._counters_lock:
+                    self.unknown_topic += unknown
+                    self.invalid += sum(invalid.values())
+                    self.invalid_by_topic.update(invalid)
+            self._batch_sizes.append(len(batch))
+            if grouped:
+                self._decoded.put(grouped)
+
+    def _decode(self, key, raw):
+        try:
+            payload = json.loads(raw.decode('utf-8') if isinstance(raw, bytes) else raw)
+        except (UnicodeDecodeError, ValueError):
+            return None
+        if not isinstance(payload, dict):
+            return None
+        for field in self.required_fields.get(key, ()):
+            if payload.get(field) in (None, ''):
+                return None
+        return payload
+
+    def _apply_loop(self):
+        while True:
+            grouped = self._decoded.get()
+            started = time.perf_counter()
+            for key, payloads in grouped.items():
+                try:
+                    self.apply_batch(key, payloads)
+                except Exception:
+                    with self._counters_lock:
+                        self.apply_errors += 1
+                    log.exception('ingest_apply_failed', key=key, messages=len(payloads))
+                    continue
+                with self._counters_lock:
+                    self.applied[key] += len(payloads)
+            self.last_apply_ms = (time.perf_counter() - started) * 1000
+
+    # ---------- introspection ----------
+
+    def stats(self):
+        sizes = list(self._batch_sizes)
+        with self._counters_lock:
+            counters = {
+                'received': self.received,
+                'dropped': self.dropped,
+                'unknown_topic': self.unknown_topic,
+                'invalid': self.invalid,
+                'apply_errors': self.apply_errors,
+                'applied': dict(self.applied),
+                'received_by_topic': dict(self.received_by_topic),
+                'invalid_by_topic': dict(self.invalid_by_topic)
+            }
+        return {
+            'queue_depth': self._raw.qsize(),
+            'queue_capacity': self._raw.maxsize,
+            'decoded_depth': self._decoded.qsize(),
+            **counters,
+            'batch_size_last': sizes[-1] if sizes else 0,
+            'batch_size_avg': round(sum(sizes) / len(sizes), 1) if sizes else 0,
+            'batch_size_max': max(sizes) if sizes else 0,
+            'last_apply_ms': round(self.last_apply_ms, 3)
+        }
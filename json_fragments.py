@@ -0,0 +1,165 @@
+"""
+Pre-serialized JSON for the records list APIs return.
+
+Most stored records are written once and read by every poll: CSV-loaded
+bookings and feedback, ingested operator events, the registry's tool views.
+FragmentCache keeps each record's encoded bytes next to it (keyed by the
+record's identity, holding a reference so the id cannot be reused) and
+render() builds a response body by joining those fragments, so a 10k-item
+list costs 10k dict lookups instead of 10k encodes. The cache is bounded by
+the total size of the fragments it holds, `max_bytes`; past that the oldest
+records are evicted and simply encoded again on their next read.
+
+Projections (`?fields=`) are cached as variants of the same record, so a
+projected page is as cheap as a full one. Every variant of a record is
+dropped whenever the record changes:
+  - on_change is registered as an EventCollection listener, so update(),
+    touch(), delete and expiry invalidate it; the tool registry emits
+    'expire' for a view it replaces, so superseded views are not pinned
+  - handlers that decorate records in place (tool names, images, ...) go
+    through set_fields(), which only invalidates when a value differs
+
+An encode racing a mutation is never stored: every invalidation bumps an
+epoch and a fragment is only kept if the epoch did not move while it was
+being encoded.
+
+The encoder is pluggable. make_encoder('json') is the stdlib's C encoder
+with compact separators; 'orjson' is used when that package is installed.
+"""
+
+import json
+import threading
+from functools import partial
+
+
+def make_encoder(name='json', default=None):
+    """Return encode(obj) -> bytes for 'json' (stdlib) or 'orjson'"""
+    if name == 'orjson':
+        try:
+            import orjson
+        except ImportError:
+            print("⚠ JSON_ENCODER=orjson but orjson is not installed; using the stdlib encoder")
+        else:
+            options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            return partial(orjson.dumps, default=default, option=options)
+    elif name != 'json':
+        raise ValueError(f"Unknown JSON encoder {name!r} (expected 'json' or 'orjson')")
+    dumps = json.JSONEncoder(separators=(',', ':'), ensure_ascii=True, default=default).encode
+    return lambda obj: dumps(obj).encode('utf-8')
+
+
+class FragmentCache:
+    """Encoded bytes per record, invalidated on mutation, bounded to `max_bytes` of fragments"""
+
+    def __init__(self, encode, max_bytes=64 * 1024 * 1024, max_variants=8):
+        self.encode = encode
+        self.max_bytes = max_bytes
+        self.max_variants = max_variants
+        self._entries = {}
+        self._bytes = 0
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def fragment(self, record, projection=None):
+        """JSON of `record`, or of only the `projection` keys it has (a tuple)"""
+        entry = self._entries.get(id(record))
+        if entry is not None and entry[0] is record:
+            data = entry[1].get(projection)
+            if data is not None:
+                return data
+        return self._encode(record, projection)
+
+    def _encode(self, record, projection=None):
+        epoch = self._epoch
+        data = self.encode(record if projection is None else {k: record[k] for k in projection if k in record})
+        self.misses += 1
+        with self._lock:
+            if epoch != self._epoch or len(data) > self.max_bytes:
+                return data
+            entry = self._entries.get(id(record))
+            if entry is not None and entry[0] is not record:
+                self._drop(id(record))
+                entry = None
+            # Projections come from query strings; past a few per record, encode the rest per request
+            if entry is not None and (len(entry[1]) >= self.max_variants or projection in entry[1]):
+                return data
+            while self._entries and self._bytes + len(data) > self.max_bytes:
+                # Oldest first; evicted records simply get encoded again on their next read
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+                if oldest == id(record):
+                    entry = None
+            if entry is None:
+                entry = self._entries[id(record)] = (record, {})
+            entry[1][projection] = data
+            self._bytes += len(data)
+        return data
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= sum(len(data) for data in entry[1].values())
+
+    def invalidate(self, record):
+        with self._lock:
+            self._epoch += 1
+            self._drop(id(record))
+
+    def on_change(self, action, record):
+        """EventCollection listener: inserts are new objects, anything else changes or retires one"""
+        if action != 'insert':
+            self.invalidate(record)
+
+    def set_fields(self, record, fields):
+        """record.update(fields), invalidating the fragment only if a value actually changes"""
+        changed = False
+        for key, value in fields.items():
+            if key not in record or record[key] != value:
+                record[key] = value
+                changed = True
+        if changed:
+            self.invalidate(record)
+        return record
+
+    def render(self, fields, lists, projections=None):
+        """Body of {**fields, **lists}, each list in `lists` joined from cached fragments
+
+        `projections` optionally maps a list's key to the tuple of record keys to keep.
+        """
+        head = self.encode(fields)[1:-1]
+        members = [head] if head else []
+        misses = self.misses
+        total = 0
+        entries, encode = self._entries, self._encode
+        for key, records in lists.items():
+            projection = projections.get(key) if projections else None
+            parts = []
+            # fragment() inlined: the hit path is the whole cost of a warm render
+            for record in records:
+                entry = entries.get(id(record))
+                data = entry[1].get(projection) if entry is not None and entry[0] is record else None
+                parts.append(data if data is not None else encode(record, projection))
+            members.append(self.encode(key) + b':[' + b','.join(parts) + b']')
+            total += len(records)
+        self.hits += total - (self.misses - misses)
+        return b'{' + b','.join(members) + b'}'
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
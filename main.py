@@ -4,6 +4,30 @@ Tool-Ease CSV publishers
 Publishes all renter/owner scenario CSVs to AWS IoT Core on distinct topics.
 Compatible with the new UI routes and SSE subscriber.
 
+One publisher engine drives every topic:
+  - a single MQTT connection (or a small pool, PUBLISH_CONNECTIONS) shared by all topics
+  - each CSV is converted column-wise and serialized to JSON once, up front
+  - a token-bucket scheduler paces every topic at its own msgs/sec, under an optional global cap
+  - a throughput summary every PUBLISH_LOG_INTERVAL seconds instead of a line per message
+
+    python main.py                                   # every topic at its default rate
+    python main.py --rate telemetry=200 --global-rate 500
+    python main.py --only bookings,operator --connections 2
+
+Load generator (capacity tests):
+  - --replay N publishes the datasets by their ts_iso at N× wall-clock speed
+  - --tools/--bookings synthesize a scaled-up fleet from the CSVs, keeping bookings,
+    operator events, rentals and tools consistent with each other
+  - --sink local publishes to the in-process broker (transport.LocalBroker) instead of IoT Core.
+    Nothing subscribes to it, so every message is discarded: this measures only the publisher's
+    own overhead (payload generation, pacing, serialization), not ingest
+  - --sink server also runs server.py in this process, subscribed to that broker; the run fails
+    (exit status 1) if the server's ingest pipeline dropped or rejected any message it received
+
+    python main.py --replay 60                                    # the 15-hour scenario in 15 minutes
+    python main.py --tools 50000 --bookings 2000000 --sink local
+    python main.py --tools 5000 --replay 600 --sink server
+
 Folders expected:
   Certificates/
     AmazonRootCA1.pem
@@ -21,10 +45,10 @@ Folders expected:
     owner_geofence_breach.csv
 """
 
-import os, time, json, math, threading
+import os, sys, time, json, zlib, argparse, functools
+import numpy as np
 import pandas as pd
-from distutils.util import strtobool
-from AWSIoTPythonSDK.MQTTLib import AWSIoTMQTTClient
+from transport import AWSIoTTransport, LocalTransport, local_broker
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 🔧 AWS IoT Core Configuration  (use env vars if present; else defaults)
@@ -40,229 +64,658 @@ CERT_PATH = os.getenv("CERT_PATH", os.path.join(CERT_DIR, "device-cert.crt"))
 KEY_PATH  = os.getenv("KEY_PATH",  os.path.join(CERT_DIR, "private.pem.key"))
 
 # ──────────────────────────────────────────────────────────────────────────────
-# 🧰 Helpers
+# ⚙️ Publisher engine settings
+# ──────────────────────────────────────────────────────────────────────────────
+PUBLISH_CONNECTIONS  = int(os.getenv("PUBLISH_CONNECTIONS", "1"))         # MQTT connections shared by all topics
+PUBLISH_GLOBAL_RATE  = float(os.getenv("PUBLISH_GLOBAL_RATE", "0"))       # msgs/sec across all topics; 0 = no cap
+PUBLISH_LOG_INTERVAL = float(os.getenv("PUBLISH_LOG_INTERVAL", "10"))     # seconds between throughput summaries
+PUBLISH_ACK_TIMEOUT  = float(os.getenv("PUBLISH_ACK_TIMEOUT", "30"))      # wait this long for PUBACKs before exit
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 🧰 Column-wise conversions  (same rules the old per-row safe/to_int/to_float/to_bool applied)
+# ──────────────────────────────────────────────────────────────────────────────
+NULL_STRINGS = ("", "nan", "none", "null")
+BOOL_STRINGS = {**dict.fromkeys(("y", "yes", "t", "true", "on", "1"), True),
+                **dict.fromkeys(("n", "no", "f", "false", "off", "0"), False)}
+
+def col_str(s, default=None):
+    text = s.astype(str).str.strip().str.lower()
+    return s.astype(object).where(s.notna() & ~text.isin(NULL_STRINGS), default)
+
+def col_float(s, default=0.0):
+    # Non-numeric, NaN and ±inf all fall back to the default (NaN is not valid JSON)
+    values = pd.to_numeric(s.astype(str).str.strip(), errors="coerce").astype(float)
+    return values.where(np.isfinite(values), default)
+
+def col_int(s, default=0):
+    return np.trunc(col_float(s, np.nan)).fillna(default).astype("int64")
+
+def col_bool(s, default=False):
+    return s.astype(str).str.strip().str.lower().map(BOOL_STRINGS).fillna(default).astype(bool)
+
+def build_payloads(df, fields):
+    """Convert a CSV frame column by column and serialize every row to a JSON string.
+
+    fields: [(payload_key, converter, csv_column=payload_key, value_if_column_missing=None)]
+    """
+    columns = {}
+    for key, convert, *source in fields:
+        column = source[0] if source else key
+        missing = source[1] if len(source) > 1 else None
+        raw = df[column] if column in df.columns else pd.Series(missing, index=df.index, dtype=object)
+        columns[key] = convert(raw) if missing is None else convert(raw, missing)
+    if df.empty:
+        return []
+    out = pd.DataFrame(columns, index=df.index)
+    # ujson-backed, so this is one C pass instead of a json.dumps per row
+    return out.to_json(orient="records", lines=True, force_ascii=False, double_precision=15).rstrip("\n").split("\n")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 🪣 Rate limiting
+# ──────────────────────────────────────────────────────────────────────────────
+class TokenBucket:
+    """`rate` tokens/sec, banking at most `burst`; rate 0 means unlimited."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate or 0)
+        # Default burst is ~10 ms worth, so high rates don't need a wake-up per message
+        self.burst = burst or max(1.0, self.rate / 100)
+        self.tokens = 1.0
+        self.stamp = time.monotonic()
+
+    def wait(self, now):
+        """Seconds until a token is available (0 = send now)."""
+        if not self.rate:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.rate:
+            self.tokens -= 1
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 🔗 Shared MQTT connection pool
+# ──────────────────────────────────────────────────────────────────────────────
+class PublisherPool:
+    """A few transport connections shared by every topic; publishes round-robin with async QoS 1."""
+
+    def __init__(self, transports):
+        self.transports = list(transports)
+        self._next = 0
+        self.acked = 0
+
+    def connect(self):
+        print(f"[publisher] Connecting {len(self.transports)} MQTT connection(s)…")
+        for transport in self.transports:
+            transport.connect()
+        print(f"[publisher] 🔗 Connected → {self.transports[0].endpoint}")
+
+    def _on_ack(self, mid):
+        self.acked += 1
+
+    def publish(self, topic, payload):
+        transport = self.transports[self._next]
+        self._next = (self._next + 1) % len(self.transports)
+        transport.publish(topic, payload, 1, on_ack=self._on_ack)
+
+    def close(self, sent, timeout):
+        deadline = time.monotonic() + timeout
+        while self.acked < sent and time.monotonic() < deadline:
+            time.sleep(0.1)
+        for transport in self.transports:
+            transport.disconnect()
+
+def open_pool(kind, connections=PUBLISH_CONNECTIONS):
+    """'mqtt' → IoT Core connections; 'local' → one connection to the in-process broker."""
+    if kind == "local":
+        return PublisherPool([LocalTransport(f"{CLIENT_ID}-pub0")])
+    return PublisherPool(AWSIoTTransport(f"{CLIENT_ID}-pub{n}", ENDPOINT, CA_PATH, KEY_PATH, CERT_PATH)
+                         for n in range(max(1, connections)))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 📡 Scheduler
 # ──────────────────────────────────────────────────────────────────────────────
-def safe(v, default=None):
-    if v is None: return default
-    if isinstance(v, float) and math.isnan(v): return default
-    if isinstance(v, str) and v.strip().lower() in ("", "nan", "none", "null"):
-        return default
-    return v
-
-def to_int(v, default=0):
-    try: return int(float(v))
-    except Exception: return default
-
-def to_float(v, default=0.0):
-    try: return float(v)
-    except Exception: return default
-
-def to_bool(v, default=False):
-    if isinstance(v, bool): return v
-    try: return bool(strtobool(str(v)))
-    except Exception: return default
-
-def publish_csv(thread_name, topic, csv_path, transform, delay=0.8):
-    """Connect a dedicated MQTT client and publish each CSV row to a topic."""
-    if not os.path.exists(csv_path):
-        print(f"[{thread_name}] ⚠️ CSV not found: {csv_path}")
-        return
-
-    print(f"[{thread_name}] Loading {csv_path}")
-    df = pd.read_csv(csv_path, dtype=str)
-    print(f"[{thread_name}] ✅ Loaded {len(df)} rows")
-
-    client = AWSIoTMQTTClient(f"{CLIENT_ID}-{thread_name}")
-    client.configureEndpoint(ENDPOINT, 8883)
-    client.configureCredentials(CA_PATH, KEY_PATH, CERT_PATH)
-    client.configureAutoReconnectBackoffTime(1, 32, 20)
-    client.configureOfflinePublishQueueing(-1)
-    client.configureDrainingFrequency(2)
-    client.configureConnectDisconnectTimeout(10)
-    client.configureMQTTOperationTimeout(5)
-
-    print(f"[{thread_name}] Connecting MQTT…")
-    client.connect()
-    print(f"[{thread_name}] 🔗 Connected → {topic}")
-
-    sent = 0
-    for _, row in df.iterrows():
-        try:
-            payload = transform(row)
-            # ensure_ascii=False so names show correctly; allow_nan=False for clean JSON
-            client.publish(topic, json.dumps(payload, ensure_ascii=False, allow_nan=False), 1)
-            sent += 1
-            print(f"[{thread_name}] 📤 {topic} : {payload}")
-            time.sleep(delay)
-        except Exception as e:
-            print(f"[{thread_name}] ❌ Publish error: {e}")
-
-    client.disconnect()
-    print(f"[{thread_name}] ✅ Done. Published {sent} messages to {topic}")
+class Stream:
+    """One topic's pre-serialized payloads, when each is due and its rate limit.
+
+    items: (due, payload) pairs, due in seconds after the run starts (0 = as soon as the rate allows).
+    """
+
+    def __init__(self, name, topic, items, rate):
+        self.name = name
+        self.topic = topic
+        self.items = iter(items)
+        self.bucket = TokenBucket(rate)
+        self.head = None
+        self.sent = 0
+        self.errors = 0
+        self.lag = 0.0
+
+def untimed(payloads):
+    return ((0.0, payload) for payload in payloads)
+
+def run_streams(streams, sink, global_rate=0, log_interval=PUBLISH_LOG_INTERVAL):
+    """Publish every stream to completion from one thread, honouring per-topic and global rates."""
+    limit = TokenBucket(global_rate)
+    active = list(streams)
+    started = last_log = time.monotonic()
+    logged = 0
+
+    def summary(now, label="📊"):
+        total = sum(s.sent for s in streams)
+        window = max(now - last_log, 1e-9)
+        topics = "  ".join(f"{s.name}={s.sent}" for s in streams)
+        errors = sum(s.errors for s in streams)
+        lag = max((s.lag for s in streams), default=0.0)
+        print(f"[publisher] {label} {total} sent  {(total - logged) / window:,.1f} msg/s "
+              f"(avg {total / max(now - started, 1e-9):,.1f})  acked={getattr(sink, 'acked', total)}  "
+              f"errors={errors}" + (f"  behind={lag:.2f}s" if lag > 0.01 else "") + f"  |  {topics}")
+        return total
+
+    while active:
+        now = time.monotonic()
+        sleep_for = limit.wait(now)
+        if not sleep_for:
+            sleep_for = float("inf")
+            for stream in list(active):
+                if stream.head is None:
+                    stream.head = next(stream.items, None)
+                    if stream.head is None:
+                        active.remove(stream)
+                        continue
+                due = stream.head[0] - (now - started)
+                if due > 0:
+                    sleep_for = min(sleep_for, due)
+                    continue
+                wait = stream.bucket.wait(now)
+                if wait:
+                    sleep_for = min(sleep_for, wait)
+                    continue
+                if limit.wait(now):
+                    # Out of global tokens: resume from this stream next pass so topics share the cap fairly
+                    position = active.index(stream)
+                    active = active[position:] + active[:position]
+                    sleep_for = 0.0
+                    break
+                due, payload = stream.head
+                stream.head = None
+                try:
+                    sink.publish(stream.topic, payload)
+                    stream.sent += 1
+                    if due:
+                        stream.lag = (now - started) - due
+                except Exception as e:
+                    stream.errors += 1
+                    print(f"[{stream.name}] ❌ Publish error: {e}")
+                stream.bucket.take()
+                limit.take()
+                sleep_for = 0.0
+
+        if now - last_log >= log_interval:
+            logged, last_log = summary(now), now
+        if sleep_for and active:
+            time.sleep(min(sleep_for, max(0.0, last_log + log_interval - now)))
+
+    summary(time.monotonic(), "✅ Done.")
+    return sum(s.sent for s in streams)
 
 # ──────────────────────────────────────────────────────────────────────────────
-# 🚀 Threads (topics expected by the new UI)
+# 🚀 Publishers (topics expected by the new UI)
+#    name, topic, csv file, default msgs/sec, payload fields
 # ──────────────────────────────────────────────────────────────────────────────
-threads = [
+PUBLISHERS = [
 
     # RENTER SIDE
-    threading.Thread(target=publish_csv, args=(
-        "nearby",
-        "renter/nearby_tools",
-        os.path.join(DATA_DIR, "renter_nearby_tools.csv"),
-        lambda r: {
-            "toolid": safe(r["toolid"]),
-            "tool_type": safe(r["tool_type"]),
-            "latitude": to_float(r["latitude"]),
-            "longitude": to_float(r["longitude"]),
-            "rating": to_float(r["rating"]),
-            "availability": safe(r["availability"]),
-            "expected_available_iso": safe(r.get("expected_available_iso")),
-            "distance_km_from_user": to_float(r["distance_km_from_user"]),
-            "ts_iso": safe(r["ts_iso"])
-        }, 0.5)
-    ),
-
-    threading.Thread(target=publish_csv, args=(
-        "bookings",
-        "renter/bookings",
-        os.path.join(DATA_DIR, "renter_bookings.csv"),
-        lambda r: {
-            "booking_id": safe(r["booking_id"]),
-            "toolid": safe(r["toolid"]),
-            "renter_id": safe(r["renter_id"]),
-            "booked_iso": safe(r["booked_iso"]),
-            "start_iso": safe(r["start_iso"]),
-            "end_iso": safe(r["end_iso"]),
-            "operator_requested": to_bool(r["operator_requested"]),
-            "payment_status": safe(r["payment_status"]),
-            "cancel_status": safe(r["cancel_status"]),
-            "amount_inr": to_int(r["amount_inr"]),
-            "refund_inr": to_float(r["refund_inr"]),
-            "currency": safe(r.get("currency", "INR")),
-            "ts_iso": safe(r["ts_iso"])
-        }, 0.7)
-    ),
-
-    threading.Thread(target=publish_csv, args=(
-        "operator",
-        "renter/operator_events",
-        os.path.join(DATA_DIR, "renter_operator_events.csv"),
-        lambda r: {
-            "booking_id": safe(r["booking_id"]),
-            "toolid": safe(r["toolid"]),
-            "operator_assigned": to_bool(r["operator_assigned"]),
-            "operator_name": safe(r["operator_name"]),
-            "scheduled_iso": safe(r["scheduled_iso"]),
-            "arrival_iso": safe(r.get("arrival_iso")),
-            "arrival_status": safe(r["arrival_status"]),  # ON_TIME | LATE | ABSENT
-            "penalty_to_operator_inr": to_int(r["penalty_to_operator_inr"]),
-            "compensation_to_renter_inr": to_int(r["compensation_to_renter_inr"]),
-            "ts_iso": safe(r["ts_iso"])
-        }, 0.8)
-    ),
-
-    threading.Thread(target=publish_csv, args=(
-        "feedback",
-        "renter/feedback",
-        os.path.join(DATA_DIR, "renter_feedback.csv"),
-        lambda r: {
-            "rental_id": safe(r["rental_id"]),
-            "toolid": safe(r["toolid"]),
-            "renter_id": safe(r["renter_id"]),
-            "rating": to_float(r["rating"]),
-            "feedback": safe(r["feedback"]),
-            "returned_iso": safe(r["returned_iso"]),
-            "damage_flag": to_bool(r["damage_flag"]),
-            "ts_iso": safe(r["ts_iso"])
-        }, 0.8)
-    ),
-
-    threading.Thread(target=publish_csv, args=(
-        "issues",
-        "renter/issues",
-        os.path.join(DATA_DIR, "renter_issues.csv"),
-        lambda r: {
-            "rental_id": safe(r["rental_id"]),
-            "toolid": safe(r["toolid"]),
-            "issue_type": safe(r["issue_type"]),
-            "severity": safe(r["severity"]),
-            "notes": safe(r["notes"]),
-            "ts_iso": safe(r["ts_iso"])
-        }, 0.9)
-    ),
+    ("nearby", "renter/nearby_tools", "renter_nearby_tools.csv", 2.0, [
+        ("toolid", col_str),
+        ("tool_type", col_str),
+        ("latitude", col_float),
+        ("longitude", col_float),
+        ("rating", col_float),
+        ("availability", col_str),
+        ("expected_available_iso", col_str),
+        ("distance_km_from_user", col_float),
+        ("ts_iso", col_str),
+    ]),
+
+    ("bookings", "renter/bookings", "renter_bookings.csv", 1.4, [
+        ("booking_id", col_str),
+        ("toolid", col_str),
+        ("renter_id", col_str),
+        ("booked_iso", col_str),
+        ("start_iso", col_str),
+        ("end_iso", col_str),
+        ("operator_requested", col_bool),
+        ("payment_status", col_str),
+        ("cancel_status", col_str),
+        ("amount_inr", col_int),
+        ("refund_inr", col_float),
+        ("currency", col_str, "currency", "INR"),
+        ("ts_iso", col_str),
+    ]),
+
+    ("operator", "renter/operator_events", "renter_operator_events.csv", 1.25, [
+        ("booking_id", col_str),
+        ("toolid", col_str),
+        ("operator_assigned", col_bool),
+        ("operator_name", col_str),
+        ("scheduled_iso", col_str),
+        ("arrival_iso", col_str),
+        ("arrival_status", col_str),  # ON_TIME | LATE | ABSENT
+        ("penalty_to_operator_inr", col_int),
+        ("compensation_to_renter_inr", col_int),
+        ("ts_iso", col_str),
+    ]),
+
+    ("feedback", "renter/feedback", "renter_feedback.csv", 1.25, [
+        ("rental_id", col_str),
+        ("toolid", col_str),
+        ("renter_id", col_str),
+        ("rating", col_float),
+        ("feedback", col_str),
+        ("returned_iso", col_str),
+        ("damage_flag", col_bool),
+        ("ts_iso", col_str),
+    ]),
+
+    ("issues", "renter/issues", "renter_issues.csv", 1.1, [
+        ("rental_id", col_str),
+        ("toolid", col_str),
+        ("issue_type", col_str),
+        ("severity", col_str),
+        ("notes", col_str),
+        ("ts_iso", col_str),
+    ]),
 
     # OWNER SIDE
-    threading.Thread(target=publish_csv, args=(
-        "revenue",
-        "owner/revenue",
-        os.path.join(DATA_DIR, "owner_revenue.csv"),
-        lambda r: {
-            "toolid": safe(r["toolid"]),
-            "period_start_iso": safe(r["period_start_iso"]),
-            "period_end_iso": safe(r["period_end_iso"]),
-            "rentals_count": to_int(r["rentals_count"]),
-            "hours_rented": to_int(r["hours_rented"]),
-            "revenue_inr": to_float(r["revenue_inr"]),
-            "maintenance_cost_inr": to_float(r["maintenance_cost_inr"]),
-            "net_inr": to_float(r["net_inr"]),
-            "ts_iso": safe(r["ts_iso"])
-        }, 1.0)
-    ),
-
-    threading.Thread(target=publish_csv, args=(
-        "telemetry",
-        "tools/telemetry",
-        os.path.join(DATA_DIR, "owner_tool_status.csv"),
-        lambda r: {
-            "toolid": safe(r["toolid"]),
-            "owner_name": safe(r.get("owner_name")),
-            "temperature": to_float(r["temperature_c"]),
-            "vibration_rms": to_float(r["vibration_rms_g"]),
-            "sensor_id": safe(r["sensor_id"]),
-            "sensor_status": safe(r["sensor_status"]),
-            "hours_since_service": to_float(r["hours_since_service"]),
-            "ts_iso": safe(r["ts_iso"])
-        }, 0.5)
-    ),
-
-    threading.Thread(target=publish_csv, args=(
-        "late",
-        "tools/late_return",
-        os.path.join(DATA_DIR, "owner_late_returns.csv"),
-        lambda r: {
-            "rental_id": safe(r["rental_id"]),
-            "toolid": safe(r["toolid"]),
-            "expected_return_iso": safe(r["expected_return_iso"]),
-            "actual_return_iso": safe(r["actual_return_iso"]),
-            "overdue_hours": to_float(r["overdue_hours"]),
-            "extra_charge_inr": to_float(r["extra_charge_inr"]),
-            "rate_per_hour": to_int(r["rate_per_hour"]),
-            "ts_iso": safe(r["ts_iso"])
-        }, 0.9)
-    ),
-
-    threading.Thread(target=publish_csv, args=(
-        "geofence",
-        "tools/geofence",
-        os.path.join(DATA_DIR, "owner_geofence_breach.csv"),
-        lambda r: {
-            "toolid": safe(r["toolid"]),
-            "latitude": to_float(r["latitude"]),
-            "longitude": to_float(r["longitude"]),
-            "geofence_id": safe(r["geofence_id"]),
-            "breach_type": safe(r["breach_type"]),   # inside | exit
-            "distance_m": to_float(r.get("distance_m", 0)),
-            "ts_iso": safe(r["ts_iso"])
-        }, 1.0)
-    ),
+    ("revenue", "owner/revenue", "owner_revenue.csv", 1.0, [
+        ("toolid", col_str),
+        ("period_start_iso", col_str),
+        ("period_end_iso", col_str),
+        ("rentals_count", col_int),
+        ("hours_rented", col_int),
+        ("revenue_inr", col_float),
+        ("maintenance_cost_inr", col_float),
+        ("net_inr", col_float),
+        ("ts_iso", col_str),
+    ]),
+
+    ("telemetry", "tools/telemetry", "owner_tool_status.csv", 2.0, [
+        ("toolid", col_str),
+        ("owner_name", col_str),
+        ("temperature", col_float, "temperature_c"),
+        ("vibration_rms", col_float, "vibration_rms_g"),
+        ("sensor_id", col_str),
+        ("sensor_status", col_str),
+        ("hours_since_service", col_float),
+        ("ts_iso", col_str),
+    ]),
+
+    ("late", "tools/late_return", "owner_late_returns.csv", 1.1, [
+        ("rental_id", col_str),
+        ("toolid", col_str),
+        ("expected_return_iso", col_str),
+        ("actual_return_iso", col_str),
+        ("overdue_hours", col_float),
+        ("extra_charge_inr", col_float),
+        ("rate_per_hour", col_int),
+        ("ts_iso", col_str),
+    ]),
+
+    ("geofence", "tools/geofence", "owner_geofence_breach.csv", 1.0, [
+        ("toolid", col_str),
+        ("latitude", col_float),
+        ("longitude", col_float),
+        ("geofence_id", col_str),
+        ("breach_type", col_str),   # inside | exit
+        ("distance_m", col_float),
+        ("ts_iso", col_str),
+    ]),
 ]
 
+# ──────────────────────────────────────────────────────────────────────────────
+# 🧪 Load generator: N× replay and synthetic fleets
+# ──────────────────────────────────────────────────────────────────────────────
+LOADGEN_CHUNK = int(os.getenv("LOADGEN_CHUNK", "50000"))   # synthetic rows built (and held) per topic at a time
+LOADGEN_SEED  = int(os.getenv("LOADGEN_SEED", "7"))
+
+EPOCH = np.datetime64("1970-01-01T00:00:00", "s")
+
+def iso_seconds(s):
+    """ISO strings → seconds since the epoch (NaN where missing/unparseable)."""
+    ts = pd.to_datetime(s, errors="coerce")
+    return (ts - pd.Timestamp(0)).dt.total_seconds().to_numpy(dtype=float)
+
+def iso_strings(seconds):
+    """Seconds since the epoch → ISO strings in the CSVs' format (None where NaN)."""
+    seconds = np.asarray(seconds, dtype=float)
+    whole = np.nan_to_num(seconds).astype("int64").astype("timedelta64[s]")
+    out = np.datetime_as_string(EPOCH + whole, unit="s").astype(object)
+    out[np.isnan(seconds)] = None
+    return out
+
+def num(s):
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype=float)
+
+def make_ids(prefix, numbers, width):
+    return np.char.add(prefix, np.char.zfill(np.asarray(numbers).astype(str), width)).astype(object)
+
+def jitter(rng, values, pct=0.1):
+    return values * rng.uniform(1 - pct, 1 + pct, len(values))
+
+def read_sources():
+    frames = {}
+    for name, topic, filename, rate, fields in PUBLISHERS:
+        csv_path = os.path.join(DATA_DIR, filename)
+        if os.path.exists(csv_path):
+            frames[name] = pd.read_csv(csv_path, dtype=str)
+        else:
+            print(f"[{name}] ⚠️ CSV not found: {csv_path}")
+    return frames
+
+def clock_origin(frames):
+    """Earliest ts_iso across all datasets, so replayed topics keep their relative timing."""
+    stamps = np.concatenate([iso_seconds(df["ts_iso"]) for df in frames.values()] or [[np.nan]])
+    return (np.nanmin(stamps), np.nanmax(stamps)) if not np.isnan(stamps).all() else (0.0, 0.0)
+
+class SyntheticFleet:
+    """Scaled-up datasets perturbed from the scenario CSVs, with referential integrity.
+
+    Tool i is a jittered copy of source tool i % n; the per-tool topics (nearby,
+    telemetry, revenue, geofence) cycle through the fleet at the source's
+    rows-per-tool ratio. Every booking points at a fleet tool and renter, and
+    its operator event, rental feedback, issue and late return reuse that
+    booking's id, rental id, toolid and times. Rows are built in chunks seeded
+    by (seed, topic, chunk), so a dependent topic regenerates exactly the
+    bookings it refers to and memory stays at a few chunks per topic.
+    """
+
+    PER_TOOL = ("nearby", "telemetry", "revenue", "geofence")
+
+    def __init__(self, sources, tools, bookings=None, seed=LOADGEN_SEED, chunk=LOADGEN_CHUNK):
+        self.sources = {name: df.copy() for name, df in sources.items()}
+        self.tools = tools
+        self.seed = seed
+        self.chunk = chunk
+        self.t0, last = clock_origin(sources)
+        self.span = (last - self.t0) or 3600.0
+
+        source_tools = max(1, sources["nearby"]["toolid"].nunique())
+        self.counts = {name: int(round(tools * len(sources[name]) / source_tools)) for name in self.PER_TOOL}
+        self.bookings = bookings or int(round(tools * len(sources["bookings"]) / source_tools))
+        renters_per_booking = sources["bookings"]["renter_id"].nunique() / max(1, len(sources["bookings"]))
+        self.renters = max(1, int(round(self.bookings * renters_per_booking)))
+        self.issue_ratio = len(sources["issues"]) / max(1, len(sources["feedback"]))
+        self.late_ratio = min(1.0, len(sources["late"]) / max(1, len(sources["bookings"])))
+
+        # Source-row time offsets the synthetic rows keep (relative, so they move with the new timestamps)
+        bk = self.sources["bookings"]
+        bk["_lead"] = iso_seconds(bk["start_iso"]) - iso_seconds(bk["booked_iso"])
+        bk["_length"] = iso_seconds(bk["end_iso"]) - iso_seconds(bk["start_iso"])
+        op = self.sources["operator"]
+        op["_arrival_delay"] = iso_seconds(op["arrival_iso"]) - iso_seconds(op["scheduled_iso"])
+
+        # The fleet itself: ids T001… (source-compatible below 1000), type/location/rating/owner per tool
+        rng = self._rng("fleet", 0)
+        nearby = sources["nearby"]
+        template = np.arange(tools) % len(nearby)
+        self.toolids = make_ids("T", np.arange(1, tools + 1), 3)
+        self.tool_types = nearby["tool_type"].to_numpy(dtype=object)[template]
+        self.lat = np.round(num(nearby["latitude"])[template] + rng.normal(0, 0.02, tools), 6)
+        self.lon = np.round(num(nearby["longitude"])[template] + rng.normal(0, 0.02, tools), 6)
+        self.rating = np.round(np.clip(num(nearby["rating"])[template] + rng.normal(0, 0.3, tools), 1, 5), 1)
+        owners = sources["telemetry"]["owner_name"].dropna().unique()
+        self.owners = owners[np.arange(tools) % len(owners)] if len(owners) else np.full(tools, None)
+
+        self._booking_chunk = functools.lru_cache(maxsize=8)(self._make_booking_chunk)
+
+    def _rng(self, name, k):
+        return np.random.default_rng([self.seed, zlib.crc32(name.encode()), k])
+
+    def _template(self, name, rng, n):
+        src = self.sources[name]
+        return src.iloc[rng.integers(0, len(src), n)].reset_index(drop=True)
+
+    def total(self, name):
+        """Row count for a topic (an expected value for the sampled issues/late topics)."""
+        if name in self.counts:
+            return self.counts[name]
+        return int(self.bookings * {"issues": self.issue_ratio, "late": self.late_ratio}.get(name, 1))
+
+    def items(self, name, fields, speed=0):
+        """(due, payload) pairs for one topic, one chunk at a time."""
+        total = self.counts.get(name, self.bookings)
+        for k in range((total + self.chunk - 1) // self.chunk):
+            rows = np.arange(k * self.chunk, min((k + 1) * self.chunk, total))
+            if name in self.counts:
+                frame, offset = self._per_tool(name, k, rows, total)
+            else:
+                frame, offset = getattr(self, "_" + name)(k)
+            dues = offset / speed if speed else np.zeros(len(frame))
+            yield from zip(dues.tolist(), build_payloads(frame, fields))
+
+    # ---------- per-tool topics ----------
+
+    def _per_tool(self, name, k, rows, total):
+        rng = self._rng(name, k)
+        frame = self._template(name, rng, len(rows))
+        tool = rows % self.tools
+        offset = rows / total * self.span
+        frame["toolid"] = self.toolids[tool]
+        frame["ts_iso"] = iso_strings(self.t0 + offset)
+        if name == "nearby":
+            frame["tool_type"] = self.tool_types[tool]
+            frame["latitude"], frame["longitude"] = self.lat[tool], self.lon[tool]
+            frame["rating"] = self.rating[tool]
+            frame["distance_km_from_user"] = np.round(jitter(rng, num(frame["distance_km_from_user"]), 0.5), 2)
+        elif name == "telemetry":
+            frame["owner_name"] = self.owners[tool]
+            for column in ("temperature_c", "vibration_rms_g", "hours_since_service"):
+                frame[column] = np.round(jitter(rng, num(frame[column])), 2)
+        elif name == "revenue":
+            revenue = np.round(jitter(rng, num(frame["revenue_inr"]), 0.2), 2)
+            maintenance = np.round(jitter(rng, num(frame["maintenance_cost_inr"]), 0.2), 2)
+            frame["revenue_inr"], frame["maintenance_cost_inr"] = revenue, maintenance
+            frame["net_inr"] = np.round(revenue - maintenance, 2)
+            for column in ("rentals_count", "hours_rented"):
+                frame[column] = np.round(jitter(rng, num(frame[column]), 0.2))
+        elif name == "geofence":
+            frame["latitude"] = np.round(self.lat[tool] + rng.normal(0, 0.02, len(rows)), 6)
+            frame["longitude"] = np.round(self.lon[tool] + rng.normal(0, 0.02, len(rows)), 6)
+            frame["distance_m"] = np.round(jitter(rng, num(frame["distance_m"]), 0.3), 1)
+        return frame, offset
+
+    # ---------- bookings and the topics that reference them ----------
+
+    def _make_booking_chunk(self, k):
+        rows = np.arange(k * self.chunk, min((k + 1) * self.chunk, self.bookings))
+        n = len(rows)
+        rng = self._rng("bookings", k)
+        frame = self._template("bookings", rng, n)
+        booked = self.t0 + rows / self.bookings * self.span
+        start = booked + np.nan_to_num(frame["_lead"].to_numpy(dtype=float), nan=3600.0)
+        end = start + np.nan_to_num(frame["_length"].to_numpy(dtype=float), nan=3600.0)
+        factor = rng.uniform(0.8, 1.2, n)
+        frame["booking_id"] = make_ids("BK", rows + 1000, 4)
+        frame["rental_id"] = make_ids("RNT", rows + 1000, 4)
+        frame["toolid"] = self.toolids[rng.integers(0, self.tools, n)]
+        frame["renter_id"] = make_ids("R", rng.integers(1, self.renters + 1, n), 3)
+        frame["booked_iso"] = frame["ts_iso"] = iso_strings(booked)
+        frame["start_iso"], frame["end_iso"] = iso_strings(start), iso_strings(end)
+        frame["amount_inr"] = np.round(num(frame["amount_inr"]) * factor)
+        frame["refund_inr"] = np.round(num(frame["refund_inr"]) * factor, 2)
+        frame["_booked"], frame["_start"], frame["_end"] = booked, start, end
+        return frame
+
+    def _bookings(self, k):
+        b = self._booking_chunk(k)
+        return b, b["_booked"].to_numpy() - self.t0
+
+    def _operator(self, k):
+        b = self._booking_chunk(k)
+        frame = self._template("operator", self._rng("operator", k), len(b))
+        frame["booking_id"], frame["toolid"] = b["booking_id"].to_numpy(), b["toolid"].to_numpy()
+        scheduled = b["_start"].to_numpy()
+        frame["scheduled_iso"] = iso_strings(scheduled)
+        frame["arrival_iso"] = iso_strings(scheduled + frame["_arrival_delay"].to_numpy(dtype=float))
+        frame["ts_iso"] = b["ts_iso"].to_numpy()
+        return frame, b["_booked"].to_numpy() - self.t0
+
+    def _feedback(self, k):
+        b = self._booking_chunk(k)
+        frame = self._template("feedback", self._rng("feedback", k), len(b))
+        for column in ("rental_id", "toolid", "renter_id", "ts_iso"):
+            frame[column] = b[column].to_numpy()
+        frame["returned_iso"] = b["end_iso"].to_numpy()
+        return frame, b["_booked"].to_numpy() - self.t0
+
+    def _issues(self, k):
+        b = self._booking_chunk(k)
+        rng = self._rng("issues", k)
+        picked = b[rng.random(len(b)) < self.issue_ratio]
+        frame = self._template("issues", rng, len(picked))
+        for column in ("rental_id", "toolid", "ts_iso"):
+            frame[column] = picked[column].to_numpy()
+        return frame, picked["_booked"].to_numpy() - self.t0
+
+    def _late(self, k):
+        b = self._booking_chunk(k)
+        rng = self._rng("late", k)
+        picked = b[rng.random(len(b)) < self.late_ratio]
+        frame = self._template("late", rng, len(picked))
+        overdue = np.round(jitter(rng, num(frame["overdue_hours"]), 0.3), 1)
+        end = picked["_end"].to_numpy()
+        for column in ("rental_id", "toolid", "ts_iso"):
+            frame[column] = picked[column].to_numpy()
+        frame["expected_return_iso"] = picked["end_iso"].to_numpy()
+        frame["actual_return_iso"] = iso_strings(end + overdue * 3600)
+        frame["overdue_hours"] = overdue
+        frame["extra_charge_inr"] = np.round(overdue * num(frame["rate_per_hour"]), 2)
+        return frame, picked["_booked"].to_numpy() - self.t0
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 🏠 In-process server on the local broker
+# ──────────────────────────────────────────────────────────────────────────────
+def attach_server(timeout=30):
+    """Import server.py in this process with MQTT_TRANSPORT=local and wait until it has subscribed."""
+    os.environ["MQTT_TRANSPORT"] = "local"
+    os.chdir(ROOT_DIR)
+    sys.path.insert(0, ROOT_DIR)
+    import server
+    deadline = time.monotonic() + timeout
+    while server.mqtt_client is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return server
+
+def wait_for_ingest(server, timeout):
+    """Let the server's ingest pipeline finish what the run handed it, then report; returns its stats."""
+    pipeline = server.ingest_pipeline
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = pipeline.stats()
+        settled = sum(stats["applied"].values()) + stats["dropped"] + stats["invalid"] + stats["unknown_topic"]
+        if settled >= stats["received"] and not stats["queue_depth"] and not stats["decoded_depth"]:
+            break
+        time.sleep(0.1)
+    stats = pipeline.stats()
+    print(f"[server] 🧾 ingest {json.dumps(stats)}")
+    return stats
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 📦 Streams for a run
+# ──────────────────────────────────────────────────────────────────────────────
+def load_streams(rates=None, only=None, speed=0, tools=None, bookings=None, seed=LOADGEN_SEED):
+    """Build one Stream per selected publisher.
+
+    rates: msgs/sec overrides by name or topic. In replay or load-generator
+    mode the default rate is unlimited and `speed` paces by ts_iso instead.
+    tools: synthesize a fleet of that many tools instead of publishing the CSVs as-is.
+    """
+    rates = rates or {}
+    sources = read_sources()
+    fleet = SyntheticFleet(sources, tools, bookings, seed) if tools else None
+    t0, _ = clock_origin(sources)
+    pace = lambda rate: f"{speed:g}× replay" if speed else f"{rate or '∞'} msg/s"
+    streams = []
+    for name, topic, filename, rate, fields in PUBLISHERS:
+        if (only and name not in only and topic not in only) or name not in sources:
+            continue
+        rate = rates.get(name, rates.get(topic, 0 if (speed or fleet) else rate))
+        if fleet:
+            items = fleet.items(name, fields, speed)
+            print(f"[{name}] 🧪 Streaming ~{fleet.total(name):,} synthetic payloads → {topic} @ {pace(rate)}")
+        else:
+            started = time.perf_counter()
+            df = sources[name]
+            if speed:
+                seconds = iso_seconds(df["ts_iso"])
+                order = np.argsort(seconds, kind="stable")
+                df, dues = df.iloc[order], np.nan_to_num(seconds[order] - t0) / speed
+            else:
+                dues = np.zeros(len(df))
+            payloads = build_payloads(df, fields)
+            items = list(zip(dues.tolist(), payloads))
+            print(f"[{name}] ✅ Prepared {len(payloads)} payloads in {(time.perf_counter() - started) * 1000:.1f} ms "
+                  f"→ {topic} @ {pace(rate)}")
+        streams.append(Stream(name, topic, items, rate))
+    if fleet:
+        print(f"[loadgen] 🧪 {fleet.tools:,} tools, {fleet.bookings:,} bookings, {fleet.renters:,} renters "
+              f"(seed {seed}, built {fleet.chunk:,} rows at a time)")
+    return streams
+
+def parse_rates(pairs):
+    rates = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        rates[key.strip()] = float(value)
+    return rates
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 🏁 Run all publishers
 # ──────────────────────────────────────────────────────────────────────────────
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", action="append", metavar="NAME=MSGS",
+                        help="per-topic msgs/sec by publisher name or topic (0 = unlimited); repeatable")
+    parser.add_argument("--global-rate", type=float, default=PUBLISH_GLOBAL_RATE, help="msgs/sec across all topics")
+    parser.add_argument("--only", help="comma-separated publisher names or topics")
+    parser.add_argument("--replay", type=float, default=0, metavar="SPEED",
+                        help="pace messages by their ts_iso at SPEED× wall-clock")
+    parser.add_argument("--tools", type=int, help="load generator: synthesize a fleet of this many tools")
+    parser.add_argument("--bookings", type=int, help="synthetic bookings (default: the CSVs' bookings-per-tool ratio)")
+    parser.add_argument("--seed", type=int, default=LOADGEN_SEED)
+    parser.add_argument("--sink", choices=("mqtt", "local", "server"), default="mqtt",
+                        help="IoT Core; the in-process broker with no subscriber (publisher overhead only); "
+                             "or that broker feeding an in-process server.py")
+    parser.add_argument("--connections", type=int, default=PUBLISH_CONNECTIONS)
+    parser.add_argument("--log-interval", type=float, default=PUBLISH_LOG_INTERVAL)
+    args = parser.parse_args()
+
     print("🚀 Starting Tool-Ease CSV → IoT Core publishers…")
-    for t in threads: t.start()
-    for t in threads: t.join()
+    streams = load_streams(parse_rates(args.rate), set(args.only.split(",")) if args.only else None,
+                           args.replay, args.tools, args.bookings, args.seed)
+    server = attach_server() if args.sink == "server" else None
+    pool = open_pool("mqtt" if args.sink == "mqtt" else "local", args.connections)
+    pool.connect()
+    sent = run_streams(streams, pool, args.global_rate, args.log_interval)
+    pool.close(sent, PUBLISH_ACK_TIMEOUT)
+    if args.sink != "mqtt":
+        print(f"[publisher] 🏠 local broker {json.dumps(local_broker().stats())}")
+    if args.sink == "local":
+        print("[publisher] ℹ No subscriber on the local broker: messages were discarded, only publishing was measured")
+    if server:
+        stats = wait_for_ingest(server, PUBLISH_ACK_TIMEOUT)
+        applied = sum(stats["applied"].values())
+        if applied < stats["received"]:
+            print(f"❌ Server applied {applied:,} of {stats['received']:,} messages received "
+                  f"({sent - stats['received']:,} more were on topics it does not subscribe to): "
+                  f"{stats['dropped']:,} dropped by ingest "
+                  f"backpressure, {stats['invalid']:,} invalid, {stats['unknown_topic']:,} on unknown topics, "
+                  f"{stats['apply_errors']:,} failed to apply")
+            sys.exit(1)
     print("✅ All CSVs published.")
+
+if __name__ == "__main__":
+    main()
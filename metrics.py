@@ -0,0 +1,175 @@
+"""
+Prometheus text-format metrics without a client library.
+
+Two kinds of instruments:
+
+  Counter, Histogram   updated on the hot path. inc() is one dict update,
+                       observe() a bisect over the bucket bounds plus three
+                       adds; neither takes a lock (the GIL keeps the dicts
+                       consistent, and a rare lost increment under contention
+                       is an acceptable error for monitoring). Both stay well
+                       under a microsecond per event.
+  collectors           functions run only at scrape time that read state the
+                       server already keeps (queue depths, collection sizes,
+                       pool usage) and yield Family tuples, so nothing is
+                       mirrored or updated per event.
+
+Registry.render() produces the text exposition format (version 0.0.4) that
+/metrics serves.
+"""
+
+import math
+import time
+from bisect import bisect_left
+from collections import deque, namedtuple
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers 304s and index lookups at the low end and full listings/logins at the top
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# One metric family produced by a collector: samples are (labels dict, value)
+Family = namedtuple('Family', 'name kind help samples')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def lines(self):
+        for labels, value in list(self._values.items()):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+    """Bucketed distribution per label combination (non-cumulative internally, cumulative on render)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            # [per-bucket counts (+Inf last), sum]
+            series = self._series.setdefault(labels, [[0] * (len(self.bounds) + 1), 0.0])
+        series[0][bisect_left(self.bounds, value)] += 1
+        series[1] += value
+
+    def lines(self):
+        for labels, (counts, total) in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.bounds, math.inf), list(counts)):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, (("le", _number(bound)),))} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+class RateWindow:
+    """Per-second rates of growing counts over roughly the last `window` seconds of scrapes
+
+    Prometheus derives rates from counters itself; this is for the JSON stats
+    and anyone reading /metrics by eye. The first scrape reports 0.
+    """
+
+    def __init__(self, window=10.0):
+        self.window = window
+        self._samples = deque()
+
+    def rates(self, counts, now=None):
+        now = time.monotonic() if now is None else now
+        counts = dict(counts)
+        self._samples.append((now, counts))
+        # Keep the newest sample that is at least `window` old as the reference point
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+        then, previous = self._samples[0]
+        elapsed = now - then
+        if elapsed <= 0:
+            return dict.fromkeys(counts, 0.0)
+        return {key: (value - previous.get(key, 0)) / elapsed for key, value in counts.items()}
+
+
+class Registry:
+    """Instruments and scrape-time collectors rendered together by render()"""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self._instruments = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        instrument = Counter(self.prefix + name, help, labelnames)
+        self._instruments.append(instrument)
+        return instrument
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        instrument = Histogram(self.prefix + name, help, labelnames, buckets)
+        self._instruments.append(instrument)
+        return instrument
+
+    def collector(self, fn):
+        """Register fn() -> iterable of Family; usable as a decorator"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        out = []
+        for instrument in self._instruments:
+            out.append(f'# HELP {instrument.name} {instrument.help}')
+            out.append(f'# TYPE {instrument.name} {instrument.kind}')
+            out.extend(instrument.lines())
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                # One broken collector must not take the whole scrape down
+                out.append(f'# collector {getattr(collect, "__name__", collect)} failed: {_escape(e)}')
+                continue
+            for family in families:
+                name = self.prefix + family.name
+                out.append(f'# HELP {name} {family.help}')
+                out.append(f'# TYPE {name} {family.kind}')
+                for labels, value in family.samples:
+                    out.append(f'{name}{_labels(labels.keys(), labels.values()) if labels else ""} {_number(value)}')
+        out.append('')
+        return '\n'.join(out)
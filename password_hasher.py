@@ -0,0 +1,128 @@
+"""
+Password hashing off the request threads.
+
+werkzeug's KDFs are deliberately slow (tens of ms of CPU per call), so a
+login burst run inline would occupy every request thread and starve the
+SSE streams and polling APIs. PasswordHasher runs them in a small process
+pool instead and bounds how many may be waiting: past `max_pending`
+callers get HasherBusy immediately, which the routes turn into a 503 with
+Retry-After rather than an ever-growing backlog.
+
+workers=0 keeps the old inline behaviour, which is mostly useful as the
+baseline in benchmarks/login_latency.py.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Too many hash/verify jobs already queued"""
+
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _verify(stored_hash, password):
+    return check_password_hash(stored_hash, password)
+
+
+def hash_params(stored_hash):
+    """The method/parameter prefix of a werkzeug hash, e.g. 'scrypt:32768:8:1'"""
+    return stored_hash.split('$', 1)[0]
+
+
+class PasswordHasher:
+    """Bounded process pool for generate/check_password_hash"""
+
+    def __init__(self, method='scrypt', salt_length=16, workers=2, max_pending=64, timeout=10.0):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.rejected = 0
+        self.rehashed = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        if workers:
+            # Construct this before the server starts its threads: with fork the pool starts every
+            # worker on the first submit below, and spawn/forkserver would re-import server.py
+            # (MQTT client, event log and all) in each worker
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        # werkzeug expands short names ('scrypt', 'pbkdf2') with its defaults; learn the full form once
+        self.params = hash_params(self._result(self._submit(_hash, '', method, salt_length)))
+
+    def _submit(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy()
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _result(self, job):
+        return job if self._executor is None else job.result(timeout=self.timeout)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def hash(self, password):
+        """Hash with the configured parameters; raises HasherBusy when the queue is full"""
+        return self._result(self._submit(_hash, password, self.method, self.salt_length))
+
+    def verify(self, stored_hash, password):
+        """check_password_hash on the pool; raises HasherBusy when the queue is full"""
+        return self._result(self._submit(_verify, stored_hash, password))
+
+    def needs_rehash(self, stored_hash):
+        """True when `stored_hash` was made with another method, other parameters or another salt length"""
+        parts = stored_hash.split('$')
+        return len(parts) != 3 or parts[0] != self.params or len(parts[1]) != self.salt_length
+
+    def rehash_later(self, password, on_hash):
+        """Hash `password` in the background and hand the result to on_hash(new_hash)
+
+        Best-effort: if the pool is saturated the upgrade is simply retried on
+        the user's next login.
+        """
+        try:
+            job = self._submit(_hash, password, self.method, self.salt_length)
+        except HasherBusy:
+            return False
+        if self._executor is None:
+            on_hash(job)
+        else:
+            job.add_done_callback(lambda done: done.exception() is None and on_hash(done.result()))
+        self.rehashed += 1
+        return True
+
+    def stats(self):
+        return {
+            'method': self.params,
+            'workers': self.workers,
+            'pending': self._pending,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected,
+            'rehashed': self.rehashed
+        }
@@ -0,0 +1,165 @@
+"""
+Opt-in per-request profiling with flame-graph (collapsed stack) export.
+
+A request is profiled when it carries the secret header (X-Profile-Token)
+or wins a `sample_rate` coin toss. For that request only, a sys.setprofile
+hook on its own thread records every Python and C call from the view down
+and charges each call's self time to its full stack. Deterministic tracing
+rather than a sampling thread: a sampler needs the GIL to look at the
+request thread, so on a small box it would hardly ever land inside a
+millisecond-long view.
+
+Finished requests are merged per route into one in-memory table of
+stack -> seconds, bounded by `max_stacks` per route. collapsed() renders it
+in the folded format flamegraph.pl, speedscope and inferno read:
+
+    GET /api/renter/feedback;renter_feedback (server.py:1392);lookup (event_store.py:143) 412
+
+(the weight is microseconds of self time). Tracing slows the profiled
+request itself several-fold, so compare stacks with each other, not with
+production latencies. Each worker process keeps its own table.
+
+When neither a sample rate nor a secret is configured, install() is never
+called and no hook runs at all.
+"""
+
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+
+PROFILE_HEADER = 'X-Profile-Token'
+TRUNCATED = '(truncated)'
+
+
+class StackTracer:
+    """sys.setprofile callback accumulating self time per call stack on one thread"""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.path = []
+        self._started = []
+        self._children = []
+        self._labels = {}
+        self.self_time = Counter()
+
+    def _label(self, frame, event, arg):
+        if event == 'call':
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = \
+                    f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            return label
+        module = getattr(arg, '__module__', None)
+        name = getattr(arg, '__qualname__', None) or repr(arg)
+        return f'{module}.{name}' if module else name
+
+    def __call__(self, frame, event, arg):
+        now = self.clock()
+        if event == 'call' or event == 'c_call':
+            self.path.append(self._label(frame, event, arg))
+            self._started.append(now)
+            self._children.append(0.0)
+        elif self.path:
+            # Returns from frames entered before the hook was set have no matching call; ignore them
+            elapsed = now - self._started.pop()
+            self.self_time[tuple(self.path)] += elapsed - self._children.pop()
+            self.path.pop()
+            if self._children:
+                self._children[-1] += elapsed
+
+
+class RequestProfiler:
+    """Picks requests to trace and aggregates their stacks per route"""
+
+    def __init__(self, sample_rate=0.0, secret='', max_stacks=20000):
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.max_stacks = max_stacks
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 or bool(self.secret)
+
+    def authorized(self, token):
+        return bool(self.secret) and token is not None and hmac.compare_digest(token, self.secret)
+
+    def install(self, app, exclude=('/debug/profile',)):
+        """Register the before/teardown hooks on a Flask app"""
+        from flask import request
+
+        @app.before_request
+        def start_profile():
+            if request.path in exclude:
+                return
+            if self.authorized(request.headers.get(PROFILE_HEADER)) or random.random() < self.sample_rate:
+                self.start()
+
+        @app.teardown_request
+        def stop_profile(exc=None):
+            rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            self.stop(f'{request.method} {rule}')
+
+    # ---------- per request ----------
+
+    def start(self):
+        tracer = StackTracer()
+        self._local.tracer = tracer
+        self._local.started = time.perf_counter()
+        sys.setprofile(tracer)
+
+    def stop(self, route):
+        tracer = getattr(self._local, 'tracer', None)
+        if tracer is None:
+            return
+        sys.setprofile(None)
+        elapsed = time.perf_counter() - self._local.started
+        self._local.tracer = None
+        self._merge(route, tracer.self_time, elapsed)
+
+    def _merge(self, route, self_time, elapsed):
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {'requests': 0, 'seconds': 0.0, 'stacks': Counter()}
+            entry['requests'] += 1
+            entry['seconds'] += elapsed
+            stacks = entry['stacks']
+            for stack, seconds in self_time.items():
+                if stack not in stacks and len(stacks) >= self.max_stacks:
+                    stack = (TRUNCATED,)
+                stacks[stack] += seconds
+
+    # ---------- export ----------
+
+    def summary(self):
+        with self._lock:
+            return {
+                route: {
+                    'requests': entry['requests'],
+                    'avg_ms': round(entry['seconds'] / entry['requests'] * 1000, 3),
+                    'stacks': len(entry['stacks'])
+                }
+                for route, entry in self._routes.items()
+            }
+
+    def collapsed(self, route=None):
+        """Folded stacks, `route;frame;frame microseconds` per line, heaviest first"""
+        with self._lock:
+            rows = [(f'{name};' + ';'.join(stack), seconds)
+                    for name, entry in self._routes.items() if route is None or name == route
+                    for stack, seconds in entry['stacks'].items()]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return ''.join(f'{stack} {max(1, round(seconds * 1e6))}\n' for stack, seconds in rows)
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
@@ -0,0 +1,313 @@
+"""
+Streaming rollups: owner revenue per tool x day and operator earnings per
+operator x day.
+
+Revenue counters are updated as bookings, revenue statements and late
+returns arrive, so owner revenue pages read precomputed aggregates in
+O(days x tools) no matter how many bookings have been recorded.
+
+Attribution rules:
+  - a paid booking counts its amount less refunds on its start day, plus one
+    rental and its rented hours unless it was cancelled
+  - a revenue statement counts its totals and maintenance cost on the day
+    its period starts
+  - a late return adds its extra charge to revenue on the actual return day
+"""
+
+import threading
+from collections import defaultdict
+from datetime import datetime, date
+
+
+COUNTERS = ('rentals_count', 'hours', 'revenue_inr', 'maintenance_cost_inr', 'net_inr')
+
+
+def _day(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).date()
+    except ValueError:
+        return None
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if number != number else number
+
+
+def _hours_between(start, end):
+    try:
+        start = datetime.fromisoformat(str(start).replace('Z', '+00:00'))
+        end = datetime.fromisoformat(str(end).replace('Z', '+00:00'))
+    except ValueError:
+        return 0.0
+    return max((end - start).total_seconds() / 3600, 0.0)
+
+
+def _empty():
+    return dict.fromkeys(COUNTERS, 0.0)
+
+
+def booking_contribution(booking):
+    """(toolid, day, amounts) a booking adds to the revenue rollup, or None"""
+    start = booking.get('rental_start_iso') or booking.get('start_iso')
+    end = booking.get('rental_end_iso') or booking.get('end_iso')
+    if booking.get('payment_status') not in (None, 'SUCCESS'):
+        return None
+    completed = booking.get('cancel_status') in (None, 'NONE')
+    revenue = _number(booking.get('amount_inr')) - _number(booking.get('refund_inr'))
+    return booking.get('toolid'), _day(start or booking.get('booked_iso')), {
+        'rentals_count': 1 if completed else 0,
+        'hours': _hours_between(start, end) if completed and start and end else 0.0,
+        'revenue_inr': revenue
+    }
+
+
+def statement_contribution(statement):
+    return statement.get('toolid'), _day(statement.get('period_start_iso')), {
+        'rentals_count': _number(statement.get('rentals_count')),
+        'hours': _number(statement.get('hours_rented')),
+        'revenue_inr': _number(statement.get('revenue_inr')),
+        'maintenance_cost_inr': _number(statement.get('maintenance_cost_inr'))
+    }
+
+
+def late_return_contribution(late_return):
+    return late_return.get('toolid'), _day(late_return.get('actual_return_iso')), {
+        'revenue_inr': _number(late_return.get('extra_charge_inr'))
+    }
+
+
+class RevenueRollup:
+    """Running per-day counters for every tool, summed per owner when read
+
+    Owners are looked up through `owner_of` at read time rather than when a
+    record is counted, so revenue that arrives before its tool is registered
+    (or while a restore is still loading new_tools) is still credited to the
+    right owner.
+
+    listener(contribution) gives an EventCollection listener that counts each
+    record through `contribution` (one of the *_contribution functions above)
+    and remembers what it added, so an updated record is re-counted and a
+    deleted one taken back out. A record that merely ages out of the
+    in-memory window stays counted; those amounts are also kept apart in
+    retired(), which goes into snapshots so they survive a restart.
+    """
+
+    def __init__(self, owner_of):
+        self.owner_of = owner_of
+        self._by_tool = defaultdict(_empty)
+        self._tool_ids = set()
+        self._contributions = {}
+        self._retired = defaultdict(_empty)
+        self._lock = threading.Lock()
+
+    def listener(self, contribution):
+        def on_event(action, record):
+            self._on_event(action, record, contribution)
+        return on_event
+
+    def _on_event(self, action, record, contribution):
+        key = id(record)
+        with self._lock:
+            old = self._contributions.pop(key, None)
+            if action == 'expire':
+                if old:
+                    self._add(self._retired, [old[:2]], old[2])
+                return
+            if old:
+                self._apply(*old, -1)
+            if action == 'delete':
+                return
+            tool_id, day, amounts = contribution(record) or (None, None, None)
+            if tool_id is None or day is None:
+                return
+            counted = (tool_id, day, amounts)
+            self._contributions[key] = counted
+            self._apply(*counted, 1)
+
+    def _apply(self, tool_id, day, amounts, sign):
+        self._tool_ids.add(tool_id)
+        self._add(self._by_tool, [(tool_id, day)], amounts, sign)
+
+    @staticmethod
+    def _add(table, keys, amounts, sign=1):
+        for key in keys:
+            counters = table[key]
+            for name, amount in amounts.items():
+                counters[name] += sign * amount
+            counters['net_inr'] = counters['revenue_inr'] - counters['maintenance_cost_inr']
+
+    def retired(self):
+        """[[toolid, day ISO, counters]] of records that aged out of the window, for a snapshot"""
+        with self._lock:
+            return [[tool_id, day.isoformat(), dict(counters)] for (tool_id, day), counters in self._retired.items()]
+
+    def restore_retired(self, rows):
+        """Count a snapshot's retired() rows again; call before the collections are loaded"""
+        with self._lock:
+            for row in rows or ():
+                # Older snapshots also carry the owner, as [toolid, owner, day ISO, counters]
+                tool_id, day, counters = row[0], row[-2], row[-1]
+                key = (tool_id, date.fromisoformat(day))
+                amounts = {name: counters.get(name, 0.0) for name in COUNTERS if name != 'net_inr'}
+                self._add(self._retired, [key], amounts)
+                self._apply(*key, amounts, 1)
+
+    def tool_day(self, tool_id, day):
+        with self._lock:
+            counters = self._by_tool.get((tool_id, day))
+            return dict(counters) if counters else _empty()
+
+    def owner_day(self, owner, day):
+        return self.owner_days(owner, [day])[0][1]
+
+    def tool_days(self, tool_ids, days):
+        """[(tool_id, day, counters)] for every tool x day in the window, zero-filled"""
+        return [(tool_id, day, self.tool_day(tool_id, day)) for tool_id in tool_ids for day in days]
+
+    def owner_days(self, owner, days):
+        """[(day, counters)] summed over the tools `owner_of` currently maps to `owner`"""
+        with self._lock:
+            tool_ids = [tool_id for tool_id in self._tool_ids if self.owner_of(tool_id) == owner]
+            result = []
+            for day in days:
+                totals = _empty()
+                for tool_id in tool_ids:
+                    counters = self._by_tool.get((tool_id, day))
+                    if counters:
+                        for name in COUNTERS:
+                            totals[name] += counters[name]
+                result.append((day, totals))
+            return result
+
+
+def day_range(end, days):
+    """The `days` calendar days ending at `end` (a date), newest first"""
+    end = end if isinstance(end, date) else date.today()
+    return [date.fromordinal(end.toordinal() - offset) for offset in range(days)]
+
+
+# ==================== OPERATOR EARNINGS ====================
+
+
+BASE_PAYOUT_INR = 350
+LATE_PENALTY_SHARE = 0.3
+
+LEDGER_COUNTERS = ('jobs', 'pending', 'on_time', 'late', 'earnings')
+
+
+def operator_payout(event):
+    """What an operator earns for one event: flat fee, less a share of renter compensation if late"""
+    status = event.get('arrival_status')
+    if status == 'ON_TIME':
+        return BASE_PAYOUT_INR
+    if status == 'LATE':
+        return max(0, BASE_PAYOUT_INR - _number(event.get('compensation_to_renter_inr')) * LATE_PENALTY_SHARE)
+    return 0
+
+
+def _ledger_empty():
+    return dict.fromkeys(LEDGER_COUNTERS, 0)
+
+
+class EarningsLedger:
+    """Per-operator earnings and on-time/late counts in day buckets
+
+    Registered as an EventCollection listener on operator_events. Each event's
+    contribution is remembered, so accepts, arrival-status changes and
+    rejections adjust the buckets in O(1). Events that merely age out of the
+    in-memory window keep counting; their part is also kept in retired(),
+    which goes into snapshots so that history survives a restart.
+    """
+
+    def __init__(self):
+        self._contributions = {}
+        self._days = defaultdict(lambda: defaultdict(_ledger_empty))
+        self._totals = defaultdict(_ledger_empty)
+        self._retired = defaultdict(_ledger_empty)
+        self._lock = threading.Lock()
+
+    def on_event(self, action, event):
+        key = id(event)
+        with self._lock:
+            old = self._contributions.pop(key, None)
+            if action == 'expire':
+                # History stays; only a still-open job stops counting as pending
+                if old:
+                    if old[2]['pending']:
+                        self._apply(old[0], old[1], {'pending': 1}, -1)
+                    retired = self._retired[old[:2]]
+                    for name, amount in old[2].items():
+                        retired[name] += 0 if name == 'pending' else amount
+                return
+            if old:
+                self._apply(*old, -1)
+            if action == 'delete':
+                return
+            contribution = self._contribution(event)
+            if contribution:
+                self._contributions[key] = contribution
+                self._apply(*contribution, 1)
+
+    def _contribution(self, event):
+        operator = event.get('operator_name')
+        if not operator:
+            return None
+        status = event.get('arrival_status')
+        day = (_day(event.get('arrival_iso')) or _day(event.get('accepted_iso'))
+               or _day(event.get('scheduled_iso')) or _day(event.get('expected_arrival_iso'))
+               or _day(event.get('ts_iso')) or date.today())
+        amounts = {
+            'jobs': 1,
+            'pending': 0 if event.get('arrival_iso') else 1,
+            'on_time': 1 if status == 'ON_TIME' else 0,
+            'late': 1 if status == 'LATE' else 0,
+            'earnings': operator_payout(event)
+        }
+        return operator, day, amounts
+
+    def _apply(self, operator, day, amounts, sign):
+        bucket = self._days[operator][day]
+        totals = self._totals[operator]
+        for name, amount in amounts.items():
+            bucket[name] += sign * amount
+            totals[name] += sign * amount
+
+    def retired(self):
+        """[[operator, day ISO, counters]] of events that aged out of the window, for a snapshot"""
+        with self._lock:
+            return [[operator, day.isoformat(), dict(counters)] for (operator, day), counters in self._retired.items()]
+
+    def restore_retired(self, rows):
+        """Count a snapshot's retired() rows again; call before operator_events is loaded"""
+        with self._lock:
+            for operator, day, counters in rows or ():
+                key = (operator, date.fromisoformat(day))
+                amounts = {name: counters.get(name, 0) for name in LEDGER_COUNTERS}
+                retired = self._retired[key]
+                for name, amount in amounts.items():
+                    retired[name] += amount
+                self._apply(*key, amounts, 1)
+
+    def totals(self, operator):
+        with self._lock:
+            return dict(self._totals.get(operator) or _ledger_empty())
+
+    def window(self, operator, start, end):
+        """Counters summed over calendar days start..end inclusive; O(days), independent of job count"""
+        result = _ledger_empty()
+        with self._lock:
+            days = self._days.get(operator)
+            if not days:
+                return result
+            for ordinal in range(start.toordinal(), end.toordinal() + 1):
+                bucket = days.get(date.fromordinal(ordinal))
+                if bucket:
+                    for name in LEDGER_COUNTERS:
+                        result[name] += bucket[name]
+        return result
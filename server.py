@@ -1,15 +1,40 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, g, send_from_directory, abort
 import pandas as pd
 import os
 from datetime import datetime, timedelta
 import json
+import math
+import mimetypes
 import secrets
+import hashlib
+import base64
+import heapq
 import threading
 import time
 import random
+import signal
 from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
-from AWSIoTPythonSDK.MQTTLib import AWSIoTMQTTClient
+from operator import itemgetter
+from event_store import EventCollection, sequence
+from event_log import EventLog
+from state_backend import LocalBackend, SQLiteBackend
+from user_store import UserStore, DuplicateUserError
+from password_hasher import PasswordHasher, HasherBusy
+from tool_registry import ToolRegistry
+from sse_broker import SSEBroker
+from ingest_pipeline import IngestPipeline
+from geofence_engine import GeofenceEngine, INSIDE, UNKNOWN
+from timeseries_store import TimeSeriesStore
+from rollups import (RevenueRollup, EarningsLedger, day_range, booking_contribution, statement_contribution,
+                     late_return_contribution)
+from transport import create_transport
+from metrics import Registry, Family, RateWindow, CONTENT_TYPE
+from structured_log import configure_logging, get_logger
+from profiler import RequestProfiler, PROFILE_HEADER
+from json_fragments import FragmentCache, make_encoder
+from http_compression import ResponseCompressor, SUFFIXES
+from static_assets import AssetManifest, build as build_assets
+from image_pipeline import ImagePipeline
 
 
 app = Flask(__name__)
@@ -17,65 +42,128 @@ app.secret_key = secrets.token_hex(32)
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
 
 
-# ==================== USER DATABASE ====================
+# ==================== LOGGING ====================
 
 
-users_db = {}
-USERS_FILE = 'static/data/users.json'
+# Request handlers log through `log`; DEBUG carries the per-request detail, INFO the state changes
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
 
+configure_logging(LOG_LEVEL, LOG_FORMAT)
+log = get_logger('toolease.api')
+
+
+# ==================== STATIC ASSETS ====================
+
+
+# 'build' hashes static/ into static/dist at startup (incremental), 'manifest' only reads the output
+# of a deploy-time `python static_assets.py`, 'off' serves the plain /static URLs
+STATIC_ASSETS = os.getenv('STATIC_ASSETS', 'build')
+ASSET_URL_PATH = '/assets'
+ASSET_DIST_DIR = os.path.join(app.static_folder, 'dist')
+# Hashed names never change content, so browsers may keep them for a year without revalidating
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+if STATIC_ASSETS == 'build':
+    asset_manifest = AssetManifest(build_assets(app.static_folder, ASSET_DIST_DIR))
+elif STATIC_ASSETS == 'manifest':
+    asset_manifest = AssetManifest.load(ASSET_DIST_DIR)
+else:
+    asset_manifest = AssetManifest()
+
+if STATIC_ASSETS != 'off':
+    log.info('static_assets', mode=STATIC_ASSETS, assets=len(asset_manifest))
 
-def load_users():
-    global users_db
-    if os.path.exists(USERS_FILE):
-        try:
-            with open(USERS_FILE, 'r') as f:
-                users_db = json.load(f)
-            print(f"✓ Loaded {len(users_db)} existing users")
-        except Exception as e:
-            print(f"Error loading users: {e}")
-            users_db = {}
-    else:
-        users_db = {}
 
+@app.template_global()
+def asset_url(filename):
+    """Hashed, immutable URL of a static file when the build has it, else its plain /static URL"""
+    path = asset_manifest.path(filename)
+    return f'{ASSET_URL_PATH}/{path}' if path else f'{app.static_url_path}/{filename}'
 
-def save_users():
+
+# ==================== IMAGE DERIVATIVES ====================
+
+
+# Resized AVIF/WebP/JPEG copies of the catalog images for srcset, cached on disk by content hash
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', 'var/images')
+IMAGE_URL_PATH = '/img'
+IMAGE_WIDTHS = [int(w) for w in os.getenv('IMAGE_WIDTHS', '160,320,640').split(',') if w.strip()]
+IMAGE_FORMATS = [f.strip() for f in os.getenv('IMAGE_FORMATS', 'avif,webp').split(',') if f.strip()]
+
+image_pipeline = ImagePipeline(IMAGE_CACHE_DIR, IMAGE_URL_PATH, IMAGE_WIDTHS, IMAGE_FORMATS)
+
+if not image_pipeline.enabled:
+    log.warning('image_derivatives_disabled', reason='Pillow is not installed; serving full-size images')
+
+
+def image_set(filename):
+    """srcset-ready derivatives of an image under static/, or just its static URL if they cannot be made"""
     try:
-        os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users_db, f, indent=2)
-    except Exception as e:
-        print(f"Error saving users: {e}")
+        return image_pipeline.image_set(os.path.join(app.static_folder, filename), asset_url(filename))
+    except OSError as e:
+        log.warning('image_derivatives_failed', image=filename, error=str(e))
+        return {'src': asset_url(filename)}
+
+
+# ==================== USER DATABASE ====================
+
+
+# Legacy whole-file store; imported into USER_DB_PATH once on first start
+USERS_FILE = 'static/data/users.json'
+USER_DB_PATH = os.getenv('USER_DB_PATH', 'var/users.db')
+
+users_db = UserStore(USER_DB_PATH)
 
+migrated = users_db.migrate_from_json(USERS_FILE)
+if migrated:
+    print(f"✓ Migrated {migrated} users from {USERS_FILE} into {USER_DB_PATH}")
 
-load_users()
+# Changing the method or salt length upgrades stored hashes as users next log in
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+# Built before any server thread starts so the pool can fork its workers safely
+password_hasher = PasswordHasher(PASSWORD_HASH_METHOD, salt_length=PASSWORD_SALT_LENGTH,
+                                 workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING,
+                                 timeout=PASSWORD_HASH_TIMEOUT)
 
 
 # ==================== DATA STORAGE ====================
 
 
 DATA_DIR = 'static/data/'
-realtime_data = {
-    'nearby_tools': [],
-    'bookings': [],
-    'operator_events': [],
-    'feedback': [],
-    'issues': [],
-    'revenue': [],
-    'tool_status': [],
-    'late_returns': [],
-    'geofence': []
+MAX_EVENTS_PER_TYPE = 1000
+
+# Secondary indexes kept per event type; every renter/operator lookup goes through these
+EVENT_INDEXES = {
+    'nearby_tools': ('toolid',),
+    'bookings': ('booking_id', 'renter_id'),
+    'operator_events': ('booking_id', 'operator_name'),
+    'feedback': ('rentalid', 'renterid'),
+    'issues': (),
+    'revenue': (),
+    'tool_status': (),
+    'late_returns': (),
+    'geofence': ()
 }
 
+realtime_data = {key: EventCollection(key, indexes) for key, indexes in EVENT_INDEXES.items()}
 
-new_bookings = []
-new_tools = []
 
+# Tools added by owners through /api/owner/add-tool
+new_tools = EventCollection('new_tools', ('toolid', 'added_by'))
 
-sse_queues = {
-    'owner': [],
-    'renter': [],
-    'operator': []
-}
+
+SSE_ROLES = ('owner', 'renter', 'operator')
+SSE_BUFFER_SIZE = 256
+SSE_HISTORY_SIZE = 1000
+SSE_KEEPALIVE_SECONDS = 15
+
+sse_broker = SSEBroker(SSE_ROLES, buffer_size=SSE_BUFFER_SIZE, history_size=SSE_HISTORY_SIZE)
 
 
 # ==================== AWS IOT CONFIGURATION ====================
@@ -96,6 +184,18 @@ TOPICS = {
     'geofence': 'toolease/owner/geofence_breach'
 }
 
+# Extra topics carrying the same payloads as a canonical TOPICS entry
+TOPIC_ALIASES = {
+    'tools/geofence': TOPICS['geofence'],
+    'tools/telemetry': TOPICS['tool_status'],
+    # Topics published by main.py
+    'renter/nearby_tools': TOPICS['nearby_tools'],
+    'renter/bookings': TOPICS['bookings'],
+    'renter/operator_events': TOPICS['operator_events'],
+    'owner/revenue': TOPICS['revenue'],
+    'tools/late_return': TOPICS['late_returns']
+}
+
 
 OWNER_TOOL_MAP = {
     "T001": "Prathap", "T002": "Agnick", "T003": "Dev", "T004": "Lasya",
@@ -113,70 +213,279 @@ TOOL_CATALOG = {
     "Floor Sanders": {"hourly_rate": 80, "daily_rate": 500}
 }
 
-# Tool images mapping (add after TOOL_CATALOG)
+# Tool images mapping (add after TOOL_CATALOG): srcset-ready derivative sets, see IMAGE DERIVATIVES
 TOOL_IMAGES = {
-    "Drill": "/static/images/tools/drill.png",
-    "CNC Laser Cutter": "/static/images/tools/cnc-laser.png",
-    "Plasma Cutter": "/static/images/tools/plasma-cutter.png",
-    "Mini Excavator": "/static/images/tools/excavator.png",
-    "Lathe": "/static/images/tools/lathe.png",
-    "Floor Sanders": "/static/images/tools/floor-sander.png"
+    "Drill": image_set("images/tools/drill.png"),
+    "CNC Laser Cutter": image_set("images/tools/cnc-laser.png"),
+    "Plasma Cutter": image_set("images/tools/plasma-cutter.png"),
+    "Mini Excavator": image_set("images/tools/excavator.png"),
+    "Lathe": image_set("images/tools/lathe.png"),
+    "Floor Sanders": image_set("images/tools/floor-sander.png")
 }
 
-# ==================== MQTT CALLBACKS ====================
 
+# ==================== TOOL REGISTRY ====================
 
-def on_message_callback(client, userdata, message):
+
+tool_registry = ToolRegistry(TOOL_CATALOG, TOOL_IMAGES, default_image=TOOL_IMAGES['Drill'])
+
+DEFAULT_SEARCH_RADIUS_KM = 25
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 500
+# Larger radii are clamped: a spatial query's work grows with the area it covers
+MAX_SEARCH_RADIUS_KM = 200
+
+
+def attach_tool_info(record, unknown_type='Tool'):
+    """Copy registry tool_type/tool_name onto a booking, feedback or operator record"""
+    info = tool_registry.info(record.get('toolid'))
+    if info:
+        return fragment_cache.set_fields(record, {'tool_type': info['tool_type'], 'tool_name': info['tool_name']})
+    return fragment_cache.set_fields(record, {'tool_type': unknown_type, 'tool_name': 'Tool'})
+
+# ==================== GEOFENCE ENGINE ====================
+
+
+GEOFENCE_TICK_SECONDS = 5
+
+geofence_engine = GeofenceEngine()
+
+
+def register_geofence(tool):
+    """Track a tool's fence (if it has one) and current position in the engine"""
+    if tool.get('geo_radius_m') is not None:
+        geofence_engine.set_fence(tool['toolid'], tool.get('geo_center_lat', tool['latitude']),
+                                  tool.get('geo_center_lng', tool['longitude']), tool['geo_radius_m'])
+    geofence_engine.update_position(tool['toolid'], tool.get('latitude'), tool.get('longitude'))
+
+
+def publish_geofence_transitions():
+    for transition in geofence_engine.evaluate():
+        log.info('geofence_transition', tool_id=transition['toolid'], breach_type=transition['breach_type'],
+                 distance_m=transition['distance_m'])
+        # Every worker evaluates its own engine, so transitions are not broadcast
+        notify_clients('geofence_transition', transition, local=True)
+
+
+def geofence_tick():
+    while True:
+        time.sleep(GEOFENCE_TICK_SECONDS)
+        try:
+            publish_geofence_transitions()
+        except Exception:
+            log.exception('geofence_evaluation_failed')
+
+
+geofence_thread = threading.Thread(target=geofence_tick, daemon=True)
+geofence_thread.start()
+
+
+# ==================== TELEMETRY STORE ====================
+
+
+# Store metric -> payload fields it may arrive as (MQTT publisher names first, then CSV columns)
+TELEMETRY_FIELDS = {
+    'temperature': ('temperature', 'temperature_c'),
+    'vibration_rms': ('vibration_rms', 'vibration_rms_g'),
+    'hours_since_service': ('hours_since_service',)
+}
+TELEMETRY_CAPACITY = int(os.getenv('TELEMETRY_CAPACITY', 3 * 24 * 3600))
+
+telemetry_store = TimeSeriesStore(TELEMETRY_FIELDS, capacity=TELEMETRY_CAPACITY)
+live_telemetry_tools = set()
+
+
+def parse_iso_ts(value):
     try:
-        topic = message.topic
-        payload = json.loads(message.payload.decode('utf-8'))
-        
-        for key, topic_name in TOPICS.items():
-            if topic == topic_name:
-                realtime_data[key].append(payload)
-                if len(realtime_data[key]) > 1000:
-                    realtime_data[key] = realtime_data[key][-1000:]
-                notify_clients(key, payload)
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def record_telemetry(payload, simulated=False):
+    tool_id = payload.get('toolid')
+    ts = parse_iso_ts(payload.get('ts_iso')) if payload.get('ts_iso') else time.time()
+    if not tool_id or ts is None:
+        return False
+    values = {}
+    for metric, fields in TELEMETRY_FIELDS.items():
+        for field in fields:
+            value = payload.get(field)
+            if value is not None:
+                try:
+                    values[metric] = float(value)
+                except (TypeError, ValueError):
+                    pass
                 break
-    except Exception as e:
-        print(f"Error processing message: {e}")
+    if not simulated:
+        live_telemetry_tools.add(tool_id)
+    return telemetry_store.append(tool_id, ts, values)
+
+
+# Owner-added tools without a sensor feed get a simulated reading at most this often. Readings live
+# in this overlay (temperature history also in telemetry_store), never in new_tools or the registry,
+# so polling the owner dashboard does not bump the versions other endpoints' ETags are built from
+SIMULATED_TELEMETRY_SECONDS = float(os.getenv('SIMULATED_TELEMETRY_SECONDS', 5))
+
+sensor_overlay = {}
+sensor_overlay_lock = threading.Lock()
+
+
+def sensor_readings(tool):
+    """{'temperature_c', 'voltage_v', 'vibration_hz', 'ts_iso'} for an owner tool: live MQTT telemetry
+    where it has arrived, otherwise the current simulated reading"""
+    tool_id = tool['toolid']
+    now = time.time()
+    live = telemetry_store.latest(tool_id) if tool_id in live_telemetry_tools else None
+    with sensor_overlay_lock:
+        reading = sensor_overlay.get(tool_id)
+        fresh = reading is None or now - reading['ts'] >= SIMULATED_TELEMETRY_SECONDS
+        if fresh:
+            previous = reading or tool
+            reading = sensor_overlay[tool_id] = {
+                'ts': now,
+                'temperature_c': round(previous.get('temperature_c', 25) + random.uniform(-3, 3), 2),
+                'voltage_v': round(previous.get('voltage_v', 230) + random.uniform(-2, 2), 1),
+                'vibration_hz': round(random.uniform(20, 60), 1)
+            }
+    
+    if live and live['temperature'] is not None:
+        return {'temperature_c': live['temperature'], 'voltage_v': reading['voltage_v'],
+                'vibration_hz': reading['vibration_hz'], 'ts_iso': datetime.fromtimestamp(live['ts']).isoformat()}
+    if fresh:
+        # Keep the simulated history like real telemetry
+        record_telemetry({'toolid': tool_id, 'temperature': reading['temperature_c']}, simulated=True)
+    return {'temperature_c': reading['temperature_c'], 'voltage_v': reading['voltage_v'],
+            'vibration_hz': reading['vibration_hz'], 'ts_iso': datetime.fromtimestamp(reading['ts']).isoformat()}
+
+
+# ==================== REVENUE ROLLUPS ====================
+
+
+MAX_REVENUE_DAYS = 366
+
+revenue_rollup = RevenueRollup(OWNER_TOOL_MAP.get)
+
+earnings_ledger = EarningsLedger()
+realtime_data['operator_events'].add_listener(earnings_ledger.on_event)
+
+ROLLUP_HANDLERS = {
+    'bookings': booking_contribution,
+    'revenue': statement_contribution,
+    'late_returns': late_return_contribution
+}
+
+
+# ==================== DERIVED STATE ====================
+
+
+# Registry, fences, telemetry and rollups follow the collections through listeners, so they
+# update the same way for local writes, log replay at boot and other workers' writes
+
+
+def on_nearby_tool(action, tool):
+    if action == 'insert':
+        tool_registry.upsert(tool)
+        geofence_engine.update_position(tool.get('toolid'), tool.get('latitude'), tool.get('longitude'))
 
 
-def notify_clients(data_type, payload):
+def on_new_tool(action, tool):
+    if action == 'insert':
+        tool_registry.upsert(tool)
+        OWNER_TOOL_MAP[tool['toolid']] = tool.get('added_by')
+        register_geofence(tool)
+
+
+def on_tool_status(action, sample):
+    if action == 'insert':
+        record_telemetry(sample)
+
+
+def on_geofence_report(action, report):
+    if action == 'insert':
+        geofence_engine.update_position(report.get('toolid'), report.get('latitude'), report.get('longitude'))
+
+
+realtime_data['nearby_tools'].add_listener(on_nearby_tool)
+new_tools.add_listener(on_new_tool)
+realtime_data['tool_status'].add_listener(on_tool_status)
+realtime_data['geofence'].add_listener(on_geofence_report)
+for key, contribution in ROLLUP_HANDLERS.items():
+    realtime_data[key].add_listener(revenue_rollup.listener(contribution))
+
+
+# ==================== MQTT CALLBACKS ====================
+
+
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 10000))
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 256))
+
+# Every subscribed topic (canonical and alias) -> realtime_data key, for O(1) dispatch
+TOPIC_KEYS = {topic_name: key for key, topic_name in TOPICS.items()}
+TOPIC_KEYS.update({alias: TOPIC_KEYS[topic_name] for alias, topic_name in TOPIC_ALIASES.items()})
+
+# Fields a payload must carry to be stored; anything else is counted as invalid and dropped
+INGEST_REQUIRED_FIELDS = {key: ('toolid',) for key in TOPICS}
+INGEST_REQUIRED_FIELDS['bookings'] = ('toolid', 'booking_id')
+INGEST_REQUIRED_FIELDS['operator_events'] = ('toolid', 'booking_id')
+
+
+def apply_ingest_batch(key, payloads):
+    collection = realtime_data[key]
+    # One write section per batch: a single journal transaction, one trim, then the notifications
+    with state_backend.writing():
+        collection.extend(payloads)
+        collection.trim(MAX_EVENTS_PER_TYPE)
+        for payload in payloads:
+            notify_clients(key, payload)
+    if key == 'geofence':
+        publish_geofence_transitions()
+
+
+ingest_pipeline = IngestPipeline(TOPIC_KEYS, apply_ingest_batch, INGEST_REQUIRED_FIELDS,
+                                 queue_size=INGEST_QUEUE_SIZE, batch_size=INGEST_BATCH_SIZE)
+
+
+def on_message_callback(client, userdata, message):
+    # Runs on the AWS IoT SDK's network thread, which also services keepalives: hand off only
+    ingest_pipeline.submit(message.topic, message.payload)
+
+
+def notify_clients(data_type, payload, local=False):
+    """Push a dashboard event to SSE clients of every worker (or only this one's if `local`)"""
     event = {
         'type': data_type,
         'data': payload,
         'timestamp': datetime.now().isoformat()
     }
-    for role in sse_queues:
-        sse_queues[role].append(event)
+    if local:
+        sse_broker.publish(event)
+    else:
+        state_backend.broadcast(event)
 
 
 # ==================== MQTT SETUP ====================
 
 
+# 'aws' for IoT Core; 'local' for the in-process broker (offline runs and benchmarks/e2e_latency.py)
+MQTT_TRANSPORT = os.getenv('MQTT_TRANSPORT', 'aws')
+
+
 def setup_mqtt_client():
     try:
-        mqtt_client = AWSIoTMQTTClient(CLIENT_ID)
-        mqtt_client.configureEndpoint(IOT_ENDPOINT, 8883)
-        mqtt_client.configureCredentials(
+        mqtt_client = create_transport(
+            MQTT_TRANSPORT, CLIENT_ID, IOT_ENDPOINT,
             os.path.join(CERT_DIR, "AmazonRootCA1.pem"),
             os.path.join(CERT_DIR, "private.pem.key"),
             os.path.join(CERT_DIR, "device-cert.crt")
         )
         
-        mqtt_client.configureAutoReconnectBackoffTime(1, 32, 20)
-        mqtt_client.configureOfflinePublishQueueing(-1)
-        mqtt_client.configureDrainingFrequency(2)
-        mqtt_client.configureConnectDisconnectTimeout(10)
-        mqtt_client.configureMQTTOperationTimeout(5)
-        
-        print("Connecting to AWS IoT Core...")
+        print(f"Connecting to MQTT ({MQTT_TRANSPORT}: {mqtt_client.endpoint})...")
         mqtt_client.connect()
-        print("✓ Connected to AWS IoT Core!")
+        print("✓ Connected to MQTT!")
         
-        for topic_name in TOPICS.values():
-            mqtt_client.subscribe(topic_name, 1, on_message_callback)
+        for topic_name in list(TOPICS.values()) + list(TOPIC_ALIASES):
+            mqtt_client.subscribe(topic_name, on_message_callback)
             print(f"✓ Subscribed to {topic_name}")
         
         return mqtt_client
@@ -185,14 +494,33 @@ def setup_mqtt_client():
         return None
 
 
+MQTT_LEASE_SECONDS = 15
+MQTT_RETRY_SECONDS = 30
+
 mqtt_client = None
-def start_mqtt_thread():
-    global mqtt_client
-    mqtt_client = setup_mqtt_client()
 
 
-mqtt_thread = threading.Thread(target=start_mqtt_thread, daemon=True)
-mqtt_thread.start()
+def mqtt_ingest_loop():
+    """Hold the 'mqtt-ingest' lease and keep one MQTT connection open only while we do
+
+    With a shared state backend exactly one worker ingests; the others see
+    its writes through the backend and take over if its lease lapses.
+    """
+    global mqtt_client
+    next_attempt = 0
+    while True:
+        try:
+            if state_backend.acquire_lease('mqtt-ingest', MQTT_LEASE_SECONDS):
+                if mqtt_client is None and time.time() >= next_attempt:
+                    mqtt_client = setup_mqtt_client()
+                    next_attempt = time.time() + MQTT_RETRY_SECONDS
+            elif mqtt_client is not None:
+                log.warning('mqtt_lease_lost', action='disconnecting')
+                mqtt_client.disconnect()
+                mqtt_client = None
+        except Exception:
+            log.exception('mqtt_supervisor_failed')
+        time.sleep(MQTT_LEASE_SECONDS / 3)
 
 
 # ==================== LOAD CSV DATA ====================
@@ -219,11 +547,11 @@ def load_csv_data():
             if os.path.exists(filepath):
                 df = pd.read_csv(filepath)
                 df = df.where(pd.notnull(df), None)
-                realtime_data[key] = df.to_dict('records')
+                realtime_data[key].replace_all(df.to_dict('records'))
                 print(f"✓ Loaded {len(realtime_data[key])} records from {filename}")
             else:
                 print(f"⚠ File not found: {filename}")
-                realtime_data[key] = []
+                realtime_data[key].replace_all([])
         
         print(f"\n✓ Total tools loaded: {len(realtime_data['nearby_tools'])}")
         print(f"✓ Total bookings loaded: {len(realtime_data['bookings'])}")
@@ -232,9 +560,6 @@ def load_csv_data():
         print(f"❌ Error loading CSV data: {e}")
 
 
-load_csv_data()
-
-
 # ==================== GENERATE TEST DATA ====================
 
 
@@ -283,7 +608,135 @@ def generate_completed_assignments():
         print(f"Sample event: Booking {sample['booking_id']}, Status: {sample.get('arrival_status')}")
 
 
-generate_completed_assignments()
+# ==================== STATE BACKEND ====================
+
+
+# 'local': this process only, durable through the event log below
+# 'sqlite': shared by every worker process on the host (see state_backend.py)
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'local')
+STATE_DB_PATH = os.getenv('STATE_DB_PATH', 'var/state.db')
+STATE_POLL_SECONDS = float(os.getenv('STATE_POLL_SECONDS', 0.05))
+SNAPSHOT_LEASE_SECONDS = 60
+
+EVENT_LOG_DIR = os.getenv('EVENT_LOG_DIR', 'var/eventlog')
+EVENT_LOG_FSYNC = os.getenv('EVENT_LOG_FSYNC', 'interval')
+EVENT_LOG_FSYNC_INTERVAL = float(os.getenv('EVENT_LOG_FSYNC_INTERVAL', 1.0))
+EVENT_LOG_SEGMENT_BYTES = int(os.getenv('EVENT_LOG_SEGMENT_BYTES', 16 * 1024 * 1024))
+SNAPSHOT_EVERY_ENTRIES = int(os.getenv('SNAPSHOT_EVERY_ENTRIES', 50000))
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv('SNAPSHOT_MAX_AGE_SECONDS', 600))
+
+# With debug=True, `python server.py` first runs as the reloader's file watcher,
+# which only spawns the real server; it must not open the log the server will own
+RELOADER_WATCHER = __name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+
+# new_tools first: restoring it fills OWNER_TOOL_MAP and the registry before the records that refer to its tools
+durable_collections = {'new_tools': new_tools, **realtime_data}
+
+
+def capture_state():
+    state = {name: [dict(record) for record in collection] for name, collection in durable_collections.items()}
+    # The rollups keep counting records trimmed out of the collections; the snapshot is their only copy
+    state['retired_rollups'] = {'revenue': revenue_rollup.retired(), 'earnings': earnings_ledger.retired()}
+    return state
+
+
+def create_state_backend():
+    if RELOADER_WATCHER:
+        return LocalBackend()
+    if STATE_BACKEND == 'sqlite':
+        return SQLiteBackend(STATE_DB_PATH, notification_backlog=SSE_HISTORY_SIZE)
+    try:
+        return LocalBackend(EventLog(EVENT_LOG_DIR, segment_bytes=EVENT_LOG_SEGMENT_BYTES,
+                                     fsync=EVENT_LOG_FSYNC, fsync_interval=EVENT_LOG_FSYNC_INTERVAL))
+    except Exception as e:
+        print(f"❌ Event log unavailable, state will not survive a restart: {e}")
+        return LocalBackend()
+
+
+def apply_remote_entry(entry):
+    durable_collections[entry['c']].replay(entry)
+
+
+def on_stale_worker(position, compacted):
+    # Catching up from here would need a full reload; let the process manager restart us cleanly
+    print(f"❌ Worker fell behind the shared log (at {position}, compacted through {compacted}); restarting")
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+state_backend = create_state_backend()
+state_backend.bind(apply_remote_entry, lambda event, event_id: sse_broker.publish(event, event_id=event_id),
+                   on_stale=on_stale_worker)
+
+if state_backend.shared and not os.getenv('SECRET_KEY'):
+    # Sessions must validate on whichever worker serves the next request
+    app.secret_key = state_backend.setting('secret_key', lambda: secrets.token_hex(32))
+
+
+def seed_state():
+    load_csv_data()
+    generate_completed_assignments()
+
+
+def restore_state():
+    """Load the newest snapshot (or the CSV seed data) and replay the log tail"""
+    started = time.time()
+    snapshot, tail = state_backend.recover(seed_state, capture_state)
+    if snapshot is not None:
+        retired = snapshot.get('retired_rollups') or {}
+        revenue_rollup.restore_retired(retired.get('revenue'))
+        earnings_ledger.restore_retired(retired.get('earnings'))
+        for name, collection in durable_collections.items():
+            if name in snapshot:
+                collection.replace_all(snapshot[name])
+    for entry in tail:
+        durable_collections[entry['c']].replay(entry)
+    
+    if not state_backend.durable:
+        return
+    for collection in durable_collections.values():
+        collection.attach_journal(state_backend)
+    if (snapshot is None or tail) and state_backend.acquire_lease('snapshot', SNAPSHOT_LEASE_SECONDS):
+        state_backend.snapshot(capture_state)
+    print(f"✓ Restored state ({len(tail)} log entries replayed) in {time.time() - started:.2f}s")
+
+
+def durability_tick():
+    while True:
+        time.sleep(EVENT_LOG_FSYNC_INTERVAL)
+        try:
+            state_backend.sync()
+            pending = state_backend.entries_since_snapshot
+            age = time.time() - (state_backend.snapshot_at or 0)
+            due = pending >= SNAPSHOT_EVERY_ENTRIES or (pending and age >= SNAPSHOT_MAX_AGE_SECONDS)
+            if due and state_backend.acquire_lease('snapshot', SNAPSHOT_LEASE_SECONDS):
+                log.info('snapshot_written', position=state_backend.snapshot(capture_state))
+        except Exception:
+            log.exception('event_log_maintenance_failed')
+
+
+def state_sync_loop():
+    while True:
+        time.sleep(STATE_POLL_SECONDS)
+        try:
+            state_backend.poll()
+        except Exception:
+            log.exception('state_sync_failed')
+
+
+restore_state()
+
+if state_backend.durable:
+    durability_thread = threading.Thread(target=durability_tick, daemon=True)
+    durability_thread.start()
+
+if state_backend.shared:
+    state_sync_thread = threading.Thread(target=state_sync_loop, daemon=True)
+    state_sync_thread.start()
+
+if not RELOADER_WATCHER:
+    ingest_pipeline.start()
+    mqtt_thread = threading.Thread(target=mqtt_ingest_loop, daemon=True)
+    mqtt_thread.start()
 
 
 # ==================== AUTHENTICATION DECORATOR ====================
@@ -302,6 +755,350 @@ def login_required(role=None):
     return decorator
 
 
+# ==================== DELTA SYNC ====================
+
+
+def get_since_cursor():
+    """Parse the optional ?since=<cursor> query parameter of list APIs
+
+    Cursors from another worker or an earlier run of this one are ignored,
+    so the client gets the full list and a cursor valid here.
+    """
+    since = request.args.get('since')
+    if since is None:
+        return None
+    return sequence.parse(since)
+
+
+def collect_changes(changelog, since, in_scope, visible=None):
+    """Split changes after `since` into (changed records, deleted keys) for one view
+
+    Records outside `in_scope` are ignored; in-scope records that were removed,
+    or no longer pass `visible`, come back as tombstones. Returns None when the
+    caller has to send the full list instead (no cursor, or cursor too old).
+    """
+    if since is None:
+        return None
+    entries = changelog.since(since)
+    if entries is None:
+        return None
+    changed, deleted = [], []
+    for key, record, was_deleted in entries:
+        if not in_scope(record):
+            continue
+        if was_deleted or (visible and not visible(record)):
+            deleted.append(key)
+        else:
+            changed.append(record)
+    return changed, deleted
+
+
+def sync_fields(cursor, delta):
+    return {'cursor': sequence.cursor(cursor), 'delta': delta is not None, 'deleted': delta[1] if delta else []}
+
+
+# ==================== PAGINATION ====================
+
+
+# List APIs take ?limit=&cursor= (keyset pages over the sort keys below, so a page boundary never
+# shifts when records are added), ?order=asc|desc and ?fields=a,b to trim each record. Without
+# limit/cursor they return the whole list as before; `cursor` here is the page token from
+# next_cursor, not the delta-sync cursor sent back as ?since=
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# Sort keys per record kind; together they identify a record, so every page boundary is exact
+PAGE_KEYS = {
+    'tools': ('toolid',),
+    'bookings': ('booked_iso', 'booking_id'),
+    'operator_events': ('operator_assigned_iso', 'booking_id', 'operator_name'),
+    'feedback': ('tsiso', 'rentalid')
+}
+
+
+class InvalidListQuery(ValueError):
+    """Malformed list or search parameter (limit, cursor, order, fields, lat/lng, radius_km)"""
+
+
+@app.errorhandler(InvalidListQuery)
+def invalid_list_query(e):
+    return jsonify({'success': False, 'error': str(e)}), 400
+
+
+def page_key(record, key_fields):
+    return tuple('' if record.get(field) is None else str(record.get(field)) for field in key_fields)
+
+
+def encode_page_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_page_cursor(token, key_fields):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        raise InvalidListQuery('Invalid cursor')
+    if not isinstance(key, list) or len(key) != len(key_fields) or not all(isinstance(v, str) for v in key):
+        raise InvalidListQuery('Invalid cursor')
+    return tuple(key)
+
+
+def paginate(records, key_fields):
+    """Apply ?limit, ?cursor and ?order to `records`; returns (page, next_cursor or None)"""
+    limit = request.args.get('limit')
+    token = request.args.get('cursor')
+    order = request.args.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        raise InvalidListQuery("order must be 'asc' or 'desc'")
+    if limit is None and not token:
+        return records, None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_LIMIT
+    except ValueError:
+        raise InvalidListQuery('limit must be an integer')
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise InvalidListQuery(f'limit must be between 1 and {MAX_PAGE_LIMIT}')
+    descending = order == 'desc'
+    
+    keyed = ((page_key(record, key_fields), record) for record in records)
+    if token:
+        after = decode_page_cursor(token, key_fields)
+        keyed = (item for item in keyed if (item[0] < after if descending else item[0] > after))
+    # One pass with a limit-sized heap instead of sorting the whole list
+    page = (heapq.nlargest if descending else heapq.nsmallest)(limit + 1, keyed, key=itemgetter(0))
+    next_cursor = encode_page_cursor(page[limit - 1][0]) if len(page) > limit else None
+    return [record for _, record in page[:limit]], next_cursor
+
+
+def get_projection(key_fields):
+    """?fields=a,b as a tuple of record keys (always including the sort keys), or None for everything"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    if not all(name.isidentifier() for name in names):
+        raise InvalidListQuery('fields must be a comma-separated list of field names')
+    return tuple(dict.fromkeys([*key_fields, *names]))
+
+
+def number_arg(name, default=None, convert=float):
+    """?name= as a finite number, `default` when absent; anything else is a 400"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = convert(value)
+    except ValueError:
+        raise InvalidListQuery(f'{name} must be a number')
+    if not math.isfinite(number):
+        raise InvalidListQuery(f'{name} must be a finite number')
+    return number
+
+
+def project(records, projection):
+    """Trimmed copies for records that are not served through the fragment cache"""
+    if projection is None:
+        return records
+    return [{key: record[key] for key in projection if key in record} for record in records]
+
+
+# ==================== HTTP CACHING ====================
+
+
+def make_etag(*parts):
+    """Strong ETag derived from the data versions (and user scope) a response is built from"""
+    # Versions are per-process sequence numbers, so the clock's epoch keeps another worker's tags from matching
+    return hashlib.blake2b(repr((sequence.epoch, parts)).encode('utf-8'), digest_size=12).hexdigest()
+
+
+def not_modified(etag):
+    """Return a 304 response when the client already holds `etag`, else None"""
+    # Weak comparison: a compressed copy carries W/"<etag>" (see COMPRESSION)
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    return tag_response(response, etag)
+
+
+def tag_response(response, etag):
+    response.set_etag(etag)
+    # Clients may cache but must revalidate every poll, which is what makes 304s possible
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# ==================== JSON RESPONSES ====================
+
+
+# 'json' (stdlib C encoder) or 'orjson' when installed
+JSON_ENCODER = os.getenv('JSON_ENCODER', 'json')
+# Total size of the cached record fragments; the oldest are evicted past it
+FRAGMENT_CACHE_BYTES = int(os.getenv('FRAGMENT_CACHE_BYTES', 64 * 1024 * 1024))
+
+fragment_cache = FragmentCache(make_encoder(JSON_ENCODER, default=app.json.default), max_bytes=FRAGMENT_CACHE_BYTES)
+for collection in durable_collections.values():
+    collection.add_listener(fragment_cache.on_change)
+tool_registry.add_listener(fragment_cache.on_change)
+
+
+def list_response(lists, projections=None, **fields):
+    """jsonify({'success': True, **fields, **lists}) with list items served from the fragment cache
+
+    Only for records held by a collection (or the registry's views) and decorated
+    through fragment_cache.set_fields, so every change reaches the cache.
+    `projections` maps a list key to the record keys to keep (see get_projection).
+    """
+    body = fragment_cache.render({'success': True, **fields}, lists, projections)
+    return Response(body, mimetype='application/json')
+
+
+# ==================== METRICS ====================
+
+
+metrics = Registry('toolease_')
+
+http_latency = metrics.histogram('http_request_duration_seconds', 'Request handling time by route',
+                                 ('method', 'route'))
+http_responses = metrics.counter('http_responses_total', 'Responses by route and status code',
+                                 ('method', 'route', 'status'))
+
+# MQTT msgs/sec for readers of the raw page; Prometheus itself should rate() the _total counter
+mqtt_rates = RateWindow(window=10.0)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # The URL rule, not the path, so /api/owner/telemetry/T001 and T002 share one series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        http_latency.observe(time.perf_counter() - started, request.method, route)
+        http_responses.inc(request.method, route, response.status_code)
+    return response
+
+
+@metrics.collector
+def collect_ingest_metrics():
+    stats = ingest_pipeline.stats()
+    received = stats['received_by_topic']
+    rates = mqtt_rates.rates(received)
+    yield Family('mqtt_messages_received_total', 'counter', 'MQTT messages handed to the ingest pipeline',
+                 [({'topic': topic}, count) for topic, count in received.items()])
+    yield Family('mqtt_messages_per_second', 'gauge', 'MQTT receive rate over the last ~10 s of scrapes',
+                 [({'topic': topic}, round(rate, 3)) for topic, rate in rates.items()])
+    yield Family('mqtt_decode_errors_total', 'counter', 'Payloads dropped as unparseable or missing required fields',
+                 [({'topic': topic}, count) for topic, count in stats['invalid_by_topic'].items()])
+    yield Family('ingest_dropped_total', 'counter', 'Messages dropped because the ingest queue was full',
+                 [({}, stats['dropped'])])
+    yield Family('ingest_queue_depth', 'gauge', 'Messages waiting in each ingest stage',
+                 [({'stage': 'raw'}, stats['queue_depth']), ({'stage': 'decoded'}, stats['decoded_depth'])])
+
+
+@metrics.collector
+def collect_sse_metrics():
+    stats = sse_broker.stats()
+    roles = stats['roles']
+    yield Family('sse_clients', 'gauge', 'Connected SSE clients per role',
+                 [({'role': role}, r['clients']) for role, r in roles.items()])
+    # Aggregated per role: a label per client would mint a new series for every connection
+    yield Family('sse_queue_depth_max', 'gauge', 'Events buffered for the most backlogged SSE client of each role',
+                 [({'role': role}, max(r['queue_depths'], default=0)) for role, r in roles.items()])
+    yield Family('sse_queued_events', 'gauge', 'Events buffered across all SSE clients of each role',
+                 [({'role': role}, sum(r['queue_depths'])) for role, r in roles.items()])
+    yield Family('sse_events_published_total', 'counter', 'Events published to the SSE broker',
+                 [({}, stats['published'])])
+    yield Family('sse_events_dropped_total', 'counter', 'Events dropped from full SSE client queues',
+                 [({}, stats['dropped'])])
+
+
+@metrics.collector
+def collect_state_metrics():
+    yield Family('collection_records', 'gauge', 'Records held in each in-memory collection',
+                 [({'collection': name}, len(collection)) for name, collection in durable_collections.items()])
+
+
+@metrics.collector
+def collect_fragment_metrics():
+    stats = fragment_cache.stats()
+    yield Family('json_fragments', 'gauge', 'Records with cached JSON', [({}, stats['entries'])])
+    yield Family('json_fragment_bytes', 'gauge', 'Bytes of cached JSON fragments', [({}, stats['bytes'])])
+    yield Family('json_fragment_hits_total', 'counter', 'List items served from cached JSON', [({}, stats['hits'])])
+    yield Family('json_fragment_misses_total', 'counter', 'List items encoded on read', [({}, stats['misses'])])
+    yield Family('json_fragment_evictions_total', 'counter', 'Fragments dropped to stay within the size bound',
+                 [({}, stats['evictions'])])
+
+
+@metrics.collector
+def collect_hasher_metrics():
+    stats = password_hasher.stats()
+    workers = stats['workers']
+    yield Family('password_hash_workers', 'gauge', 'Password hashing pool processes (0 = inline)',
+                 [({}, workers)])
+    yield Family('password_hash_pending', 'gauge', 'Hash/verify jobs queued or running', [({}, stats['pending'])])
+    yield Family('password_hash_utilization', 'gauge', 'Share of pool workers busy',
+                 [({}, min(stats['pending'], workers) / workers if workers else 0)])
+    yield Family('password_hash_rejected_total', 'counter', 'Jobs refused because the queue was full',
+                 [({}, stats['rejected'])])
+
+
+# ==================== PROFILING ====================
+
+
+# Off unless one is set: a share of requests to trace, and/or a secret that traces any request
+# sending it in X-Profile-Token and unlocks /debug/profile
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SECRET = os.getenv('PROFILE_SECRET', '')
+PROFILE_MAX_STACKS = int(os.getenv('PROFILE_MAX_STACKS', 20000))
+
+request_profiler = RequestProfiler(PROFILE_SAMPLE_RATE, PROFILE_SECRET, max_stacks=PROFILE_MAX_STACKS)
+
+if request_profiler.enabled:
+    request_profiler.install(app)
+
+
+# ==================== COMPRESSION ====================
+
+
+# Encodings offered, most preferred first ('br' needs the brotli package, otherwise it is skipped)
+COMPRESSION = [e.strip() for e in os.getenv('COMPRESSION', 'br,gzip').split(',') if e.strip()]
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+# Compressed bodies kept per strong ETag, so clients polling an unchanged listing share one compression
+COMPRESSION_CACHE_BYTES = int(os.getenv('COMPRESSION_CACHE_BYTES', 32 * 1024 * 1024))
+# Compress the SSE stream too (flushed per event); turn off behind proxies that buffer compressed streams
+SSE_COMPRESSION = os.getenv('SSE_COMPRESSION', 'true').lower() in ('1', 'true', 'yes')
+
+response_compressor = ResponseCompressor(COMPRESSION, min_size=COMPRESSION_MIN_SIZE, gzip_level=GZIP_LEVEL,
+                                         brotli_quality=BROTLI_QUALITY, streams=SSE_COMPRESSION,
+                                         cache_bytes=COMPRESSION_CACHE_BYTES)
+
+# Registered after the metrics hook, so it runs first and request latency includes compression
+if response_compressor.encodings:
+    response_compressor.install(app)
+
+
+@metrics.collector
+def collect_compression_metrics():
+    stats = response_compressor.stats()
+    yield Family('http_compressed_responses_total', 'counter', 'Buffered responses compressed, by encoding',
+                 [({'encoding': e}, count) for e, count in stats['responses'].items()])
+    yield Family('http_compressed_streams_total', 'counter', 'Streamed responses (SSE) compressed, by encoding',
+                 [({'encoding': e}, count) for e, count in stats['streams'].items()])
+    yield Family('http_compression_bytes_total', 'counter', 'Buffered response bytes before and after compression',
+                 [({'encoding': e, 'stage': 'in'}, count) for e, count in stats['bytes_in'].items()]
+                 + [({'encoding': e, 'stage': 'out'}, count) for e, count in stats['bytes_out'].items()])
+    yield Family('http_compression_cache_hits_total', 'counter', 'Compressed bodies reused for an unchanged ETag',
+                 [({}, stats['cache_hits'])])
+    yield Family('http_compression_cache_bytes', 'gauge', 'Bytes of compressed bodies kept for reuse',
+                 [({}, stats['cached_bytes'])])
+
+
 # ==================== ROUTES ====================
 
 
@@ -322,18 +1119,109 @@ def check_session():
 
 @app.route('/stream/<role>')
 def stream(role):
+    if role not in SSE_ROLES:
+        return jsonify({'success': False, 'error': 'Unknown role'}), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    subscription = sse_broker.subscribe(role, last_event_id)
+    
     def event_stream():
-        while True:
-            if sse_queues.get(role):
-                event = sse_queues[role].pop(0)
-                yield f"data: {json.dumps(event)}\n\n"
-            time.sleep(1)
-    return Response(event_stream(), mimetype='text/event-stream')
+        try:
+            while True:
+                events = subscription.wait(timeout=SSE_KEEPALIVE_SECONDS)
+                if not events:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                for event_id, event in events:
+                    yield f"id: {event_id}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+    
+    return Response(event_stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+@app.route(f'{ASSET_URL_PATH}/<path:filename>')
+def hashed_asset(filename):
+    """A content-hashed static file, pre-compressed when the build has a variant the client accepts"""
+    encoding = response_compressor.negotiate(request.accept_encodings, asset_manifest.encodings(filename))
+    if encoding:
+        response = send_from_directory(ASSET_DIST_DIR, filename + SUFFIXES[encoding],
+                                       mimetype=mimetypes.guess_type(filename)[0],
+                                       download_name=os.path.basename(filename), max_age=ASSET_MAX_AGE)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(ASSET_DIST_DIR, filename, max_age=ASSET_MAX_AGE)
+    if asset_manifest.encodings(filename):
+        response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+
+@app.route(f'{IMAGE_URL_PATH}/<path:filename>')
+def image_derivative(filename):
+    """A generated image derivative, encoded on its first request; its name carries the source's content hash, so it never changes"""
+    try:
+        path = image_pipeline.derivative(filename)
+    except OSError as e:
+        log.warning('image_derivative_failed', image=filename, error=str(e))
+        path = None
+    if path is None:
+        abort(404)
+    response = send_from_directory(os.path.abspath(IMAGE_CACHE_DIR), filename, max_age=ASSET_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+
+@app.route('/api/stream/stats')
+def stream_stats():
+    return jsonify({'success': True, 'stats': sse_broker.stats(), 'state': state_backend.stats()})
+
+
+@app.route('/api/ingest/stats')
+def ingest_stats():
+    return jsonify({'success': True, 'stats': ingest_pipeline.stats()})
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+
+@app.route('/debug/profile', methods=['GET', 'DELETE'])
+def debug_profile():
+    """Folded stacks of profiled requests (?route=GET /api/..., ?format=summary); DELETE clears them"""
+    token = request.headers.get(PROFILE_HEADER) or request.args.get('token')
+    if not request_profiler.authorized(token):
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    
+    if request.method == 'DELETE':
+        request_profiler.reset()
+        return jsonify({'success': True})
+    
+    if request.args.get('format') == 'summary':
+        return jsonify({'success': True, 'routes': request_profiler.summary()})
+    
+    filename = f"profile-{datetime.now().strftime('%Y%m%dT%H%M%S')}.folded"
+    return Response(request_profiler.collapsed(request.args.get('route')), mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 
 # ==================== AUTHENTICATION ====================
 
 
+def busy_response():
+    """503 for when the password hashing queue is full; clients should retry shortly"""
+    response = jsonify({'success': False, 'error': 'Server is busy, please try again in a moment'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 @app.route('/signup', methods=['POST'])
 def signup():
     try:
@@ -355,7 +1243,13 @@ def signup():
             return jsonify({'success': False, 'error': 'Email already registered. Please login.'}), 400
         
         user_id = f"{role[0].upper()}{str(int(datetime.now().timestamp()))[-6:]}"
-        password_hash = generate_password_hash(password)
+        if users_db.get_by_id(user_id):
+            # Another signup for this role landed in the same second
+            user_id = f"{role[0].upper()}{secrets.token_hex(4).upper()}"
+        try:
+            password_hash = password_hasher.hash(password)
+        except (HasherBusy, TimeoutError):
+            return busy_response()
         
         user_data = {
             'id': user_id,
@@ -371,8 +1265,12 @@ def signup():
             'verified': True
         }
         
-        users_db[email] = user_data
-        save_users()
+        try:
+            users_db.create(user_data)
+        except DuplicateUserError as e:
+            if e.field == 'email':
+                return jsonify({'success': False, 'error': 'Email already registered. Please login.'}), 400
+            raise
         
         session.permanent = True
         session['user'] = {
@@ -387,7 +1285,7 @@ def signup():
         return jsonify({'success': True, 'role': role, 'message': 'Account created successfully!'})
         
     except Exception as e:
-        print(f"Signup error: {e}")
+        log.exception('signup_failed')
         return jsonify({'success': False, 'error': 'An error occurred during signup'}), 500
 
 
@@ -402,14 +1300,22 @@ def login():
         if not email or not password:
             return jsonify({'success': False, 'error': 'Email and password are required'}), 400
         
-        if email not in users_db:
+        user_data = users_db.get_by_email(email)
+        
+        if user_data is None:
             return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
         
-        user_data = users_db[email]
+        try:
+            valid = password_hasher.verify(user_data['password_hash'], password)
+        except (HasherBusy, TimeoutError):
+            return busy_response()
         
-        if not check_password_hash(user_data['password_hash'], password):
+        if not valid:
             return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
         
+        if password_hasher.needs_rehash(user_data['password_hash']):
+            password_hasher.rehash_later(password, lambda new_hash: users_db.update(email, {'password_hash': new_hash}))
+        
         session.permanent = True
         session['user'] = {
             'id': user_data['id'],
@@ -423,7 +1329,7 @@ def login():
         return jsonify({'success': True, 'role': user_data['role'], 'message': 'Login successful!'})
         
     except Exception as e:
-        print(f"Login error: {e}")
+        log.exception('login_failed')
         return jsonify({'success': False, 'error': 'An error occurred during login'}), 500
 
 
@@ -442,7 +1348,7 @@ def owner_dashboard():
     user = session['user']
     owner_name = user['name']
     
-    owner_new_tools = [t for t in new_tools if t.get('added_by') == owner_name]
+    owner_new_tools = new_tools.lookup('added_by', owner_name)
     
     stats = {
         'total_tools': len(owner_new_tools),
@@ -462,41 +1368,44 @@ def add_tool():
     data = request.json
     owner_name = session['user']['name']
     
-    all_tool_numbers = [int(tid[1:]) for tid in OWNER_TOOL_MAP.keys() if tid.startswith('T')]
-    all_tool_numbers.extend([int(t['toolid'][1:]) for t in new_tools if t['toolid'].startswith('T')])
-    next_num = max(all_tool_numbers) + 1 if all_tool_numbers else 11
-    
-    tool_id = f"T{str(next_num).zfill(3)}"
-    
-    base_temp = 25 + random.uniform(-5, 15)
-    base_voltage = 230 + random.uniform(-10, 5)
-    
-    new_tool = {
-        'toolid': tool_id,
-        'tool_type': data['tool_type'],
-        'tool_name': data.get('tool_name', ''),
-        'hourly_rate': float(data['hourly_rate']),
-        'daily_rate': float(data['daily_rate']),
-        'latitude': float(data['geo_lat']),
-        'longitude': float(data['geo_lng']),
-        'geo_center_lat': float(data['geo_lat']),
-        'geo_center_lng': float(data['geo_lng']),
-        'geo_radius_m': float(data.get('geo_radius', 5000)),
-        'temperature_c': round(base_temp, 2),
-        'voltage_v': round(base_voltage, 1),
-        'vibration_hz': round(random.uniform(20, 60), 1),
-        'sensor_active': True,
-        'ts_iso': datetime.now().isoformat(),
-        'availability': 'AVAILABLE',
-        'added_by': owner_name,
-        'added_at': datetime.now().isoformat()
-    }
+    # Allocate the id and add the tool in one write section so two workers never pick the same id
+    with state_backend.writing():
+        all_tool_numbers = [int(tid[1:]) for tid in OWNER_TOOL_MAP.keys() if tid.startswith('T')]
+        all_tool_numbers.extend([int(t['toolid'][1:]) for t in new_tools if t['toolid'].startswith('T')])
+        next_num = max(all_tool_numbers) + 1 if all_tool_numbers else 11
+        
+        tool_id = f"T{str(next_num).zfill(3)}"
+        
+        base_temp = 25 + random.uniform(-5, 15)
+        base_voltage = 230 + random.uniform(-10, 5)
+        
+        new_tool = {
+            'toolid': tool_id,
+            'tool_type': data['tool_type'],
+            'tool_name': data.get('tool_name', ''),
+            'hourly_rate': float(data['hourly_rate']),
+            'daily_rate': float(data['daily_rate']),
+            'latitude': float(data['geo_lat']),
+            'longitude': float(data['geo_lng']),
+            'geo_center_lat': float(data['geo_lat']),
+            'geo_center_lng': float(data['geo_lng']),
+            'geo_radius_m': float(data.get('geo_radius', 5000)),
+            'temperature_c': round(base_temp, 2),
+            'voltage_v': round(base_voltage, 1),
+            'vibration_hz': round(random.uniform(20, 60), 1),
+            'sensor_active': True,
+            'ts_iso': datetime.now().isoformat(),
+            'availability': 'AVAILABLE',
+            'added_by': owner_name,
+            'added_at': datetime.now().isoformat()
+        }
+        
+        new_tools.append(new_tool)
+        realtime_data['nearby_tools'].append(new_tool)
     
-    new_tools.append(new_tool)
-    realtime_data['nearby_tools'].append(new_tool)
-    OWNER_TOOL_MAP[tool_id] = owner_name
+    publish_geofence_transitions()
     
-    print(f"✓ Added new tool {tool_id} for owner {owner_name}")
+    log.info('tool_added', tool_id=tool_id, owner=owner_name)
     
     return jsonify({
         'success': True,
@@ -512,26 +1421,54 @@ def get_owner_tools():
         return jsonify({'success': False}), 401
     
     owner_name = session['user']['name']
+    # Readings before the ETag, so it covers exactly the values this response carries; nothing
+    # below writes to the registry, so polling leaves every other endpoint's ETag alone
+    tools_data = [{**tool, **sensor_readings(tool)} for tool in new_tools.lookup('added_by', owner_name)]
+    cursor = tool_registry.changes.version
+    etag = make_etag('owner-tools', owner_name, cursor, [tool['ts_iso'] for tool in tools_data],
+                     request.query_string)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # Readings move without a registry change, so a delta still carries every owned tool; the
+    # cursor only contributes the deletions
+    delta = collect_changes(tool_registry.changes, get_since_cursor(), lambda t: t.get('added_by') == owner_name)
+    
+    log.debug('owner_tools', owner=owner_name, tools=len(tools_data))
+    
+    return tag_response(jsonify({'success': True, 'tools': tools_data, **sync_fields(cursor, delta)}), etag)
+
+
+@app.route('/api/owner/telemetry/<tool_id>')
+def get_tool_telemetry(tool_id):
+    if 'user' not in session:
+        return jsonify({'success': False}), 401
+    
+    if OWNER_TOOL_MAP.get(tool_id) != session['user']['name']:
+        return jsonify({'success': False, 'error': 'Tool not found'}), 404
+    
+    metric = request.args.get('metric', 'temperature')
+    if metric not in TELEMETRY_FIELDS:
+        return jsonify({'success': False, 'error': f'Unknown metric {metric}'}), 400
     
-    tools_data = []
-    for new_tool in new_tools:
-        if new_tool.get('added_by') == owner_name:
-            new_tool['temperature_c'] = round(new_tool.get('temperature_c', 25) + random.uniform(-3, 3), 2)
-            new_tool['voltage_v'] = round(new_tool.get('voltage_v', 230) + random.uniform(-2, 2), 1)
-            new_tool['vibration_hz'] = round(random.uniform(20, 60), 1)
-            new_tool['ts_iso'] = datetime.now().isoformat()
-            tools_data.append(new_tool)
+    start = parse_iso_ts(request.args['start']) if request.args.get('start') else None
+    end = parse_iso_ts(request.args['end']) if request.args.get('end') else None
+    buckets = request.args.get('buckets', type=int)
+    bucket_seconds = request.args.get('bucket_seconds', type=float)
+    if buckets is None and bucket_seconds is None:
+        buckets = 200
     
-    print(f"✓ Returning {len(tools_data)} tools for owner {owner_name}")
+    series = telemetry_store.query(tool_id, metric, start=start, end=end, buckets=buckets, bucket_seconds=bucket_seconds)
     
-    return jsonify({'success': True, 'tools': tools_data})
+    return jsonify({'success': True, 'toolid': tool_id, 'metric': metric, 'data': series})
 
 
 @app.route('/api/owner/tool-status/<tool_id>')
 def get_tool_status(tool_id):
-    for tool in new_tools:
-        if tool.get('toolid') == tool_id:
-            return jsonify({'success': True, 'data': tool})
+    tool = new_tools.first('toolid', tool_id)
+    if tool:
+        return jsonify({'success': True, 'data': {**tool, **sensor_readings(tool)}})
     
     return jsonify({'success': False, 'error': 'Tool not found'}), 404
 
@@ -542,7 +1479,7 @@ def get_late_returns():
         return jsonify({'success': False}), 401
     
     owner_name = session['user']['name']
-    owner_added_tools = [t['toolid'] for t in new_tools if t.get('added_by') == owner_name]
+    owner_added_tools = [t['toolid'] for t in new_tools.lookup('added_by', owner_name)]
     
     if not owner_added_tools:
         return jsonify({'success': True, 'data': []})
@@ -570,35 +1507,29 @@ def get_geofence():
         return jsonify({'success': False}), 401
     
     owner_name = session['user']['name']
-    owner_added_tools = [t for t in new_tools if t.get('added_by') == owner_name]
+    owner_added_tools = new_tools.lookup('added_by', owner_name)
     
     if not owner_added_tools:
         return jsonify({'success': True, 'data': []})
     
     cleaned_data = []
     for tool in owner_added_tools:
-        within_fence = random.choice([True, True, False])
-        
-        if within_fence:
-            lat_offset = random.uniform(-0.002, 0.002)
-            lng_offset = random.uniform(-0.002, 0.002)
-            distance = random.uniform(0.1, 2)
-        else:
-            lat_offset = random.uniform(-0.01, 0.01)
-            lng_offset = random.uniform(-0.01, 0.01)
-            distance = random.uniform(5.5, 8)
+        status = geofence_engine.status(tool['toolid'])
+        if status is None or status['state'] == UNKNOWN:
+            continue
+        within_fence = status['state'] == INSIDE
         
         cleaned_data.append({
             'toolid': tool['toolid'],
-            'latitude': tool['latitude'] + lat_offset,
-            'longitude': tool['longitude'] + lng_offset,
-            'geo_center_lat': tool.get('geo_center_lat', tool['latitude']),
-            'geo_center_lng': tool.get('geo_center_lng', tool['longitude']),
-            'geo_radius_m': tool.get('geo_radius_m', 5000),
+            'latitude': status['latitude'],
+            'longitude': status['longitude'],
+            'geo_center_lat': status['geo_center_lat'],
+            'geo_center_lng': status['geo_center_lng'],
+            'geo_radius_m': status['geo_radius_m'],
             'within_fence': within_fence,
-            'distance_from_center_km': round(distance, 2),
+            'distance_from_center_km': round(status['distance_m'] / 1000, 2),
             'breach_type': 'entry' if within_fence else 'exit',
-            'ts_iso': datetime.now().isoformat()
+            'ts_iso': geofence_engine.last_evaluated_iso
         })
     
     return jsonify({'success': True, 'data': cleaned_data})
@@ -610,24 +1541,39 @@ def get_revenue():
         return jsonify({'success': False}), 401
     
     owner_name = session['user']['name']
-    owner_added_tools = [t['toolid'] for t in new_tools if t.get('added_by') == owner_name]
+    owner_tools = [tool_id for tool_id, owner in OWNER_TOOL_MAP.items() if owner == owner_name]
     
-    if not owner_added_tools:
-        return jsonify({'success': True, 'data': []})
+    if not owner_tools:
+        return jsonify({'success': True, 'data': [], 'owner_daily': []})
+    
+    # Counters are maintained as events arrive; this only reads days x tools cells
+    days = min(max(request.args.get('days', 7, type=int), 1), MAX_REVENUE_DAYS)
+    end = None
+    if request.args.get('end'):
+        try:
+            end = datetime.fromisoformat(request.args['end']).date()
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid end date'}), 400
+    window = day_range(end, days)
     
     cleaned_revenue = []
-    for tool_id in owner_added_tools:
-        for day in range(7):
-            date = datetime.now() - timedelta(days=day)
-            cleaned_revenue.append({
-                'toolid': tool_id,
-                'date_iso': date.isoformat(),
-                'rentals_count': random.randint(0, 5),
-                'total_rental_hours': round(random.uniform(0, 12), 1),
-                'revenue_inr': round(random.uniform(500, 5000), 2)
-            })
+    for tool_id, day, counters in revenue_rollup.tool_days(owner_tools, window):
+        cleaned_revenue.append({
+            'toolid': tool_id,
+            'date_iso': day.isoformat(),
+            'rentals_count': int(counters['rentals_count']),
+            'total_rental_hours': round(counters['hours'], 1),
+            'revenue_inr': round(counters['revenue_inr'], 2),
+            'maintenance_cost_inr': round(counters['maintenance_cost_inr'], 2),
+            'net_inr': round(counters['net_inr'], 2)
+        })
     
-    return jsonify({'success': True, 'data': cleaned_revenue})
+    owner_daily = [
+        {'date_iso': day.isoformat(), **{name: round(value, 2) for name, value in counters.items()}}
+        for day, counters in revenue_rollup.owner_days(owner_name, window)
+    ]
+    
+    return jsonify({'success': True, 'data': cleaned_revenue, 'owner_daily': owner_daily})
 
 
 # ==================== RENTER ROUTES ====================
@@ -639,8 +1585,7 @@ def renter_dashboard():
     user = session['user']
     renter_id = user['id']
     
-    bookings_data = realtime_data.get('bookings', []) + new_bookings
-    renter_bookings = [b for b in bookings_data if b.get('renter_id') == renter_id]
+    renter_bookings = realtime_data['bookings'].lookup('renter_id', renter_id)
     
     stats = {
         'active_bookings': len([b for b in renter_bookings if b.get('payment_status') == 'SUCCESS']),
@@ -653,33 +1598,46 @@ def renter_dashboard():
 
 @app.route('/api/renter/nearby-tools')
 def get_nearby_tools():
-    nearby_data = realtime_data.get('nearby_tools', [])
-    
-    print(f"📍 API called: nearby-tools, found {len(nearby_data)} tools")
-    
-    cleaned_tools = []
-    for tool in nearby_data:
-        cleaned_tool = {}
-        for key, value in tool.items():
-            if value is None or (isinstance(value, float) and pd.isna(value)):
-                cleaned_tool[key] = None
-            else:
-                cleaned_tool[key] = value
-        
-        tool_type = cleaned_tool.get('tool_type', 'Drill')
-        if tool_type in TOOL_CATALOG:
-            cleaned_tool['hourly_rate'] = TOOL_CATALOG[tool_type]['hourly_rate']
-            cleaned_tool['daily_rate'] = TOOL_CATALOG[tool_type]['daily_rate']
-        else:
-            cleaned_tool['hourly_rate'] = 150
-            cleaned_tool['daily_rate'] = 1000
-        
-        # ✅ ADD TOOL IMAGE
-        cleaned_tool['tool_image'] = TOOL_IMAGES.get(tool_type, "/static/images/tools/drill.png")
-        
-        cleaned_tools.append(cleaned_tool)
-    
-    return jsonify({'success': True, 'tools': cleaned_tools})
+    cursor = tool_registry.changes.version
+    etag = make_etag('nearby-tools', cursor, request.query_string)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # ?lat=&lng= switches to a spatial query around the caller's real position
+    lat = number_arg('lat')
+    lng = number_arg('lng')
+    if lat is not None and lng is not None:
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise InvalidListQuery('lat must be within [-90, 90] and lng within [-180, 180]')
+        radius_km = number_arg('radius_km', DEFAULT_SEARCH_RADIUS_KM)
+        limit = number_arg('limit', DEFAULT_SEARCH_LIMIT, convert=int)
+        if radius_km <= 0:
+            raise InvalidListQuery('radius_km must be greater than 0')
+        if limit < 1:
+            raise InvalidListQuery('limit must be at least 1')
+        radius_km = min(radius_km, MAX_SEARCH_RADIUS_KM)
+        limit = min(limit, MAX_SEARCH_LIMIT)
+        tools = tool_registry.nearby(lat, lng, radius_km, tool_type=request.args.get('tool_type'), limit=limit)
+        
+        log.debug('nearby_tools', lat=lat, lng=lng, radius_km=radius_km, found=len(tools))
+        
+        # Nearest-first under its own limit, so only ?fields applies here
+        tools = project(tools, get_projection(PAGE_KEYS['tools']))
+        return tag_response(jsonify({'success': True, 'tools': tools, 'next_cursor': None,
+                                     **sync_fields(cursor, None)}), etag)
+    
+    projection = get_projection(PAGE_KEYS['tools'])
+    delta = collect_changes(tool_registry.changes, get_since_cursor(), lambda t: True)
+    
+    # Rates, image and NaN cleanup are precomputed by the registry on write
+    cleaned_tools = delta[0] if delta else tool_registry.listing()
+    page, next_cursor = paginate(cleaned_tools, PAGE_KEYS['tools'])
+    
+    log.debug('nearby_tools', found=len(cleaned_tools), returned=len(page))
+    
+    return tag_response(list_response({'tools': page}, {'tools': projection}, next_cursor=next_cursor,
+                                      **sync_fields(cursor, delta)), etag)
 
 
 @app.route('/api/renter/book-tool', methods=['POST'])
@@ -736,7 +1694,7 @@ def book_tool():
         realtime_data['operator_events'].append(operator_event)
         notify_clients('operator_events', operator_event)
         
-        print(f"✓ Created operator tracking for booking {booking_id} - Operator: {operator_name}")
+        log.info('operator_assigned', booking_id=booking_id, operator=operator_name)
     
     return jsonify({'success': True, 'booking': booking})
 
@@ -746,53 +1704,52 @@ def get_renter_bookings():
         return jsonify({'success': False}), 401
     
     renter_id = session['user']['id']
-    
-    # ✅ FIX: Only use realtime_data (removed + new_bookings)
-    bookings_data = realtime_data.get('bookings', [])
-    renter_bookings = [b for b in bookings_data if b.get('renter_id') == renter_id]
+    cursor = realtime_data['bookings'].changes.version
+    etag = make_etag('renter-bookings', renter_id, cursor, tool_registry.changes.version, request.query_string)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    projection = get_projection(PAGE_KEYS['bookings'])
+    delta = collect_changes(realtime_data['bookings'].changes, get_since_cursor(),
+                            lambda b: b.get('renter_id') == renter_id)
+    
+    if delta is not None:
+        renter_bookings = delta[0]
+    else:
+        renter_bookings = realtime_data['bookings'].lookup('renter_id', renter_id)
+    renter_bookings, next_cursor = paginate(renter_bookings, PAGE_KEYS['bookings'])
     
     # ADD TOOL NAMES TO BOOKINGS
     for booking in renter_bookings:
-        tool_id = booking.get('toolid')
-        
-        # Find tool in nearby_tools to get tool_type
-        tool_info = None
-        for tool in realtime_data.get('nearby_tools', []):
-            if tool.get('toolid') == tool_id:
-                tool_info = tool
-                break
-        
-        # Check in new_tools if not found
-        if not tool_info:
-            for tool in new_tools:
-                if tool.get('toolid') == tool_id:
-                    tool_info = tool
-                    break
-        
-        # Add tool information to booking
-        if tool_info:
-            booking['tool_type'] = tool_info.get('tool_type', 'Unknown Tool')
-            booking['tool_name'] = tool_info.get('tool_name', tool_info.get('tool_type', 'Tool'))
-        else:
-            booking['tool_type'] = 'Unknown Tool'
-            booking['tool_name'] = 'Tool'
+        attach_tool_info(booking, unknown_type='Unknown Tool')
     
-    return jsonify({'success': True, 'bookings': renter_bookings})
+    return tag_response(list_response({'bookings': renter_bookings}, {'bookings': projection},
+                                      next_cursor=next_cursor, **sync_fields(cursor, delta)), etag)
 @app.route('/api/renter/operator-tracking')
 def get_operator_tracking():
     if 'user' not in session:
         return jsonify({'success': False}), 401
     
     renter_id = session['user']['id']
+    cursor = realtime_data['operator_events'].changes.version
+    etag = make_etag('operator-tracking', renter_id, cursor, realtime_data['bookings'].changes.version,
+                     request.query_string)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    renter_bookings = realtime_data['bookings'].lookup('renter_id', renter_id)
+    booking_ids = dict.fromkeys(b['booking_id'] for b in renter_bookings)
     
-    bookings_data = realtime_data.get('bookings', []) + new_bookings
-    renter_bookings = [b for b in bookings_data if b.get('renter_id') == renter_id]
-    booking_ids = [b['booking_id'] for b in renter_bookings]
+    delta = collect_changes(realtime_data['operator_events'].changes, get_since_cursor(),
+                            lambda o: o.get('booking_id') in booking_ids)
+    if delta is not None:
+        return tag_response(list_response({'data': delta[0]}, **sync_fields(cursor, delta)), etag)
     
-    operator_data = realtime_data.get('operator_events', [])
-    operator_filtered = [o for o in operator_data if o.get('booking_id') in booking_ids]
+    operator_filtered = realtime_data['operator_events'].lookup_many('booking_id', booking_ids)
     
-    print(f"📍 Operator tracking: Found {len(operator_filtered)} events for renter {renter_id}")
+    log.debug('operator_tracking', renter_id=renter_id, events=len(operator_filtered))
     
     if not operator_filtered:
         for booking in renter_bookings:
@@ -822,7 +1779,7 @@ def get_operator_tracking():
                 realtime_data['operator_events'].append(operator_event)
                 operator_filtered.append(operator_event)
     
-    return jsonify({'success': True, 'data': operator_filtered})
+    return tag_response(list_response({'data': operator_filtered}, **sync_fields(cursor, delta)), etag)
 
 
 # ==================== FEEDBACK ROUTES ====================
@@ -835,13 +1792,17 @@ def renter_feedback():
     renter_id = session['user']['id']
     
     if request.method == 'GET':
+        projections = {'feedback': get_projection(PAGE_KEYS['feedback']),
+                       'pending': get_projection(PAGE_KEYS['bookings'])}
+        cursor = realtime_data['feedback'].changes.version
+        delta = collect_changes(realtime_data['feedback'].changes, get_since_cursor(),
+                                lambda f: f.get('renterid') == renter_id)
+        
         # Get submitted feedback for this renter
-        feedback_data = realtime_data.get('feedback', [])
-        renter_feedback_list = [f for f in feedback_data if f.get('renterid') == renter_id]
+        renter_feedback_list = realtime_data['feedback'].lookup('renterid', renter_id)
         
         # Get bookings for this renter
-        bookings_data = realtime_data.get('bookings', [])
-        renter_bookings = [b for b in bookings_data if b.get('renter_id') == renter_id]
+        renter_bookings = realtime_data['bookings'].lookup('renter_id', renter_id)
         
         # Get rental IDs that already have feedback
         submitted_rental_ids = set(f.get('rentalid') for f in renter_feedback_list)
@@ -862,68 +1823,26 @@ def renter_feedback():
                     end_time = datetime.fromisoformat(rental_end_iso.replace('Z', '+00:00'))
                     if end_time < datetime.now():
                         # Add tool information
-                        tool_id = booking.get('toolid')
-                        tool_info = None
-                        
-                        # Find tool in nearby_tools
-                        for tool in realtime_data.get('nearby_tools', []):
-                            if tool.get('toolid') == tool_id:
-                                tool_info = tool
-                                break
-                        
-                        # Check in new_tools if not found
-                        if not tool_info:
-                            for tool in new_tools:
-                                if tool.get('toolid') == tool_id:
-                                    tool_info = tool
-                                    break
-                        
-                        # Add tool name to booking
-                        if tool_info:
-                            booking['tool_name'] = tool_info.get('tool_name', tool_info.get('tool_type', 'Tool'))
-                            booking['tool_type'] = tool_info.get('tool_type', 'Tool')
-                        else:
-                            booking['tool_name'] = 'Tool'
-                            booking['tool_type'] = 'Tool'
-                        
+                        attach_tool_info(booking)
                         pending.append(booking)
                 except Exception as e:
-                    print(f"Error parsing date: {e}")
+                    log.warning('bad_rental_end', booking_id=booking_id, error=str(e))
                     continue
         
+        # Pending depends on the clock, so only the submitted list is sent as a delta
+        if delta is not None:
+            renter_feedback_list = delta[0]
+        # Pages cover the submitted list; pending is bounded by the renter's own bookings
+        renter_feedback_list, next_cursor = paginate(renter_feedback_list, PAGE_KEYS['feedback'])
+        
         # Add tool names to submitted feedback
         for feedback in renter_feedback_list:
-            tool_id = feedback.get('toolid')
-            tool_info = None
-            
-            # Find tool in nearby_tools
-            for tool in realtime_data.get('nearby_tools', []):
-                if tool.get('toolid') == tool_id:
-                    tool_info = tool
-                    break
-            
-            # Check in new_tools if not found
-            if not tool_info:
-                for tool in new_tools:
-                    if tool.get('toolid') == tool_id:
-                        tool_info = tool
-                        break
-            
-            # Add tool information
-            if tool_info:
-                feedback['tool_name'] = tool_info.get('tool_name', tool_info.get('tool_type', 'Tool'))
-                feedback['tool_type'] = tool_info.get('tool_type', 'Tool')
-            else:
-                feedback['tool_name'] = 'Tool'
-                feedback['tool_type'] = 'Tool'
+            attach_tool_info(feedback)
         
-        print(f"✓ Feedback GET: {len(renter_feedback_list)} submitted, {len(pending)} pending for renter {renter_id}")
+        log.debug('feedback_list', renter_id=renter_id, submitted=len(renter_feedback_list), pending=len(pending))
         
-        return jsonify({
-            'success': True,
-            'feedback': renter_feedback_list,
-            'pending': pending
-        })
+        return list_response({'feedback': renter_feedback_list, 'pending': pending}, projections,
+                             next_cursor=next_cursor, **sync_fields(cursor, delta))
     
     elif request.method == 'POST':
         # Submit new feedback
@@ -943,10 +1862,7 @@ def renter_feedback():
             return jsonify({'success': False, 'error': 'Rating must be between 1 and 5'}), 400
         
         # Check if feedback already exists for this booking
-        feedback_data = realtime_data.get('feedback', [])
-        existing = [f for f in feedback_data if f.get('rentalid') == booking_id]
-        
-        if existing:
+        if realtime_data['feedback'].count('rentalid', booking_id):
             return jsonify({'success': False, 'error': 'Feedback already submitted for this booking'}), 400
         
         # Create feedback entry
@@ -967,7 +1883,7 @@ def renter_feedback():
         # Notify clients
         notify_clients('feedback', feedback_entry)
         
-        print(f"✓ Feedback submitted: Booking {booking_id}, Rating {rating}, Damage: {damage_flag}")
+        log.info('feedback_submitted', booking_id=booking_id, rating=rating, damage=damage_flag)
         
         return jsonify({
             'success': True,
@@ -984,23 +1900,40 @@ def operator_dashboard():
     user = session['user']
     operator_name = user['name']
     
-    operator_data = realtime_data.get('operator_events', [])
-    operator_assignments = [o for o in operator_data if o.get('operator_name') == operator_name]
+    totals = earnings_ledger.totals(operator_name)
     
     stats = {
-        'total_assignments': len(operator_assignments),
-        'completed': len([o for o in operator_assignments if o.get('arrival_status') == 'ON_TIME']),
-        'pending': len([o for o in operator_assignments if not o.get('arrival_iso')]),
-        'earnings': sum(o.get('compensation_to_renter_inr', 0) for o in operator_assignments if o.get('arrival_status') == 'ON_TIME') 
+        'total_assignments': totals['jobs'],
+        'completed': totals['on_time'],
+        'pending': totals['pending'],
+        'earnings': round(totals['earnings'], 2)
     }
     
     return render_template('operator_dashboard.html', user=user, stats=stats)
 
 
+def is_pending_request(event):
+    return not event.get('arrival_iso') and not event.get('accepted_iso')
+
+
 @app.route('/api/operator/requests')
 def get_operator_requests():
-    operator_data = realtime_data.get('operator_events', [])
-    pending = [o for o in operator_data if not o.get('arrival_iso') and not o.get('accepted_iso')]
+    cursor = realtime_data['operator_events'].changes.version
+    etag = make_etag('operator-requests', cursor, tool_registry.changes.version, request.query_string)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    projection = get_projection(PAGE_KEYS['operator_events'])
+    delta = collect_changes(realtime_data['operator_events'].changes, get_since_cursor(),
+                            lambda o: True, is_pending_request)
+    
+    if delta is not None:
+        pending = delta[0]
+    else:
+        pending = [o for o in realtime_data['operator_events'] if is_pending_request(o)]
+    # Paged before the per-request enrichment below, which then only touches one page
+    pending, next_cursor = paginate(pending, PAGE_KEYS['operator_events'])
     
     locations = [
         "Hitech City, Hyderabad",
@@ -1011,39 +1944,17 @@ def get_operator_requests():
         "Jubilee Hills, Hyderabad"
     ]
     
-    for request in pending:
-        tool_id = request.get('toolid')
+    for pending_request in pending:
+        attach_tool_info(pending_request)
         
-        # Find tool info
-        tool_info = None
-        for tool in realtime_data.get('nearby_tools', []):
-            if tool.get('toolid') == tool_id:
-                tool_info = tool
-                break
-        
-        if not tool_info:
-            for tool in new_tools:
-                if tool.get('toolid') == tool_id:
-                    tool_info = tool
-                    break
-        
-        # Add tool information
-        if tool_info:
-            request['tool_type'] = tool_info.get('tool_type', 'Tool')
-            request['tool_name'] = tool_info.get('tool_name', tool_info.get('tool_type', 'Tool'))
-        else:
-            request['tool_type'] = 'Tool'
-            request['tool_name'] = 'Tool'
-        
-        # ✅ ADD TOOL IMAGE
-        tool_type = request.get('tool_type', 'Tool')
-        request['tool_image'] = TOOL_IMAGES.get(tool_type, "/static/images/tools/drill.png")
+        tool_type = pending_request['tool_type']
         
         # Ensure expected_arrival_iso exists
-        if not request.get('expected_arrival_iso'):
+        if not pending_request.get('expected_arrival_iso'):
             hours_offset = random.randint(1, 24)
             minutes_offset = random.randint(0, 59)
-            request['expected_arrival_iso'] = (datetime.now() + timedelta(hours=hours_offset, minutes=minutes_offset)).isoformat()
+            expected = datetime.now() + timedelta(hours=hours_offset, minutes=minutes_offset)
+            fragment_cache.set_fields(pending_request, {'expected_arrival_iso': expected.isoformat()})
         
         # Vary estimated earnings based on tool type
         earnings_map = {
@@ -1054,16 +1965,19 @@ def get_operator_requests():
             'Lathe': 450,
             'Floor Sanders': 250
         }
-        request['estimated_earnings'] = earnings_map.get(tool_type, 350)
         
-        # Add location
-        booking_id = request.get('booking_id', '')
-        location_index = hash(booking_id) % len(locations)
-        request['location_name'] = locations[location_index]
+        # Tool image, earnings and location through the cache so the stored JSON stays in step
+        booking_id = pending_request.get('booking_id', '')
+        fragment_cache.set_fields(pending_request, {
+            **tool_registry.image_fields(tool_type),
+            'estimated_earnings': earnings_map.get(tool_type, 350),
+            'location_name': locations[hash(booking_id) % len(locations)]
+        })
     
-    print(f"✓ Returning {len(pending)} pending requests with tool images")
+    log.debug('operator_requests', pending=len(pending))
     
-    return jsonify({'success': True, 'requests': pending})
+    return tag_response(list_response({'requests': pending}, {'requests': projection}, next_cursor=next_cursor,
+                                      **sync_fields(cursor, delta)), etag)
 
 
 @app.route('/api/operator/assignments')
@@ -1072,8 +1986,22 @@ def get_operator_assignments():
         return jsonify({'success': False}), 401
     
     operator_name = session['user']['name']
-    operator_data = realtime_data.get('operator_events', [])
-    assignments = [o for o in operator_data if o.get('operator_name') == operator_name]
+    cursor = realtime_data['operator_events'].changes.version
+    etag = make_etag('operator-assignments', operator_name, cursor, tool_registry.changes.version,
+                     request.query_string)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    projection = get_projection(PAGE_KEYS['operator_events'])
+    delta = collect_changes(realtime_data['operator_events'].changes, get_since_cursor(),
+                            lambda o: o.get('operator_name') == operator_name)
+    
+    if delta is not None:
+        assignments = delta[0]
+    else:
+        assignments = realtime_data['operator_events'].lookup('operator_name', operator_name)
+    assignments, next_cursor = paginate(assignments, PAGE_KEYS['operator_events'])
     
     locations = [
         "Hitech City, Hyderabad",
@@ -1085,41 +2013,19 @@ def get_operator_assignments():
     ]
     
     for assignment in assignments:
-        tool_id = assignment.get('toolid')
-        
-        # Find tool info
-        tool_info = None
-        for tool in realtime_data.get('nearby_tools', []):
-            if tool.get('toolid') == tool_id:
-                tool_info = tool
-                break
-        
-        if not tool_info:
-            for tool in new_tools:
-                if tool.get('toolid') == tool_id:
-                    tool_info = tool
-                    break
+        attach_tool_info(assignment)
         
-        # Add tool information
-        if tool_info:
-            assignment['tool_type'] = tool_info.get('tool_type', 'Tool')
-            assignment['tool_name'] = tool_info.get('tool_name', tool_info.get('tool_type', 'Tool'))
-        else:
-            assignment['tool_type'] = 'Tool'
-            assignment['tool_name'] = 'Tool'
-        
-        # ✅ ADD TOOL IMAGE
-        tool_type = assignment.get('tool_type', 'Tool')
-        assignment['tool_image'] = TOOL_IMAGES.get(tool_type, "/static/images/tools/drill.png")
-        
-        # Add location name
+        # Tool image and location name through the cache so the stored JSON stays in step
         booking_id = assignment.get('booking_id', '')
-        location_index = hash(booking_id) % len(locations)
-        assignment['location_name'] = locations[location_index]
+        fragment_cache.set_fields(assignment, {
+            **tool_registry.image_fields(assignment['tool_type']),
+            'location_name': locations[hash(booking_id) % len(locations)]
+        })
     
-    print(f"✓ Returning {len(assignments)} assignments with tool images for operator {operator_name}")
+    log.debug('operator_assignments', operator=operator_name, assignments=len(assignments))
     
-    return jsonify({'success': True, 'assignments': assignments})
+    return tag_response(list_response({'assignments': assignments}, {'assignments': projection},
+                                      next_cursor=next_cursor, **sync_fields(cursor, delta)), etag)
 
 
 @app.route('/api/operator/accept-request', methods=['POST'])
@@ -1131,36 +2037,32 @@ def accept_request():
     booking_id = data.get('booking_id')
     operator_name = session['user']['name']
     
-    print(f"✓ Attempting to accept booking {booking_id} for operator {operator_name}")
-    
-    operator_data = realtime_data.get('operator_events', [])
+    log.debug('accept_request', booking_id=booking_id, operator=operator_name)
     
-    found = False
-    for event in operator_data:
-        if event.get('booking_id') == booking_id:
-            # Mark as accepted but NOT arrived (shows as UPCOMING)
-            event['operator_name'] = operator_name
-            event['accepted_iso'] = datetime.now().isoformat()
-            event['arrival_iso'] = None
-            event['arrival_status'] = None
-            event['late_mins_operator'] = 0
-            event['compensation_to_renter_inr'] = 350
-            
-            notify_clients('operator_events', event)
-            
-            print(f"✓ Operator {operator_name} accepted request {booking_id}")
-            
-            found = True
-            break
+    event = realtime_data['operator_events'].first('booking_id', booking_id)
     
-    if found:
+    if event:
+        # Mark as accepted but NOT arrived (shows as UPCOMING)
+        realtime_data['operator_events'].update(event, {
+            'operator_name': operator_name,
+            'accepted_iso': datetime.now().isoformat(),
+            'arrival_iso': None,
+            'arrival_status': None,
+            'late_mins_operator': 0,
+            'compensation_to_renter_inr': 350
+        })
+        
+        notify_clients('operator_events', event)
+        
+        log.info('request_accepted', booking_id=booking_id, operator=operator_name)
+        
         return jsonify({
             'success': True, 
             'message': 'Request accepted successfully',
             'event': event
         })
     else:
-        print(f"❌ Booking {booking_id} not found")
+        log.warning('accept_unknown_booking', booking_id=booking_id, operator=operator_name)
         return jsonify({
             'success': False, 
             'error': 'Booking not found'
@@ -1176,10 +2078,9 @@ def reject_request():
     booking_id = data.get('booking_id')
     operator_name = session['user']['name']
     
-    operator_data = realtime_data.get('operator_events', [])
-    realtime_data['operator_events'] = [e for e in operator_data if not (e.get('booking_id') == booking_id)]
+    realtime_data['operator_events'].remove_where('booking_id', booking_id)
     
-    print(f"✓ Operator {operator_name} rejected request {booking_id}")
+    log.info('request_rejected', booking_id=booking_id, operator=operator_name)
     return jsonify({'success': True, 'message': 'Request rejected'})
 
 
@@ -1189,35 +2090,41 @@ def get_operator_earnings():
         return jsonify({'success': False}), 401
     
     operator_name = session['user']['name']
-    operator_data = realtime_data.get('operator_events', [])
-    operator_filtered = [o for o in operator_data if o.get('operator_name') == operator_name]
-    
-    print(f"✓ Operator {operator_name} - Total events: {len(operator_filtered)}")
+    etag = make_etag('operator-earnings', operator_name, realtime_data['operator_events'].changes.version,
+                     datetime.now().date(), request.query_string)
+    cached = not_modified(etag)
+    if cached:
+        return cached
     
-    # Calculate earnings from completed assignments
-    total_earnings = 0
-    on_time_count = 0
-    late_count = 0
+    # The ledger keeps day buckets up to date as events change, so no scan happens here
+    today = datetime.now().date()
+    totals = earnings_ledger.totals(operator_name)
+    this_week = earnings_ledger.window(operator_name, today - timedelta(days=today.weekday()), today)
+    this_month = earnings_ledger.window(operator_name, today.replace(day=1), today)
     
-    for event in operator_filtered:
-        if event.get('arrival_status') == 'ON_TIME':
-            total_earnings += 350
-            on_time_count += 1
-        elif event.get('arrival_status') == 'LATE':
-            penalty = event.get('compensation_to_renter_inr', 0) * 0.3
-            earning = max(0, 350 - penalty)
-            total_earnings += earning
-            late_count += 1
-    
-    print(f"  ON_TIME: {on_time_count}, LATE: {late_count}, Total Earnings: ₹{total_earnings}")
+    log.debug('operator_earnings', operator=operator_name, on_time=totals['on_time'], late=totals['late'],
+              earnings=round(totals['earnings'], 2))
     
     earnings = {
-        'total': total_earnings,
-        'this_month': total_earnings * 0.3,
-        'this_week': total_earnings * 0.1
+        'total': round(totals['earnings'], 2),
+        'this_month': round(this_month['earnings'], 2),
+        'this_week': round(this_week['earnings'], 2),
+        'today': round(earnings_ledger.window(operator_name, today, today)['earnings'], 2),
+        'on_time_count': totals['on_time'],
+        'late_count': totals['late']
     }
     
-    return jsonify({'success': True, 'earnings': earnings})
+    if request.args.get('start') and request.args.get('end'):
+        try:
+            start = datetime.fromisoformat(request.args['start']).date()
+            end = datetime.fromisoformat(request.args['end']).date()
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid date range'}), 400
+        if (end - start).days > MAX_REVENUE_DAYS:
+            return jsonify({'success': False, 'error': f'Range is limited to {MAX_REVENUE_DAYS} days'}), 400
+        earnings['range'] = earnings_ledger.window(operator_name, start, end)
+    
+    return tag_response(jsonify({'success': True, 'earnings': earnings}), etag)
 
 
 # ==================== RUN ====================
@@ -0,0 +1,181 @@
+"""
+Grid spatial index over tool positions.
+
+Tools are bucketed into fixed lat/lng cells. A radius query walks cells in
+rings outward from the caller's cell and stops as soon as the nearest
+`limit` matches are known, or the next ring starts beyond the radius, so a
+"20 closest drills within 10 km" lookup only touches a handful of cells even
+with a very large fleet. When the search box holds far more cells than are
+occupied (a wide radius over a sparse fleet), the occupied cells are grouped
+into rings instead of walking the empty ones, so the cost is bounded by the
+fleet rather than growing with the square of the radius.
+
+Longitudes wrap: cell columns are taken modulo the globe, so a query near
+the antimeridian finds tools just across it. The distance at which a ring
+can stop the search is a great-circle lower bound taken at the most
+poleward latitude the ring reaches, and a search box that reaches a pole
+covers every longitude.
+"""
+
+import heapq
+import math
+import threading
+
+
+EARTH_RADIUS_KM = 6371.0088
+# One degree of latitude on the sphere haversine_km measures, so cell bounds agree with its distances
+KM_PER_DEG_LAT = math.radians(EARTH_RADIUS_KM)
+
+
+def wrap_lng(lng):
+    """`lng` in degrees, folded into [-180, 180); in-range values come back untouched"""
+    return lng if -180.0 <= lng < 180.0 else (lng + 180.0) % 360.0 - 180.0
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """toolid -> (lat, lng) with cell buckets for radius / nearest queries; `cell_deg` should divide 360"""
+
+    def __init__(self, cell_deg=0.01):
+        self.cell_deg = cell_deg
+        self._columns = round(360.0 / cell_deg)
+        self._cells = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), self._wrap_col(math.floor(wrap_lng(lng) / self.cell_deg)))
+
+    def _wrap_col(self, col):
+        """Column index folded into the half-open range around 0, so columns on both sides of 180° meet"""
+        half = self._columns // 2
+        return (col + half) % self._columns - half
+
+    def update(self, key, lat, lng):
+        """Insert or move `key`; positions that are not real numbers remove it"""
+        try:
+            lat, lng = float(lat), float(lng)
+        except (TypeError, ValueError):
+            self.remove(key)
+            return
+        if math.isnan(lat) or math.isnan(lng):
+            self.remove(key)
+            return
+        lng = wrap_lng(lng)
+        with self._lock:
+            old = self._positions.get(key)
+            cell = self._cell(lat, lng)
+            if old is not None:
+                old_cell = self._cell(*old)
+                if old_cell != cell:
+                    self._discard(old_cell, key)
+            self._positions[key] = (lat, lng)
+            self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            old = self._positions.pop(key, None)
+            if old is not None:
+                self._discard(self._cell(*old), key)
+
+    def _discard(self, cell, key):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[cell]
+
+    def query(self, lat, lng, radius_km, limit=None, predicate=None):
+        """Return [(distance_km, key)] within `radius_km`, nearest first (at most `limit`, which must be >= 1)"""
+        if limit is not None and limit < 1:
+            return []
+        lat_cells = int(math.ceil(radius_km / (KM_PER_DEG_LAT * self.cell_deg)))
+        lng_cells = self._lng_cells(lat, radius_km)
+        # A box as wide as the globe would list columns twice; its occupied cells are walked instead
+        whole_globe = 2 * lng_cells + 1 > self._columns
+
+        center_row, center_col = self._cell(lat, lng)
+        best = []  # max-heap of (-distance, key) when limit is set
+        found = []
+
+        with self._lock:
+            if whole_globe or (2 * lat_cells + 1) * (2 * lng_cells + 1) > 4 * len(self._cells):
+                shells = self._occupied_rings(center_row, center_col, lat_cells, lng_cells)
+            else:
+                shells = ((ring, self._ring(center_row, center_col, ring, lat_cells, lng_cells))
+                          for ring in range(max(lat_cells, lng_cells) + 1))
+            for ring, cells in shells:
+                inner_km = self._ring_km(lat, ring)
+                if inner_km > radius_km or (limit and len(best) >= limit and inner_km > -best[0][0]):
+                    break
+                for cell in cells:
+                    for key in self._cells.get(cell, ()):
+                        p_lat, p_lng = self._positions[key]
+                        distance = haversine_km(lat, lng, p_lat, p_lng)
+                        if distance > radius_km or (predicate and not predicate(key)):
+                            continue
+                        if not limit:
+                            found.append((distance, key))
+                        elif len(best) < limit:
+                            heapq.heappush(best, (-distance, key))
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, (-distance, key))
+
+        if limit:
+            found = [(-d, key) for d, key in best]
+        found.sort()
+        return found
+
+    def _lng_cells(self, lat, radius_km):
+        """Columns either side of the query's that can hold a match, capped at half the globe"""
+        # A match is at most radius_km away in latitude, so never more poleward than this
+        poleward = math.radians(min(90.0, abs(lat) + radius_km / KM_PER_DEG_LAT))
+        # Points within angle d at latitudes up to `poleward` differ in longitude by at most 2 asin(sin(d/2) / cos(poleward))
+        spread = math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2) / max(math.cos(poleward), 1e-12)
+        if spread >= 1.0:
+            return self._columns // 2
+        return min(int(math.ceil(math.degrees(2 * math.asin(spread)) / self.cell_deg)), self._columns // 2)
+
+    def _ring_km(self, lat, ring):
+        """Smallest distance any point in ring `ring` can be from a query point at latitude `lat`"""
+        gap = math.radians(max(ring - 1, 0) * self.cell_deg)
+        # Cells in the ring are `gap` away in latitude or in longitude; a longitude gap shrinks towards
+        # the poles, so it is measured at the most poleward latitude the ring reaches
+        poleward = math.radians(min(90.0, abs(lat) + (ring + 1) * self.cell_deg))
+        across = 2 * math.asin(min(1.0, math.cos(poleward) * math.sin(min(gap, math.pi) / 2)))
+        return EARTH_RADIUS_KM * min(gap, across)
+
+    def _occupied_rings(self, row, col, max_rows, max_cols):
+        """(ring, cells) for the occupied cells inside the search box, innermost ring first"""
+        rings = {}
+        for cell in self._cells:
+            dr, dc = abs(cell[0] - row), abs(self._wrap_col(cell[1] - col))
+            if dr <= max_rows and dc <= max_cols:
+                rings.setdefault(max(dr, dc), []).append(cell)
+        for ring in sorted(rings):
+            yield ring, rings[ring]
+
+    def _ring(self, row, col, ring, max_rows, max_cols):
+        if ring == 0:
+            yield (row, col)
+            return
+        for dr in range(-ring, ring + 1):
+            if abs(dr) > max_rows:
+                continue
+            if abs(dr) == ring:
+                for dc in range(-min(ring, max_cols), min(ring, max_cols) + 1):
+                    yield (row + dr, self._wrap_col(col + dc))
+            else:
+                for dc in (-ring, ring):
+                    if abs(dc) <= max_cols:
+                        yield (row + dr, self._wrap_col(col + dc))
@@ -0,0 +1,115 @@
+"""
+Pub/sub broker behind /stream/<role>.
+
+Every connection gets its own bounded ring buffer and condition variable,
+so each published event reaches every subscriber of a role as soon as it
+is published. Events carry monotonically increasing ids and a short
+per-role history is kept so a reconnecting EventSource can resume from
+its Last-Event-ID. When a slow consumer's buffer overflows the oldest
+events are dropped and counted.
+"""
+
+import itertools
+import threading
+from collections import deque
+
+
+class Subscription:
+    """One SSE connection's view of the broker"""
+
+    def __init__(self, broker, role, buffer_size):
+        self.broker = broker
+        self.role = role
+        self.dropped = 0
+        self.closed = False
+        self._buffer = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def push(self, event_id, event):
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+                self.broker._count_drop()
+            self._buffer.append((event_id, event))
+            self._cond.notify()
+
+    def wait(self, timeout=None):
+        """Block until events are available (or timeout); return and clear them"""
+        with self._cond:
+            if not self._buffer and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._buffer)
+            self._buffer.clear()
+            return events
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self.broker.unsubscribe(self)
+
+
+class SSEBroker:
+    """Fan-out of dashboard events to every connected client per role"""
+
+    def __init__(self, roles, buffer_size=256, history_size=1000):
+        self.roles = tuple(roles)
+        self.buffer_size = buffer_size
+        self._ids = itertools.count(1)
+        self._history = {role: deque(maxlen=history_size) for role in self.roles}
+        self._subscribers = {role: set() for role in self.roles}
+        self._lock = threading.RLock()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, event, roles=None, event_id=None):
+        """Deliver `event` to every subscriber of `roles` (default: all); returns its id
+
+        `event_id` lets a shared state backend stamp events with a cluster-wide
+        sequence so Last-Event-ID resumes on any worker; it must keep increasing.
+        """
+        with self._lock:
+            event_id = next(self._ids) if event_id is None else event_id
+            self.published += 1
+            for role in roles or self.roles:
+                self._history[role].append((event_id, event))
+                for subscription in self._subscribers[role]:
+                    subscription.push(event_id, event)
+        return event_id
+
+    def subscribe(self, role, last_event_id=None):
+        """Register a connection; replays history newer than `last_event_id`"""
+        subscription = Subscription(self, role, self.buffer_size)
+        with self._lock:
+            if last_event_id is not None:
+                for event_id, event in self._history[role]:
+                    if event_id > last_event_id:
+                        subscription.push(event_id, event)
+            self._subscribers[role].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.role].discard(subscription)
+
+    def _count_drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'published': self.published,
+                'dropped': self.dropped,
+                'roles': {
+                    role: {
+                        'clients': len(subs),
+                        'queue_depths': [len(s) for s in subs],
+                        'dropped': sum(s.dropped for s in subs)
+                    }
+                    for role, subs in self._subscribers.items()
+                }
+            }
@@ -0,0 +1,374 @@
+"""
+Pluggable state backends: where mutations are journaled and how worker
+processes share them.
+
+LocalBackend (default) is one process: mutations go to the on-disk
+EventLog, dashboard events straight to the local SSE broker, and every
+lease is granted. This is what `python server.py` runs.
+
+SQLiteBackend lets any number of workers on one host share state through
+one SQLite database in WAL mode:
+
+    STATE_BACKEND=sqlite gunicorn -k gthread -w 4 --threads 16 server:app
+
+(without --preload: each worker must start its own background threads.)
+It has four tables:
+  - entries        the global mutation journal. A worker writes only under
+                   BEGIN IMMEDIATE and after applying every entry it has not
+                   yet seen, so all workers apply the same entries in the
+                   same order.
+  - notifications  dashboard events. Every worker, the origin included,
+                   relays them to its own SSE clients in seq order, so the
+                   seq doubles as a cluster-wide Last-Event-ID.
+  - snapshots      full state written by whichever worker holds the
+                   'snapshot' lease. Boot = newest snapshot + later entries.
+  - leases         named, expiring ownership ('mqtt-ingest', 'snapshot',
+                   'seed') so exactly one worker holds each role.
+Workers see each other's writes on poll(), which the server runs every
+STATE_POLL_SECONDS.
+"""
+
+import json
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from event_log import json_default
+
+
+class LocalBackend:
+    """Single-process state: optional EventLog for durability, nothing shared"""
+
+    shared = False
+
+    def __init__(self, event_log=None):
+        self.event_log = event_log
+        self.lock = event_log.lock if event_log is not None else threading.RLock()
+        self._deliver = None
+
+    def bind(self, apply_entry, deliver_event, on_stale=None):
+        self._deliver = deliver_event
+
+    def writing(self):
+        return self.lock
+
+    def recover(self, seed, capture):
+        """Return (snapshot state, log tail); runs seed() instead when there is no snapshot"""
+        state, tail = self.event_log.recover() if self.event_log is not None else (None, [])
+        if state is None:
+            seed()
+        return state, tail
+
+    def append(self, entry):
+        if self.event_log is not None:
+            return self.event_log.append(entry)
+
+    def broadcast(self, event):
+        self._deliver(event, None)
+
+    def poll(self):
+        return 0
+
+    def acquire_lease(self, name, ttl):
+        return True
+
+    def release_lease(self, name):
+        pass
+
+    def setting(self, key, default):
+        return default()
+
+    def snapshot(self, capture):
+        return self.event_log.snapshot(capture) if self.event_log is not None else None
+
+    def sync(self):
+        if self.event_log is not None:
+            self.event_log.sync()
+
+    @property
+    def durable(self):
+        return self.event_log is not None
+
+    @property
+    def entries_since_snapshot(self):
+        return self.event_log.entries_since_snapshot if self.event_log is not None else 0
+
+    @property
+    def snapshot_at(self):
+        return self.event_log.snapshot_at if self.event_log is not None else None
+
+    def stats(self):
+        return {'backend': 'local', 'durable': self.durable,
+                'lsn': self.event_log.lsn if self.event_log is not None else None}
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notifications (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    event TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    seq INTEGER PRIMARY KEY,
+    state TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SQLiteBackend:
+    """State shared by every worker process on the host through one SQLite file"""
+
+    shared = True
+    durable = True
+
+    def __init__(self, path, notification_backlog=1000, notification_retention=10000, busy_timeout_ms=10000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(3)}"
+        self.notification_retention = notification_retention
+        self.lock = threading.RLock()
+        self.position = 0
+        self._depth = 0
+        self._applying = False
+        self._written = None
+        self._apply_entry = self._deliver = self._on_stale = None
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        self._conn.executescript(SCHEMA)
+        # Start relaying a little history so Last-Event-ID resumes work right after boot
+        latest = self._scalar('SELECT MAX(seq) FROM notifications') or 0
+        self.notified = max(0, latest - notification_backlog)
+
+    def _scalar(self, sql, args=()):
+        row = self._conn.execute(sql, args).fetchone()
+        return row[0] if row else None
+
+    def bind(self, apply_entry, deliver_event, on_stale=None):
+        """apply_entry(entry) replays another worker's mutation; deliver_event(event, seq) feeds SSE"""
+        self._apply_entry = apply_entry
+        self._deliver = deliver_event
+        self._on_stale = on_stale
+
+    # ---------- journal ----------
+
+    @contextmanager
+    def writing(self):
+        """Exclusive cluster-wide write section, entered only once this worker is caught up"""
+        with self.lock:
+            outermost = self._depth == 0 and not self._applying
+            if outermost:
+                self._conn.execute('BEGIN IMMEDIATE')
+            self._depth += 1
+            try:
+                if outermost:
+                    self._catch_up()
+                yield
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    self._conn.execute('ROLLBACK')
+                    self._written = None
+                raise
+            self._depth -= 1
+            if outermost:
+                self._conn.execute('COMMIT')
+                if self._written is not None:
+                    self.position = self._written
+                    self._written = None
+
+    def append(self, entry):
+        with self.lock:
+            if self._applying:
+                # Replaying someone else's entry; it is already in the journal
+                return None
+            if self._depth == 0:
+                raise RuntimeError('SQLiteBackend.append() must run inside writing()')
+            cursor = self._conn.execute('INSERT INTO entries (origin, entry) VALUES (?, ?)',
+                                        (self.owner, json.dumps(entry, separators=(',', ':'), default=json_default)))
+            self._written = cursor.lastrowid
+            return self._written
+
+    def _catch_up(self):
+        compacted = int(self._scalar("SELECT value FROM settings WHERE key = 'compacted_through'") or 0)
+        if self.position < compacted:
+            # Entries this worker never applied are gone; only a reload from the snapshot can recover
+            if self._on_stale:
+                self._on_stale(self.position, compacted)
+            return 0
+        rows = self._conn.execute('SELECT seq, entry FROM entries WHERE seq > ? ORDER BY seq',
+                                  (self.position,)).fetchall()
+        self._applying = True
+        try:
+            for seq, entry in rows:
+                self._apply_entry(json.loads(entry))
+                self.position = seq
+        finally:
+            self._applying = False
+        return len(rows)
+
+    def poll(self):
+        """Apply other workers' entries and relay new notifications; returns entries applied"""
+        with self.lock:
+            if self._depth:
+                return 0
+            applied = self._catch_up()
+            self._relay()
+            return applied
+
+    # ---------- notifications ----------
+
+    def broadcast(self, event):
+        with self.lock:
+            self._conn.execute('INSERT INTO notifications (event, created) VALUES (?, ?)',
+                               (json.dumps(event, default=json_default), time.time()))
+            if not self._depth:
+                self._relay()
+
+    def _relay(self):
+        rows = self._conn.execute('SELECT seq, event FROM notifications WHERE seq > ? ORDER BY seq',
+                                  (self.notified,)).fetchall()
+        for seq, event in rows:
+            self._deliver(json.loads(event), seq)
+            self.notified = seq
+
+    # ---------- boot and snapshots ----------
+
+    def recover(self, seed, capture):
+        """Return (snapshot state, entries after it)
+
+        With no snapshot yet, exactly one worker (the 'seed' lease holder)
+        runs seed() and publishes the result as the first snapshot; the
+        others wait for it and load it.
+        """
+        while True:
+            with self.lock:
+                row = self._conn.execute('SELECT seq, state FROM snapshots ORDER BY seq DESC LIMIT 1').fetchone()
+                if row is not None:
+                    self.position = row[0]
+                    rows = self._conn.execute('SELECT seq, entry FROM entries WHERE seq > ? ORDER BY seq',
+                                              (self.position,)).fetchall()
+                    if rows:
+                        self.position = rows[-1][0]
+                    return json.loads(row[1]), [json.loads(entry) for _, entry in rows]
+            if self.acquire_lease('seed', 300):
+                seed()
+                self.snapshot(capture)
+                self.release_lease('seed')
+                return None, []
+            print("⏳ Waiting for another worker to seed the shared state...")
+            time.sleep(1)
+
+    def snapshot(self, capture):
+        with self.writing():
+            seq = self.position
+            state = capture()
+        text = json.dumps(state, separators=(',', ':'), default=json_default)
+        with self.lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('INSERT OR REPLACE INTO snapshots (seq, state, created) VALUES (?, ?, ?)',
+                                   (seq, text, time.time()))
+                # Keep one older generation so a worker that lags slightly behind can still catch up
+                keep = [s for (s,) in self._conn.execute('SELECT seq FROM snapshots ORDER BY seq DESC LIMIT 2')]
+                floor = keep[-1]
+                self._conn.execute('DELETE FROM snapshots WHERE seq < ?', (floor,))
+                self._conn.execute('DELETE FROM entries WHERE seq <= ?', (floor,))
+                self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('compacted_through', ?)",
+                                   (str(floor),))
+                latest = self._scalar('SELECT MAX(seq) FROM notifications') or 0
+                self._conn.execute('DELETE FROM notifications WHERE seq <= ?',
+                                   (latest - self.notification_retention,))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return seq
+
+    def sync(self):
+        # Every write is its own committed SQLite transaction
+        pass
+
+    @property
+    def entries_since_snapshot(self):
+        with self.lock:
+            latest = self._scalar('SELECT MAX(seq) FROM entries') or 0
+            return max(0, latest - (self._scalar('SELECT MAX(seq) FROM snapshots') or 0))
+
+    @property
+    def snapshot_at(self):
+        with self.lock:
+            return self._scalar('SELECT MAX(created) FROM snapshots')
+
+    # ---------- leases and settings ----------
+
+    def acquire_lease(self, name, ttl):
+        """Take or renew the named lease; True while this worker holds it"""
+        now = time.time()
+        with self.lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute('SELECT owner, expires FROM leases WHERE name = ?', (name,)).fetchone()
+                held = row is None or row[0] == self.owner or row[1] < now
+                if held:
+                    self._conn.execute('INSERT OR REPLACE INTO leases (name, owner, expires) VALUES (?, ?, ?)',
+                                       (name, self.owner, now + ttl))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return held
+
+    def release_lease(self, name):
+        with self.lock:
+            self._conn.execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, self.owner))
+
+    def setting(self, key, default):
+        """Cluster-wide value for `key`, created from default() by whichever worker asks first"""
+        with self.lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                value = self._scalar('SELECT value FROM settings WHERE key = ?', (key,))
+                if value is None:
+                    value = default()
+                    self._conn.execute('INSERT INTO settings (key, value) VALUES (?, ?)', (key, value))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return value
+
+    def stats(self):
+        with self.lock:
+            leases = self._conn.execute('SELECT name, owner, expires FROM leases').fetchall()
+        return {
+            'backend': 'sqlite',
+            'worker': self.owner,
+            'position': self.position,
+            'notified': self.notified,
+            'leases': {name: {'owner': owner, 'mine': owner == self.owner, 'expires_in': round(expires - time.time(), 1)}
+                       for name, owner, expires in leases}
+        }
@@ -32,15 +32,72 @@ function showSection(sectionId) {
     }
 }
 
+// ==================== DELTA SYNC ====================
+
+const syncCursors = {};
+
+// Only the attributes the cards render; the server always adds the id/sort keys
+const CARD_FIELDS = {
+    '/api/operator/requests': ['toolid', 'tool_type', 'tool_image', 'tool_image_srcset', 'tool_image_sources',
+        'tool_name', 'location_name', 'expected_arrival_iso', 'estimated_earnings'],
+    '/api/operator/assignments': ['toolid', 'tool_type', 'tool_image', 'tool_image_srcset', 'tool_image_sources',
+        'tool_name', 'arrival_iso', 'late_mins_operator', 'expected_arrival_iso', 'arrival_status', 'latitude',
+        'longitude', 'location_name', 'accepted_iso', 'compensation_to_renter_inr']
+};
+
+async function fetchDelta(url) {
+    const cursor = syncCursors[url];
+    const params = new URLSearchParams();
+    if (cursor !== undefined) {
+        params.set('since', cursor);
+    }
+    if (CARD_FIELDS[url]) {
+        params.set('fields', CARD_FIELDS[url].join(','));
+    }
+    const query = params.toString();
+    const response = await fetch(query ? `${url}?${query}` : url);
+    const result = await response.json();
+    
+    if (result.success && result.cursor !== undefined) {
+        syncCursors[url] = result.cursor;
+    }
+    return result;
+}
+
+function hasChanges(result, listKey) {
+    return !result.delta || result[listKey].length > 0 || result.deleted.length > 0;
+}
+
+function mergeDelta(current, result, listKey, idField) {
+    if (!result.delta) {
+        return result[listKey];
+    }
+    
+    const removed = new Set(result.deleted);
+    const changed = new Map(result[listKey].map(item => [item[idField], item]));
+    const merged = [];
+    
+    current.forEach(item => {
+        const id = item[idField];
+        if (changed.has(id)) {
+            merged.push(changed.get(id));
+            changed.delete(id);
+        } else if (!removed.has(id)) {
+            merged.push(item);
+        }
+    });
+    
+    return merged.concat([...changed.values()]);
+}
+
 // ==================== LOAD REQUESTS ====================
 
 async function loadRequests() {
     try {
-        const response = await fetch('/api/operator/requests');
-        const result = await response.json();
+        const result = await fetchDelta('/api/operator/requests');
         
-        if (result.success) {
-            pendingRequests = result.requests;
+        if (result.success && hasChanges(result, 'requests')) {
+            pendingRequests = mergeDelta(pendingRequests, result, 'requests', 'booking_id');
             console.log('✓ Loaded pending requests:', pendingRequests.length);
             displayRequests(pendingRequests);
             updateRequestCount(pendingRequests.length);
@@ -69,7 +126,7 @@ function displayRequests(requests) {
         <div class="request-card">
             ${request.tool_image ? `
                 <div class="tool-image-container-small">
-                    <img src="${request.tool_image}" alt="${request.tool_type || 'Tool'}" class="tool-image-small" onerror="this.src='/static/images/tools/drill.png'">
+                    ${toolImageHtml(request, 'tool-image-small', '120px')}
                 </div>
             ` : ''}
             
@@ -181,11 +238,10 @@ async function rejectRequest(bookingId) {
 
 async function loadAssignments() {
     try {
-        const response = await fetch('/api/operator/assignments');
-        const result = await response.json();
+        const result = await fetchDelta('/api/operator/assignments');
         
-        if (result.success) {
-            myAssignments = result.assignments;
+        if (result.success && hasChanges(result, 'assignments')) {
+            myAssignments = mergeDelta(myAssignments, result, 'assignments', 'booking_id');
             console.log('✓ Loaded assignments:', myAssignments.length);
             displayAssignments(myAssignments);
             displayTodaySchedule(myAssignments);
@@ -220,7 +276,7 @@ function displayAssignments(assignments) {
             <div class="assignment-card">
                 ${assignment.tool_image ? `
                     <div class="tool-image-container-small">
-                        <img src="${assignment.tool_image}" alt="${assignment.tool_type || 'Tool'}" class="tool-image-small" onerror="this.src='/static/images/tools/drill.png'">
+                        ${toolImageHtml(assignment, 'tool-image-small', '120px')}
                         ${isCompleted ? '<div class="completed-badge">✓ COMPLETED</div>' : 
                           isPending ? '<div class="pending-badge">⏳ UPCOMING</div>' : ''}
                     </div>
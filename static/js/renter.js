@@ -28,15 +28,72 @@ function showSection(sectionId) {
     }
 }
 
+// ==================== DELTA SYNC ====================
+
+const syncCursors = {};
+
+// Only the attributes the cards render; the server always adds the id/sort keys
+const CARD_FIELDS = {
+    '/api/renter/nearby-tools': ['tool_type', 'tool_name', 'availability', 'rating', 'distance_km_from_user',
+        'tool_image', 'tool_image_srcset', 'tool_image_sources', 'hourly_rate', 'daily_rate',
+        'expected_available_iso', 'latitude', 'longitude'],
+    '/api/renter/bookings': ['toolid', 'tool_type', 'tool_name', 'rental_start_iso', 'rental_end_iso',
+        'returned_iso', 'payment_status', 'cancel_status', 'amount_inr', 'operator_requested']
+};
+
+async function fetchDelta(url) {
+    const cursor = syncCursors[url];
+    const params = new URLSearchParams();
+    if (cursor !== undefined) {
+        params.set('since', cursor);
+    }
+    if (CARD_FIELDS[url]) {
+        params.set('fields', CARD_FIELDS[url].join(','));
+    }
+    const query = params.toString();
+    const response = await fetch(query ? `${url}?${query}` : url);
+    const result = await response.json();
+    
+    if (result.success && result.cursor !== undefined) {
+        syncCursors[url] = result.cursor;
+    }
+    return result;
+}
+
+function hasChanges(result, listKey) {
+    return !result.delta || result[listKey].length > 0 || result.deleted.length > 0;
+}
+
+function mergeDelta(current, result, listKey, idField) {
+    if (!result.delta) {
+        return result[listKey];
+    }
+    
+    const removed = new Set(result.deleted);
+    const changed = new Map(result[listKey].map(item => [item[idField], item]));
+    const merged = [];
+    
+    current.forEach(item => {
+        const id = item[idField];
+        if (changed.has(id)) {
+            merged.push(changed.get(id));
+            changed.delete(id);
+        } else if (!removed.has(id)) {
+            merged.push(item);
+        }
+    });
+    
+    return merged.concat([...changed.values()]);
+}
+
 // ==================== LOAD NEARBY TOOLS ====================
 
 async function loadNearbyTools() {
     try {
-        const response = await fetch('/api/renter/nearby-tools');
-        const result = await response.json();
+        const result = await fetchDelta('/api/renter/nearby-tools');
         
-        if (result.success) {
-            allNearbyTools = result.tools;
+        if (result.success && hasChanges(result, 'tools')) {
+            allNearbyTools = mergeDelta(allNearbyTools, result, 'tools', 'toolid');
             console.log('Loaded tools:', allNearbyTools.length);
             displayNearbyTools(allNearbyTools);
         } else {
@@ -65,7 +122,7 @@ function displayNearbyTools(tools) {
         <div class="tool-card">
             ${tool.tool_image ? `
                 <div class="tool-image-container">
-                    <img src="${tool.tool_image}" alt="${tool.tool_type || 'Tool'}" class="tool-image" onerror="this.src='/static/images/tools/drill.png'">
+                    ${toolImageHtml(tool, 'tool-image', '(max-width: 640px) 100vw, 400px')}
                     <span class="status-badge-overlay ${getStatusBadgeClass(tool.availability)}">${tool.availability}</span>
                 </div>
             ` : ''}
@@ -557,11 +614,10 @@ function completeBooking(bookingData) {
 
 async function loadMyBookings() {
     try {
-        const response = await fetch('/api/renter/bookings');
-        const result = await response.json();
+        const result = await fetchDelta('/api/renter/bookings');
         
-        if (result.success) {
-            myBookings = result.bookings;
+        if (result.success && hasChanges(result, 'bookings')) {
+            myBookings = mergeDelta(myBookings, result, 'bookings', 'booking_id');
             console.log('Loaded bookings:', myBookings.length);
             displayMyBookings(myBookings);
             displayRecentBookings(myBookings.slice(0, 5));
@@ -690,11 +746,10 @@ function filterBookings() {
 
 async function loadOperatorTracking() {
     try {
-        const response = await fetch('/api/renter/operator-tracking');
-        const result = await response.json();
+        const result = await fetchDelta('/api/renter/operator-tracking');
         
-        if (result.success) {
-            operatorTracking = result.data;
+        if (result.success && hasChanges(result, 'data')) {
+            operatorTracking = mergeDelta(operatorTracking, result, 'data', 'booking_id');
             displayOperatorTracking(operatorTracking);
         }
     } catch (error) {
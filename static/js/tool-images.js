@@ -0,0 +1,22 @@
+// ==================== TOOL IMAGES ====================
+
+// Shared by renter.js and operator.js; the dashboards load it before either
+
+const TOOL_IMAGE_FALLBACK = '/static/images/tools/drill.png';
+
+// <picture> over the server's AVIF/WebP/JPEG derivatives; the browser picks the format and width
+function toolImageHtml(item, className, sizes) {
+    const alt = item.tool_type || 'Tool';
+    const sources = Object.entries(item.tool_image_sources || {})
+        .map(([type, srcset]) => `<source type="${type}" srcset="${srcset}" sizes="${sizes}">`)
+        .join('');
+    const srcset = item.tool_image_srcset ? ` srcset="${item.tool_image_srcset}" sizes="${sizes}"` : '';
+    return `<picture>${sources}<img src="${item.tool_image}"${srcset} alt="${alt}" class="${className}" loading="lazy" decoding="async" onerror="useFallbackImage(this)"></picture>`;
+}
+
+function useFallbackImage(img) {
+    img.onerror = null;
+    img.parentNode.querySelectorAll('source').forEach(source => source.remove());
+    img.removeAttribute('srcset');
+    img.src = TOOL_IMAGE_FALLBACK;
+}
@@ -0,0 +1,151 @@
+"""
+Content-hashed static assets.
+
+build() copies every file under static/ (except the seed data in data/) to
+static/dist/ with the start of its SHA-256 in the name
+
+    css/style.css  ->  css/style.3b9f0c21d4.css
+
+and writes static/dist/manifest.json mapping each source path to its hashed
+one. Text assets (JS, CSS, SVG) also get .br and .gz siblings compressed at
+the maximum level, so they are compressed once per build rather than once
+per request; .br only when the brotli package is installed.
+
+A hashed URL never changes content, so the server sends those files with
+`Cache-Control: public, max-age=31536000, immutable` and browsers stop
+revalidating them; editing a file changes its hash, its manifest entry and
+so the URL the templates render.
+
+Builds are incremental and safe to run from several workers at once: a file
+whose hashed name already exists is not rewritten, and everything else is
+written to a temporary name and renamed into place. Earlier versions are
+kept for pages still open with the old HTML until a --clean build.
+
+    python static_assets.py              # build static/dist and its manifest
+    python static_assets.py --clean      # drop previous builds first
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+from http_compression import SUFFIXES, compress, supported_encodings
+
+
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+SKIP_DIRS = ('data', 'dist')
+COMPRESSIBLE_SUFFIXES = ('.js', '.css', '.svg', '.html', '.txt', '.map')
+
+
+def hashed_name(relpath, digest):
+    root, ext = os.path.splitext(relpath)
+    return f'{root}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def write_atomic(path, data, overwrite=False):
+    """Write `data` (bytes, or a function producing them) atomically; returns False if `path` was kept"""
+    if not overwrite and os.path.exists(path):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'wb') as f:
+        f.write(data() if callable(data) else data)
+    os.replace(temp, path)
+    return True
+
+
+def iter_sources(static_dir, skip=SKIP_DIRS):
+    """Source files under `static_dir` as (absolute path, '/'-separated relative path)"""
+    for dirpath, dirnames, filenames in os.walk(static_dir):
+        if os.path.samefile(dirpath, static_dir):
+            dirnames[:] = [d for d in dirnames if d not in skip]
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.startswith('.'):
+                continue
+            source = os.path.join(dirpath, name)
+            yield source, os.path.relpath(source, static_dir).replace(os.sep, '/')
+
+
+def build(static_dir, dist_dir=None):
+    """Hash every asset under `static_dir` into `dist_dir` and write the manifest; returns the manifest"""
+    dist_dir = dist_dir or os.path.join(static_dir, 'dist')
+    encodings = supported_encodings()
+    assets = {}
+    for source, relpath in iter_sources(static_dir):
+        with open(source, 'rb') as f:
+            data = f.read()
+        target = hashed_name(relpath, hashlib.sha256(data).hexdigest())
+        path = os.path.join(dist_dir, target)
+        write_atomic(path, data)
+
+        variants = []
+        if relpath.endswith(COMPRESSIBLE_SUFFIXES):
+            for encoding in encodings:
+                variant = path + SUFFIXES[encoding]
+                if not os.path.exists(variant):
+                    compressed = compress(data, encoding)
+                    # Not worth a variant if compression does not pay for itself
+                    if len(compressed) >= len(data):
+                        continue
+                    write_atomic(variant, compressed)
+                variants.append(encoding)
+        assets[relpath] = {'path': target, 'size': len(data), 'encodings': variants}
+
+    manifest = {'version': 1, 'assets': assets}
+    write_atomic(os.path.join(dist_dir, MANIFEST_NAME),
+                 json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'), overwrite=True)
+    return manifest
+
+
+class AssetManifest:
+    """Source path -> hashed path lookups over a build's manifest"""
+
+    def __init__(self, manifest=None):
+        self.assets = (manifest or {}).get('assets', {})
+        self._encodings = {entry['path']: tuple(entry['encodings']) for entry in self.assets.values()}
+
+    @classmethod
+    def load(cls, dist_dir):
+        """The manifest in `dist_dir`, or an empty one if nothing was built there"""
+        try:
+            with open(os.path.join(dist_dir, MANIFEST_NAME), encoding='utf-8') as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return cls()
+
+    def __len__(self):
+        return len(self.assets)
+
+    def path(self, filename):
+        """Hashed path of a source path like 'js/renter.js', or None if it is not in the build"""
+        entry = self.assets.get(filename)
+        return entry['path'] if entry else None
+
+    def encodings(self, hashed_path):
+        """Encodings with a pre-compressed sibling for a hashed path"""
+        return self._encodings.get(hashed_path, ())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument('--static', default=os.path.join(here, 'static'), help='static directory to build from')
+    parser.add_argument('--dist', help='output directory (default: <static>/dist)')
+    parser.add_argument('--clean', action='store_true', help='remove previous builds first')
+    args = parser.parse_args()
+
+    dist_dir = args.dist or os.path.join(args.static, 'dist')
+    if args.clean:
+        shutil.rmtree(dist_dir, ignore_errors=True)
+    manifest = build(args.static, dist_dir)
+    assets = manifest['assets'].values()
+    print(f"✓ Built {len(assets)} assets ({sum(a['size'] for a in assets) / 1024:.0f} KB) into {dist_dir}")
+    print(f"✓ Pre-compressed: {', '.join(supported_encodings())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Level-gated structured logging for the server.
+
+    log = get_logger('toolease.api')
+    log.debug('nearby_tools', found=len(tools), radius_km=radius_km)
+
+Keyword arguments become fields of the record instead of being formatted
+into the message, and the logger checks its level before anything else
+happens, so a disabled debug call costs one method call and no string
+formatting. configure_logging() attaches one handler to the 'toolease'
+logger that writes each record as a JSON line (LOG_FORMAT=json) or as
+key=value pairs (LOG_FORMAT=text), filtered at LOG_LEVEL.
+"""
+
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+
+ROOT_LOGGER = 'toolease'
+
+_RESERVED = ('exc_info', 'stack_info', 'stacklevel', 'extra')
+
+
+class StructuredAdapter(logging.LoggerAdapter):
+    """Moves keyword arguments into record.fields"""
+
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in _RESERVED}
+        kwargs['extra'] = {**kwargs.get('extra', {}), 'fields': fields}
+        return msg, kwargs
+
+
+class StructuredFormatter(logging.Formatter):
+    """One line per record: a JSON object, or `ts level logger event key=value ...` (+ traceback)"""
+
+    def __init__(self, style='json'):
+        super().__init__()
+        self.style = style
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+            **getattr(record, 'fields', {})
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        if self.style == 'json':
+            return json.dumps(entry, default=str, ensure_ascii=False)
+        exc = entry.pop('exc', None)
+        head = f"{entry.pop('ts')} {entry.pop('level').upper():<7} {entry.pop('logger')} {entry.pop('event')}"
+        line = ' '.join([head, *(f'{key}={json.dumps(value, default=str, ensure_ascii=False)}'
+                                 for key, value in entry.items())])
+        # Tracebacks stay readable in text mode; JSON keeps them in the one object
+        return f'{line}\n{exc}' if exc else line
+
+
+def get_logger(name=ROOT_LOGGER):
+    return StructuredAdapter(logging.getLogger(name), {})
+
+
+def configure_logging(level='INFO', style='json', stream=None):
+    """Route every 'toolease.*' logger to one structured handler at `level`"""
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(StructuredFormatter(style))
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    return logger
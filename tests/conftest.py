@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def server(tmp_path_factory):
+    """server.py imported once, on the in-process broker with scratch state, users and caches"""
+    scratch = tmp_path_factory.mktemp('server')
+    os.environ.update({
+        'MQTT_TRANSPORT': 'local',
+        'PASSWORD_HASH_WORKERS': '0',
+        'USER_DB_PATH': str(scratch / 'users.db'),
+        'EVENT_LOG_DIR': str(scratch / 'eventlog'),
+        'STATE_DB_PATH': str(scratch / 'state.db'),
+        'IMAGE_CACHE_DIR': str(scratch / 'images'),
+        'STATIC_ASSETS': 'off',
+        'LOG_LEVEL': 'WARNING'
+    })
+    # server.py reads its seed data from paths relative to the repository root
+    os.chdir(ROOT)
+    import server
+    return server
+
+
+def login(client, role, name, user_id=None):
+    with client.session_transaction() as session:
+        session['user'] = {'id': user_id or name, 'name': name, 'role': role, 'email': f'{name}@example.com'}
+
+
+@pytest.fixture
+def renter(server):
+    client = server.app.test_client()
+    login(client, 'renter', 'R030')
+    return client
+
+
+@pytest.fixture
+def owner(server):
+    client = server.app.test_client()
+    login(client, 'owner', 'Test Owner')
+    return client
+
+
+@pytest.fixture
+def operator(server):
+    client = server.app.test_client()
+    login(client, 'operator', 'Ravi')
+    return client
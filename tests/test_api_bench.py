@@ -0,0 +1,44 @@
+import importlib.util
+import os
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture(scope='module')
+def bench():
+    spec = importlib.util.spec_from_file_location('api_bench', os.path.join(ROOT, 'benchmarks', 'api_bench.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def report(p50, alloc_peak_kb=100):
+    return {'scales': {'100k': {'endpoints': {'renter_bookings': {'p50': p50, 'alloc_peak_kb': alloc_peak_kb}}}}}
+
+
+def test_scales_round_trip_through_their_labels(bench):
+    assert [bench.parse_scale(text) for text in ('1k', '100K', '1m', '2500')] == [1000, 100000, 1000000, 2500]
+    assert [bench.scale_label(n) for n in (1000, 100000, 1000000, 2500)] == ['1k', '100k', '1M', '2500']
+
+
+def test_percentiles(bench):
+    samples = list(range(1, 101))
+    assert bench.summarize(samples) == {'p50': 51, 'p95': 95, 'p99': 99}
+    assert bench.percentile([], 50) is None
+
+
+def test_compare_flags_only_regressions_past_threshold_and_noise_floor(bench):
+    baseline = report(p50=1.0)
+    assert bench.compare(report(p50=1.1), baseline, threshold=0.2, min_delta_ms=0.05, min_delta_kb=64) == []
+    # 50% slower but under the 1 ms noise floor
+    assert bench.compare(report(p50=1.5), baseline, threshold=0.2, min_delta_ms=1.0, min_delta_kb=64) == []
+    assert bench.compare(report(p50=1.5), baseline, threshold=0.2, min_delta_ms=0.05, min_delta_kb=64) == [
+        ('100k', 'renter_bookings', 'p50', 1.0, 1.5)]
+    assert bench.compare(report(p50=1.0, alloc_peak_kb=400), baseline, threshold=0.2, min_delta_ms=0.05,
+                         min_delta_kb=64) == [('100k', 'renter_bookings', 'alloc_peak_kb', 100, 400)]
+
+
+def test_compare_skips_scales_missing_from_the_baseline(bench):
+    assert bench.compare(report(p50=9.0), {'scales': {}}, threshold=0.2, min_delta_ms=0, min_delta_kb=0) == []
@@ -0,0 +1,66 @@
+import pytest
+
+from event_store import EventCollection, SequenceClock
+
+URL = '/api/renter/nearby-tools'
+
+
+@pytest.fixture
+def other_worker(server, monkeypatch):
+    """Switch the server to a clock with a different epoch, as a second worker process would have"""
+    def switch():
+        monkeypatch.setattr(server.sequence, 'epoch', SequenceClock().epoch)
+    return switch
+
+
+def test_cursor_round_trips_on_its_own_clock():
+    clock = SequenceClock()
+    assert clock.parse(clock.cursor(42)) == 42
+
+
+@pytest.mark.parametrize('cursor', ['42', '', 'abc', 'deadbeef.', 'deadbeef.-1', 'deadbeef.x'])
+def test_malformed_cursors_are_refused(cursor):
+    assert SequenceClock().parse(cursor) is None
+
+
+def test_cursor_from_another_clock_is_refused():
+    assert SequenceClock().parse(SequenceClock().cursor(42)) is None
+
+
+def test_own_cursor_gets_a_delta(renter):
+    cursor = renter.get(URL).get_json()['cursor']
+    result = renter.get(f'{URL}?since={cursor}').get_json()
+    assert result['delta'] is True
+    assert result['tools'] == []
+
+
+def test_cursor_from_another_worker_gets_the_full_list(renter, other_worker):
+    full = renter.get(URL).get_json()
+    other_worker()
+    result = renter.get(f"{URL}?since={full['cursor']}").get_json()
+    assert result['delta'] is False
+    assert len(result['tools']) == len(full['tools'])
+    assert result['cursor'] != full['cursor']
+
+
+def test_etag_from_another_worker_does_not_match(renter, other_worker):
+    etag = renter.get(URL).headers['ETag']
+    other_worker()
+    response = renter.get(URL, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_collect_changes_scopes_and_tombstones(server):
+    bookings = EventCollection('bookings', ('booking_id', 'renter_id'))
+    bookings.extend([{'booking_id': 'B1', 'renter_id': 'R1'}, {'booking_id': 'B2', 'renter_id': 'R2'}])
+    cursor = bookings.changes.version
+    bookings.append({'booking_id': 'B3', 'renter_id': 'R1'})
+    bookings.update(bookings.first('booking_id', 'B1'), {'hidden': True})
+    bookings.remove_where('booking_id', 'B2')
+
+    mine = lambda booking: booking['renter_id'] == 'R1'
+    changed, deleted = server.collect_changes(bookings.changes, cursor, mine, lambda b: not b.get('hidden'))
+    assert [b['booking_id'] for b in changed] == ['B3']
+    assert deleted == ['B1']
+    assert server.collect_changes(bookings.changes, None, mine) is None
@@ -0,0 +1,137 @@
+import os
+
+import pytest
+
+from event_log import EventLog
+from event_store import EventCollection
+from state_backend import LocalBackend
+
+
+def entries(n, start=0):
+    return [{'c': 'bookings', 'op': 'append', 'r': {'booking_id': f'B{start + i}'}} for i in range(n)]
+
+
+def reopen(directory, **options):
+    log = EventLog(str(directory), **options)
+    return log, log.recover()
+
+
+def segment_paths(directory):
+    return sorted(os.path.join(directory, n) for n in os.listdir(directory) if n.endswith('.log'))
+
+
+def test_entries_survive_a_restart(tmp_path):
+    log, (state, tail) = reopen(tmp_path)
+    assert (state, tail) == (None, [])
+    for entry in entries(5):
+        log.append(entry)
+    log.close()
+
+    log, (state, tail) = reopen(tmp_path)
+    assert state is None
+    assert [e['lsn'] for e in tail] == [1, 2, 3, 4, 5]
+    assert tail[0]['r'] == {'booking_id': 'B0'}
+    assert log.append(entries(1)[0]) == 6
+    log.close()
+
+
+def test_segments_rotate_and_snapshots_compact_them(tmp_path):
+    log, _ = reopen(tmp_path, segment_bytes=200)
+    for entry in entries(20):
+        log.append(entry)
+    assert len(segment_paths(tmp_path)) > 3
+    assert log.snapshot(lambda: {'bookings': ['state at 20']}) == 20
+    assert len(segment_paths(tmp_path)) == 1
+    for entry in entries(2, start=20):
+        log.append(entry)
+    log.close()
+
+    log, (state, tail) = reopen(tmp_path)
+    assert state == {'bookings': ['state at 20']}
+    assert [e['lsn'] for e in tail] == [21, 22]
+    log.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    log, _ = reopen(tmp_path)
+    for entry in entries(3):
+        log.append(entry)
+    log.close()
+    path = segment_paths(tmp_path)[-1]
+    with open(path, 'ab') as f:
+        f.write(b'1234abcd {"lsn":4,"c":"boo')
+    size = os.path.getsize(path)
+
+    log, (_, tail) = reopen(tmp_path)
+    assert [e['lsn'] for e in tail] == [1, 2, 3]
+    assert os.path.getsize(path) < size
+    assert log.append(entries(1)[0]) == 4
+    log.close()
+
+    log, (_, tail) = reopen(tmp_path)
+    assert [e['lsn'] for e in tail] == [1, 2, 3, 4]
+    log.close()
+
+
+def test_crc_mismatch_ends_recovery_and_sets_later_segments_aside(tmp_path):
+    log, _ = reopen(tmp_path, segment_bytes=150)
+    for entry in entries(10):
+        log.append(entry)
+    log.close()
+    first, *later = segment_paths(tmp_path)
+    assert later
+    with open(first, 'rb') as f:
+        lines = f.readlines()
+    # Flip a byte of the second entry's body without touching its checksum
+    lines[1] = lines[1].replace(b'B1', b'B9')
+    with open(first, 'wb') as f:
+        f.writelines(lines)
+
+    log, (_, tail) = reopen(tmp_path)
+    assert [e['lsn'] for e in tail] == [1]
+    assert segment_paths(tmp_path) == [first]
+    assert all(os.path.exists(path + '.corrupt') for path in later)
+    log.close()
+
+
+def test_only_one_process_may_own_the_log(tmp_path):
+    log, _ = reopen(tmp_path)
+    with pytest.raises(RuntimeError):
+        EventLog(str(tmp_path))
+    log.close()
+
+
+def journaled(directory):
+    backend = LocalBackend(EventLog(str(directory)))
+    _, tail = backend.recover(lambda: None, None)
+    collection = EventCollection('operator_events', ('booking_id', 'operator_name'))
+    for entry in tail:
+        collection.replay(entry)
+    collection.attach_journal(backend)
+    return backend, collection
+
+
+def test_replay_resolves_updates_to_the_same_record(tmp_path):
+    backend, events = journaled(tmp_path)
+    events.extend([
+        {'booking_id': 'B1', 'operator_name': 'Ravi', 'status': 'assigned'},
+        {'booking_id': 'B1', 'operator_name': 'Asha', 'status': 'assigned'},
+        {'booking_id': 'B2', 'operator_name': 'Ravi', 'status': 'assigned'}
+    ])
+    # The second record under B1: its locator is its position within that index bucket
+    second = events.lookup('booking_id', 'B1')[1]
+    events.update(second, {'status': 'accepted', 'operator_name': 'Ravi'})
+    second['eta_min'] = 12
+    events.touch(second)
+    events.remove_where('booking_id', 'B2')
+    events.append({'booking_id': 'B3', 'operator_name': 'Asha', 'status': 'assigned'})
+    events.trim(3)
+    expected = [dict(record) for record in events]
+    backend.event_log.close()
+
+    backend, replayed = journaled(tmp_path)
+    assert [dict(record) for record in replayed] == expected
+    assert [r['status'] for r in replayed.lookup('operator_name', 'Ravi')] == ['assigned', 'accepted']
+    assert replayed.lookup('booking_id', 'B1')[1]['eta_min'] == 12
+    assert replayed.lookup('booking_id', 'B2') == []
+    backend.event_log.close()
@@ -0,0 +1,72 @@
+import pytest
+
+from event_store import ChangeLog, EventCollection
+
+
+@pytest.fixture
+def bookings():
+    collection = EventCollection('bookings', ('renter_id', 'booking_id'), key_field='booking_id')
+    collection.extend([
+        {'booking_id': 'B1', 'renter_id': 'R1'},
+        {'booking_id': 'B2', 'renter_id': 'R2'},
+        {'booking_id': 'B3', 'renter_id': 'R1'}
+    ])
+    return collection
+
+
+def ids(records):
+    return [r['booking_id'] for r in records]
+
+
+def test_lookups_use_the_indexes(bookings):
+    assert ids(bookings.lookup('renter_id', 'R1')) == ['B1', 'B3']
+    assert ids(bookings.lookup_many('renter_id', ['R2', 'R1', 'R9'])) == ['B2', 'B1', 'B3']
+    assert bookings.first('booking_id', 'B2')['renter_id'] == 'R2'
+    assert bookings.count('renter_id', 'R1') == 2
+    assert bookings.lookup('renter_id', 'R9') == [] and bookings.first('booking_id', 'B9') is None
+
+
+def test_update_moves_a_record_between_buckets(bookings):
+    bookings.update(bookings.first('booking_id', 'B1'), {'renter_id': 'R2', 'status': 'moved'})
+    assert ids(bookings.lookup('renter_id', 'R1')) == ['B3']
+    assert ids(bookings.lookup('renter_id', 'R2')) == ['B2', 'B1']
+
+
+def test_remove_and_trim_keep_indexes_in_step(bookings):
+    assert ids(bookings.remove_where('renter_id', 'R2')) == ['B2']
+    bookings.append({'booking_id': 'B4', 'renter_id': 'R1'})
+    bookings.trim(2)
+    assert ids(bookings) == ['B3', 'B4']
+    assert ids(bookings.lookup('renter_id', 'R1')) == ['B3', 'B4']
+    assert bookings.first('booking_id', 'B1') is None
+
+
+def test_listeners_see_every_mutation(bookings):
+    seen = []
+    bookings.add_listener(lambda action, record: seen.append((action, record['booking_id'])))
+    bookings.append({'booking_id': 'B4', 'renter_id': 'R3'})
+    bookings.update(bookings.first('booking_id', 'B4'), {'status': 'paid'})
+    bookings.remove_where('booking_id', 'B2')
+    bookings.trim(2)
+    assert seen == [('insert', 'B4'), ('update', 'B4'), ('delete', 'B2'), ('expire', 'B1')]
+
+
+def test_changelog_reports_changes_and_tombstones_after_a_cursor(bookings):
+    cursor = bookings.changes.version
+    bookings.update(bookings.first('booking_id', 'B1'), {'status': 'paid'})
+    bookings.remove_where('booking_id', 'B2')
+    changes = bookings.changes.since(cursor)
+    assert [(key, deleted) for key, _, deleted in changes] == [('B1', False), ('B2', True)]
+    assert bookings.changes.since(bookings.changes.version) == []
+
+
+def test_forgotten_history_needs_a_full_reload():
+    changes = ChangeLog('id', max_entries=2)
+    records = [{'id': n} for n in range(4)]
+    cursor = changes.version
+    for record in records:
+        changes.touch(record)
+    assert changes.since(cursor) is None
+    assert [key for key, _, _ in changes.since(changes.horizon)] == [2, 3]
+    changes.reset()
+    assert changes.since(changes.version - 1) is None
@@ -0,0 +1,61 @@
+import pytest
+
+from geofence_engine import GeofenceEngine, INSIDE, OUTSIDE, UNKNOWN
+
+CENTER = (17.385, 78.4867)
+# About 111 m of latitude
+STEP = 0.001
+
+
+@pytest.fixture
+def engine():
+    engine = GeofenceEngine(capacity=2)
+    engine.set_fence('T1', *CENTER, 200)
+    return engine
+
+
+def move(engine, tool_id, north):
+    engine.update_position(tool_id, CENTER[0] + north * STEP, CENTER[1])
+    return [(t['toolid'], t['breach_type']) for t in engine.evaluate()]
+
+
+def test_first_fix_sets_state_without_a_transition(engine):
+    assert move(engine, 'T1', 5) == []
+    assert engine.status('T1')['state'] == OUTSIDE
+
+
+def test_exit_and_entry_are_reported_once(engine):
+    move(engine, 'T1', 0)
+    assert move(engine, 'T1', 3) == [('T1', 'exit')]
+    assert move(engine, 'T1', 4) == []
+    assert move(engine, 'T1', 1) == [('T1', 'entry')]
+    assert engine.status('T1')['state'] == INSIDE
+
+
+def test_transition_payload(engine):
+    move(engine, 'T1', 0)
+    engine.update_position('T1', CENTER[0] + 3 * STEP, CENTER[1])
+    transition, = engine.evaluate()
+    assert transition['within_fence'] is False
+    assert transition['geo_radius_m'] == 200
+    assert transition['distance_m'] == pytest.approx(333.6, abs=1)
+
+
+def test_tools_without_a_fence_or_position_stay_unknown(engine):
+    engine.update_position('T2', *CENTER)
+    engine.set_fence('T3', *CENTER, 100)
+    engine.update_position('T4', 'not a number', None)
+    assert engine.evaluate() == []
+    assert engine.status('T2')['state'] == UNKNOWN
+    assert engine.status('T3')['state'] == UNKNOWN
+    assert engine.status('T4') is None
+
+
+def test_capacity_grows_and_keeps_existing_slots(engine):
+    move(engine, 'T1', 0)
+    for n in range(2, 10):
+        engine.set_fence(f'T{n}', *CENTER, 50)
+        engine.update_position(f'T{n}', *CENTER)
+    assert engine.capacity >= len(engine) == 9
+    assert move(engine, 'T1', 3) == [('T1', 'exit')]
+    assert engine.status('T5')['state'] == INSIDE
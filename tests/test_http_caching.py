@@ -0,0 +1,54 @@
+import pytest
+
+
+@pytest.fixture
+def owner_with_tool(owner):
+    response = owner.post('/api/owner/add-tool', json={
+        'tool_type': 'Drill', 'tool_name': 'Test drill', 'hourly_rate': 150, 'daily_rate': 1000,
+        'geo_lat': 17.44, 'geo_lng': 78.38
+    })
+    assert response.get_json()['success']
+    return owner
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={'If-None-Match': etag})
+
+
+def test_unchanged_list_revalidates_with_304(renter):
+    first = renter.get('/api/renter/bookings')
+    assert first.status_code == 200 and first.headers['ETag']
+    assert revalidate(renter, '/api/renter/bookings', first.headers['ETag']).status_code == 304
+
+
+def test_query_string_is_part_of_the_etag(renter):
+    full = renter.get('/api/renter/bookings')
+    paged = renter.get('/api/renter/bookings?limit=1')
+    assert full.headers['ETag'] != paged.headers['ETag']
+
+
+def test_owner_poll_does_not_invalidate_other_etags(server, renter, operator, owner_with_tool):
+    urls = {renter: '/api/renter/nearby-tools', operator: '/api/operator/assignments'}
+    etags = {client: client.get(url).headers['ETag'] for client, url in urls.items()}
+    version = server.tool_registry.changes.version
+
+    for _ in range(3):
+        owner_with_tool.get('/api/owner/tools')
+
+    assert server.tool_registry.changes.version == version
+    for client, url in urls.items():
+        assert revalidate(client, url, etags[client]).status_code == 304
+
+
+def test_owner_repeat_poll_is_not_modified(owner_with_tool):
+    first = owner_with_tool.get('/api/owner/tools')
+    assert first.status_code == 200
+    assert revalidate(owner_with_tool, '/api/owner/tools', first.headers['ETag']).status_code == 304
+
+
+def test_owner_sees_new_reading_after_the_simulation_interval(server, monkeypatch, owner_with_tool):
+    first = owner_with_tool.get('/api/owner/tools')
+    monkeypatch.setattr(server, 'SIMULATED_TELEMETRY_SECONDS', 0)
+    second = revalidate(owner_with_tool, '/api/owner/tools', first.headers['ETag'])
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
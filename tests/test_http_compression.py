@@ -0,0 +1,97 @@
+import gzip
+import zlib
+
+from flask import Flask, Response, request
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from http_compression import ResponseCompressor, StreamCompressor, compress
+
+
+BODY = b'{"tools": [' + b'{"tool_id": "T001", "status": "available"}, ' * 100 + b'{}]}'
+
+
+def accept(header):
+    return parse_accept_header(header, Accept)
+
+
+def json_response(body=BODY, etag='abc'):
+    response = Response(body, mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+def test_negotiate_follows_client_preference():
+    compressor = ResponseCompressor(encodings=('gzip',))
+    assert compressor.negotiate(accept('gzip, deflate')) == 'gzip'
+    assert compressor.negotiate(accept('identity')) is None
+    assert compressor.negotiate(accept('gzip'), offered=()) is None
+
+
+def test_one_shot_gzip_is_deterministic():
+    assert compress(BODY, 'gzip') == compress(BODY, 'gzip')
+    assert gzip.decompress(compress(BODY, 'gzip', level=1)) == BODY
+
+
+def test_buffered_response_is_compressed_with_weak_etag():
+    compressor = ResponseCompressor(encodings=('gzip',))
+    response = compressor.process(json_response(), accept('gzip'))
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.get_etag() == ('abc', True)
+    assert gzip.decompress(response.get_data()) == BODY
+
+
+def test_small_or_non_200_responses_pass_through():
+    compressor = ResponseCompressor(encodings=('gzip',))
+    small = compressor.process(json_response(body=b'{}'), accept('gzip'))
+    assert 'Content-Encoding' not in small.headers
+
+    missing = json_response()
+    missing.status_code = 404
+    assert 'Content-Encoding' not in compressor.process(missing, accept('gzip')).headers
+
+
+def test_compressed_app_still_answers_304():
+    app = Flask(__name__)
+    ResponseCompressor(encodings=('gzip',)).install(app)
+
+    @app.route('/tools')
+    def tools():
+        response = Response(BODY, mimetype='application/json')
+        response.set_etag('v1')
+        return response.make_conditional(request)
+
+    client = app.test_client()
+    first = client.get('/tools', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    again = client.get('/tools', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_identical_etags_reuse_the_compressed_body():
+    compressor = ResponseCompressor(encodings=('gzip',))
+    compressor.process(json_response(), accept('gzip'))
+    compressor.process(json_response(), accept('gzip'))
+    assert compressor.stats()['cache_hits'] == 1
+
+
+def test_cache_evicts_least_recently_used_past_its_byte_bound():
+    size = len(compress(BODY, 'gzip', 6))
+    compressor = ResponseCompressor(encodings=('gzip',), cache_bytes=size * 2)
+    for etag in ('a', 'b', 'a', 'c'):
+        compressor.process(json_response(etag=etag), accept('gzip'))
+
+    assert [etag for etag, _ in compressor._cache] == ['a', 'c']
+    assert compressor.stats()['cached_bytes'] <= size * 2
+
+
+def test_stream_chunks_are_decodable_as_they_arrive():
+    compressor = StreamCompressor('gzip', 6)
+    decoder = zlib.decompressobj(31)
+    for event in (b'data: one\n\n', b'data: two\n\n'):
+        assert decoder.decompress(compressor.compress(event)) == event
+    decoder.decompress(compressor.finish())
+    assert decoder.eof
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from image_pipeline import ImagePipeline
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def make_image(path, size, mode='RGB'):
+    Image.new(mode, size, (200, 120, 40, 255)[:len(mode)]).save(path)
+    return str(path)
+
+
+def derivative(pipeline, url):
+    return Image.open(pipeline.derivative(url.rsplit('/', 1)[1]))
+
+
+def test_widths_never_upscale_the_source(tmp_path):
+    source = make_image(tmp_path / 'drill.png', (400, 200))
+    pipeline = ImagePipeline(str(tmp_path / 'cache'), widths=(160, 320, 640), formats=())
+    images = pipeline.image_set(source, '/static/images/tools/drill.png')
+
+    widths = [entry.rsplit(' ', 1)[1] for entry in images['srcset'].split(', ')]
+    assert widths == ['160w', '320w', '400w']
+    assert derivative(pipeline, images['src']).size == (320, 160)
+    assert images['src'].endswith('.jpg')
+
+
+def test_derivatives_are_encoded_on_first_request_only(tmp_path):
+    source = make_image(tmp_path / 'drill.png', (400, 200))
+    pipeline = ImagePipeline(str(tmp_path / 'cache'), widths=(160, 320), formats=())
+    images = pipeline.image_set(source, '/static/images/tools/drill.png')
+    assert not (tmp_path / 'cache').exists()
+
+    name = images['src'].rsplit('/', 1)[1]
+    assert pipeline.derivative(name) == pipeline.derivative(name)
+    assert pipeline.stats()['generated'] == 1
+    assert pipeline.stats()['reused'] == 1
+    assert pipeline.derivative('drill.000000000000-320w-q80.jpg') is None
+
+
+def test_derivative_of_an_edited_source_is_not_served(tmp_path):
+    path = tmp_path / 'drill.png'
+    pipeline = ImagePipeline(str(tmp_path / 'cache'), widths=(160,), formats=())
+    images = pipeline.image_set(make_image(path, (300, 150)), '/img/drill.png')
+    make_image(path, (300, 100))
+    assert pipeline.derivative(images['src'].rsplit('/', 1)[1]) is None
+
+
+def test_transparent_source_falls_back_to_png(tmp_path):
+    source = make_image(tmp_path / 'saw.png', (200, 100), mode='RGBA')
+    pipeline = ImagePipeline(str(tmp_path / 'cache'), widths=(160,), formats=())
+    images = pipeline.image_set(source, '/static/images/tools/saw.png')
+
+    assert images['src'].endswith('.png')
+    assert derivative(pipeline, images['src']).mode == 'RGBA'
+
+
+def test_edited_source_gets_new_names(tmp_path):
+    path = tmp_path / 'drill.png'
+    pipeline = ImagePipeline(str(tmp_path / 'cache'), widths=(160,), formats=())
+    before = pipeline.image_set(make_image(path, (300, 150)), '/img/drill.png')
+    after = pipeline.image_set(make_image(path, (300, 100)), '/img/drill.png')
+    assert before['src'] != after['src']
+
+
+def test_sources_are_listed_per_writable_format(tmp_path):
+    source = make_image(tmp_path / 'drill.png', (200, 100))
+    pipeline = ImagePipeline(str(tmp_path / 'cache'), widths=(160,), formats=('webp', 'avif'))
+    images = pipeline.image_set(source, '/img/drill.png')
+    assert set(images['sources']) == {f'image/{fmt}' for fmt in pipeline.formats}
+
+
+def test_server_encodes_derivatives_on_request_not_at_import(server, renter):
+    url = server.TOOL_IMAGES['Drill']['src']
+    cached = os.path.join(server.IMAGE_CACHE_DIR, url.rsplit('/', 1)[1])
+    assert not os.path.exists(cached)
+
+    response = renter.get(url)
+    assert response.status_code == 200
+    assert os.path.exists(cached)
+    assert renter.get(f'{server.IMAGE_URL_PATH}/drill.000000000000-320w-q80.jpg').status_code == 404
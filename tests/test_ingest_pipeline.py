@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+import ingest_pipeline
+from ingest_pipeline import IngestPipeline
+
+TOPICS = {'renter/bookings': 'bookings', 'tools/telemetry': 'tool_status'}
+REQUIRED = {'bookings': ('toolid', 'booking_id'), 'tool_status': ('toolid',)}
+
+
+def settle(pipeline, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = pipeline.stats()
+        done = sum(stats['applied'].values()) + stats['invalid'] + stats['unknown_topic'] + stats['dropped']
+        if done >= stats['received'] and not stats['queue_depth'] and not stats['decoded_depth']:
+            return stats
+        time.sleep(0.01)
+    raise AssertionError(f'pipeline did not settle: {pipeline.stats()}')
+
+
+def message(**payload):
+    return json.dumps(payload).encode('utf-8')
+
+
+def test_messages_are_validated_and_applied_in_batches_per_key():
+    applied = []
+    pipeline = IngestPipeline(TOPICS, lambda key, payloads: applied.append((key, payloads)), REQUIRED)
+    pipeline.start()
+    for n in range(50):
+        pipeline.submit('renter/bookings', message(toolid='T1', booking_id=f'B{n}'))
+        pipeline.submit('tools/telemetry', message(toolid='T1', temperature_c=n))
+    pipeline.submit('renter/bookings', message(toolid='T1'))
+    pipeline.submit('renter/bookings', b'{not json')
+    pipeline.submit('renter/bookings', b'[1, 2]')
+    pipeline.submit('tools/unknown', message(toolid='T1'))
+
+    stats = settle(pipeline)
+    assert stats['applied'] == {'bookings': 50, 'tool_status': 50}
+    assert (stats['invalid'], stats['unknown_topic'], stats['dropped']) == (3, 1, 0)
+    assert stats['invalid_by_topic'] == {'renter/bookings': 3}
+    bookings = [p['booking_id'] for key, payloads in applied if key == 'bookings' for p in payloads]
+    assert bookings == [f'B{n}' for n in range(50)]
+    # Batched, not one call per message
+    assert len(applied) < 100
+
+
+def test_full_queue_drops_instead_of_blocking():
+    pipeline = IngestPipeline(TOPICS, lambda key, payloads: None, REQUIRED, queue_size=10)
+    # Not started: nothing drains the queue
+    results = [pipeline.submit('tools/telemetry', message(toolid='T1')) for _ in range(15)]
+    assert results.count(False) == 5
+    stats = pipeline.stats()
+    assert (stats['received'], stats['dropped'], stats['queue_depth']) == (15, 5, 10)
+
+
+def test_apply_errors_are_counted_and_the_pipeline_keeps_going(monkeypatch):
+    logged = []
+    monkeypatch.setattr(ingest_pipeline.log, 'exception', lambda event, **fields: logged.append((event, fields)))
+    calls = []
+    failed = threading.Event()
+
+    def apply_batch(key, payloads):
+        calls.append(len(payloads))
+        if not failed.is_set():
+            failed.set()
+            raise RuntimeError('state unavailable')
+
+    pipeline = IngestPipeline(TOPICS, apply_batch, REQUIRED, batch_wait=0)
+    pipeline.start()
+    pipeline.submit('tools/telemetry', message(toolid='T1'))
+    deadline = time.monotonic() + 5
+    while pipeline.apply_errors == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    pipeline.submit('tools/telemetry', message(toolid='T2'))
+    while not pipeline.applied['tool_status'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pipeline.apply_errors == 1
+    assert calls == [1, 1] and pipeline.applied['tool_status'] == 1
+    assert logged == [('ingest_apply_failed', {'key': 'tool_status', 'messages': 1})]
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from json_fragments import FragmentCache, make_encoder
+from tool_registry import ToolRegistry
+
+
+@pytest.fixture
+def cache():
+    return FragmentCache(make_encoder('json'), max_bytes=1000)
+
+
+def record(n, size=80):
+    return {'id': n, 'pad': 'x' * size}
+
+
+def test_render_matches_json(cache):
+    records = [record(n) for n in range(3)]
+    for _ in range(2):
+        body = cache.render({'success': True}, {'data': records}, {'data': None})
+        assert json.loads(body) == {'success': True, 'data': records}
+    assert cache.stats()['hits'] == 3
+
+
+def test_projection_is_a_separate_variant(cache):
+    item = record(1)
+    assert json.loads(cache.fragment(item, ('id',))) == {'id': 1}
+    assert json.loads(cache.fragment(item)) == item
+    assert cache.stats()['entries'] == 1
+
+
+def test_bounded_by_bytes(cache):
+    records = [record(n) for n in range(50)]
+    for item in records:
+        cache.fragment(item)
+    stats = cache.stats()
+    assert 0 < stats['bytes'] <= 1000
+    assert stats['evictions'] == 50 - stats['entries']
+    # The newest survive
+    assert cache._entries.get(id(records[-1]))[0] is records[-1]
+
+
+def test_oversized_fragment_is_not_cached(cache):
+    cache.fragment(record(1, size=5000))
+    assert cache.stats()['entries'] == 0
+
+
+def test_invalidate_releases_bytes(cache):
+    item = record(1)
+    cache.fragment(item)
+    cache.fragment(item, ('id',))
+    cache.on_change('update', item)
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (0, 0, 0)
+
+
+def test_set_fields_invalidates_only_on_change(cache):
+    item = record(1)
+    cache.fragment(item)
+    cache.set_fields(item, {'id': 1})
+    assert cache.stats()['entries'] == 1
+    cache.set_fields(item, {'id': 2})
+    assert json.loads(cache.fragment(item))['id'] == 2
+
+
+def test_registry_upsert_releases_the_superseded_view(cache):
+    registry = ToolRegistry({}, {})
+    registry.add_listener(cache.on_change)
+    tool = {'toolid': 'T1', 'tool_type': 'Drill', 'latitude': 17.4, 'longitude': 78.4}
+    for n in range(20):
+        view = registry.upsert({**tool, 'hours': n})
+        assert json.loads(cache.render({}, {'tools': registry.listing()}))['tools'][0]['hours'] == n
+    assert cache.stats()['entries'] == 1
+    assert cache._entries[id(view)][0] is view
+
+    registry.remove('T1')
+    assert cache.stats()['entries'] == 0
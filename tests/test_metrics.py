@@ -0,0 +1,110 @@
+import io
+import json
+import logging
+
+import pytest
+
+from geofence_engine import GeofenceEngine
+from metrics import Family, RateWindow, Registry
+from structured_log import ROOT_LOGGER, configure_logging, get_logger
+
+
+def test_sse_queue_depth_is_aggregated_per_role(server):
+    quiet = server.sse_broker.subscribe('renter')
+    backlogged = server.sse_broker.subscribe('renter')
+    try:
+        for n in range(3):
+            backlogged.push(10 ** 9 + n, {'type': 'test'})
+        body = server.app.test_client().get('/metrics').get_data(as_text=True)
+    finally:
+        server.sse_broker.unsubscribe(quiet)
+        server.sse_broker.unsubscribe(backlogged)
+
+    assert 'queue="' not in body
+    samples = dict(line.rsplit(' ', 1) for line in body.splitlines() if line and not line.startswith('#'))
+    assert float(samples['toolease_sse_queue_depth_max{role="renter"}']) >= 3
+    assert float(samples['toolease_sse_queued_events{role="renter"}']) >= 3
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, level):
+        return lambda event, **fields: self.events.append((level, event, fields))
+
+
+@pytest.fixture
+def log(server, monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(server, 'log', recorder)
+    return recorder
+
+
+def test_geofence_transitions_are_logged(server, monkeypatch, log, capsys):
+    engine = GeofenceEngine()
+    monkeypatch.setattr(server, 'geofence_engine', engine)
+    engine.set_fence('GF1', 17.0, 78.0, 100)
+    engine.update_position('GF1', 17.0, 78.0)
+    server.publish_geofence_transitions()
+    engine.update_position('GF1', 17.01, 78.0)
+    server.publish_geofence_transitions()
+
+    assert [(level, event, fields['tool_id'], fields['breach_type']) for level, event, fields in log.events] == [
+        ('info', 'geofence_transition', 'GF1', 'exit')]
+    assert 'Geofence' not in capsys.readouterr().out
+
+
+def test_registry_renders_instruments_and_collectors():
+    registry = Registry(prefix='app_')
+    requests = registry.counter('requests_total', 'Requests', ('route',))
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    requests.inc('/a "quoted"')
+    requests.inc('/a "quoted"', amount=2)
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    @registry.collector
+    def pools():
+        yield Family('pool_size', 'gauge', 'Pool size', [({}, 4.0)])
+
+    @registry.collector
+    def broken():
+        raise RuntimeError('down')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE app_requests_total counter' in lines
+    assert 'app_requests_total{route="/a \\"quoted\\""} 3' in lines
+    assert 'app_latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'app_latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert 'app_latency_seconds_count 2' in lines
+    assert 'app_pool_size 4' in lines
+    assert '# collector broken failed: down' in lines
+
+
+def test_rate_window_reports_per_second_rates():
+    window = RateWindow(window=10)
+    assert window.rates({'ingest': 100}, now=0) == {'ingest': 0.0}
+    assert window.rates({'ingest': 150}, now=5) == {'ingest': 10.0}
+
+
+@pytest.mark.parametrize('style', ['json', 'text'])
+def test_structured_log_keeps_fields_out_of_the_message(style):
+    root = logging.getLogger(ROOT_LOGGER)
+    saved = root.handlers[:], root.level, root.propagate
+    stream = io.StringIO()
+    configure_logging('INFO', style=style, stream=stream)
+    try:
+        log = get_logger('toolease.test')
+        log.debug('hidden', found=1)
+        log.info('nearby_tools', found=2, radius_km=5.0)
+    finally:
+        root.handlers[:], root.level, root.propagate = saved
+
+    line, = stream.getvalue().splitlines()
+    if style == 'json':
+        entry = json.loads(line)
+        assert (entry['level'], entry['logger'], entry['event']) == ('info', 'toolease.test', 'nearby_tools')
+        assert (entry['found'], entry['radius_km']) == (2, 5.0)
+    else:
+        assert line.endswith('INFO    toolease.test nearby_tools found=2 radius_km=5.0')
@@ -0,0 +1,36 @@
+import pytest
+
+URL = '/api/renter/nearby-tools?lat=17.44&lng=78.38'
+
+
+@pytest.mark.parametrize('params', [
+    'limit=-1', 'limit=0', 'limit=abc', 'limit=2.5',
+    'radius_km=0', 'radius_km=-5', 'radius_km=inf', 'radius_km=nan'
+])
+def test_bad_search_parameters_are_rejected(renter, params):
+    response = renter.get(f'{URL}&{params}')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+@pytest.mark.parametrize('url', [
+    '/api/renter/nearby-tools?lat=nan&lng=78.38',
+    '/api/renter/nearby-tools?lat=91&lng=78.38',
+    '/api/renter/nearby-tools?lat=17.44&lng=-181'
+])
+def test_bad_coordinates_are_rejected(renter, url):
+    assert renter.get(url).status_code == 400
+
+
+def test_huge_limit_and_radius_are_clamped(server, renter):
+    response = renter.get(f'{URL}&limit=1000000&radius_km=1e9')
+    assert response.status_code == 200
+    tools = response.get_json()['tools']
+    assert len(tools) <= server.MAX_SEARCH_LIMIT
+    assert all(tool['distance_km_from_user'] <= server.MAX_SEARCH_RADIUS_KM for tool in tools)
+
+
+def test_limit_caps_the_result_count(renter):
+    response = renter.get(f'{URL}&limit=1&radius_km=50')
+    assert response.status_code == 200
+    assert len(response.get_json()['tools']) <= 1
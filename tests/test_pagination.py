@@ -0,0 +1,46 @@
+import pytest
+
+URL = '/api/renter/nearby-tools'
+
+
+def test_page_cursor_round_trips(server):
+    key = ('2025-03-04T09:00:00', 'B/é+1')
+    token = server.encode_page_cursor(key)
+    assert '=' not in token and '+' not in token and '/' not in token
+    assert server.decode_page_cursor(token, ('booked_iso', 'booking_id')) == key
+
+
+@pytest.mark.parametrize('token', ['%%%', 'bm90IGpzb24', 'WyJhIl0', 'WzEsMl0', 'eyJhIjoiYiJ9'])
+def test_malformed_page_cursors_are_rejected(server, token):
+    # garbage, 'not json', ["a"] (wrong arity), [1,2] (not strings), {"a":"b"}
+    with pytest.raises(server.InvalidListQuery):
+        server.decode_page_cursor(token, ('booked_iso', 'booking_id'))
+
+
+def walk(client, url):
+    ids, cursor = [], None
+    while True:
+        result = client.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        ids.extend(tool['toolid'] for tool in result['tools'])
+        cursor = result['next_cursor']
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_pages_cover_the_list_once_in_order(renter, order):
+    everything = [tool['toolid'] for tool in renter.get(URL).get_json()['tools']]
+    paged = walk(renter, f'{URL}?limit=7&order={order}')
+    assert paged == sorted(everything, reverse=order == 'desc')
+
+
+def test_fields_projection_keeps_the_sort_keys(renter):
+    tools = renter.get(f'{URL}?limit=3&fields=tool_type').get_json()['tools']
+    assert tools and all(set(tool) <= {'toolid', 'tool_type'} and 'toolid' in tool for tool in tools)
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=1001', 'limit=x', 'order=up', 'cursor=%25%25', 'fields=a;b'])
+def test_bad_page_parameters_are_rejected(renter, query):
+    response = renter.get(f'{URL}?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
@@ -0,0 +1,41 @@
+import pytest
+
+from password_hasher import PasswordHasher
+
+# A cheap KDF keeps these tests fast; the comparison logic is the same for scrypt
+METHOD = 'pbkdf2:sha256:1000'
+
+
+@pytest.fixture
+def hasher():
+    return PasswordHasher(METHOD, salt_length=16, workers=0)
+
+
+def test_current_hash_needs_no_rehash(hasher):
+    stored = hasher.hash('secret')
+    assert hasher.verify(stored, 'secret')
+    assert not hasher.needs_rehash(stored)
+
+
+def test_salt_length_change_triggers_rehash(hasher):
+    longer = PasswordHasher(METHOD, salt_length=24, workers=0)
+    stored = hasher.hash('secret')
+    assert longer.needs_rehash(stored)
+    assert not longer.needs_rehash(longer.hash('secret'))
+
+
+def test_parameter_change_triggers_rehash(hasher):
+    stronger = PasswordHasher('pbkdf2:sha256:2000', salt_length=16, workers=0)
+    assert stronger.needs_rehash(hasher.hash('secret'))
+
+
+def test_malformed_hash_triggers_rehash(hasher):
+    assert hasher.needs_rehash('not-a-werkzeug-hash')
+
+
+def test_rehash_later_hands_over_a_current_hash(hasher):
+    upgraded = []
+    PasswordHasher(METHOD, salt_length=24, workers=0).rehash_later('secret', upgraded.append)
+    assert len(upgraded) == 1
+    assert not PasswordHasher(METHOD, salt_length=24, workers=0).needs_rehash(upgraded[0])
+    assert hasher.needs_rehash(upgraded[0])
@@ -0,0 +1,83 @@
+from collections import Counter
+
+from flask import Flask
+
+from profiler import PROFILE_HEADER, TRUNCATED, RequestProfiler, StackTracer
+
+
+def slow_lookup():
+    return sum(range(2000))
+
+
+def profiled_app(profiler):
+    app = Flask(__name__)
+    profiler.install(app)
+
+    @app.route('/tools/<tool_id>')
+    def tool(tool_id):
+        return {'tool_id': tool_id, 'total': slow_lookup()}
+
+    return app
+
+
+def test_disabled_without_rate_or_secret():
+    assert not RequestProfiler().enabled
+    assert RequestProfiler(secret='s3cret').enabled
+    assert RequestProfiler(sample_rate=0.1).enabled
+
+
+def test_token_must_match_the_secret():
+    profiler = RequestProfiler(secret='s3cret')
+    assert profiler.authorized('s3cret')
+    assert not profiler.authorized('guess')
+    assert not profiler.authorized(None)
+    assert not RequestProfiler().authorized('')
+
+
+def test_only_requests_with_the_token_are_profiled():
+    profiler = RequestProfiler(secret='s3cret')
+    client = profiled_app(profiler).test_client()
+    client.get('/tools/T001')
+    assert profiler.summary() == {}
+
+    client.get('/tools/T002', headers={PROFILE_HEADER: 's3cret'})
+    summary = profiler.summary()
+    assert list(summary) == ['GET /tools/<tool_id>']
+    assert summary['GET /tools/<tool_id>']['requests'] == 1
+
+
+def test_collapsed_stacks_are_folded_per_route():
+    profiler = RequestProfiler(sample_rate=1.0)
+    profiled_app(profiler).test_client().get('/tools/T001')
+
+    lines = profiler.collapsed('GET /tools/<tool_id>').splitlines()
+    assert lines
+    for line in lines:
+        stack, weight = line.rsplit(' ', 1)
+        assert stack.startswith('GET /tools/<tool_id>;')
+        assert int(weight) >= 1
+    assert any('slow_lookup (test_profiler.py' in line for line in lines)
+    assert profiler.collapsed('GET /other') == ''
+
+    profiler.reset()
+    assert profiler.collapsed() == ''
+
+
+def test_tracer_charges_self_time_to_the_full_stack():
+    ticks = iter([0.0, 1.0, 3.0, 4.0])
+    tracer = StackTracer(clock=lambda: next(ticks))
+    outer = type('Frame', (), {'f_code': test_tracer_charges_self_time_to_the_full_stack.__code__})()
+    tracer(outer, 'call', None)
+    tracer(outer, 'c_call', len)
+    tracer(outer, 'c_return', len)
+    tracer(outer, 'return', None)
+
+    outer_label, = [stack[0] for stack in tracer.self_time if len(stack) == 1]
+    assert tracer.self_time[(outer_label,)] == 2.0
+    assert tracer.self_time[(outer_label, 'builtins.len')] == 2.0
+
+
+def test_stacks_past_the_bound_are_merged_as_truncated():
+    profiler = RequestProfiler(sample_rate=1.0, max_stacks=1)
+    profiler._merge('GET /', Counter({('a',): 0.5, ('b',): 0.25}), 1.0)
+    assert profiler.collapsed() == 'GET /;a 500000\nGET /;' + TRUNCATED + ' 250000\n'
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from main import Stream, TokenBucket, run_streams, untimed
+
+
+def bucket(rate, burst=None):
+    tokens = TokenBucket(rate, burst)
+    tokens.stamp = 0.0
+    return tokens
+
+
+def drain(tokens, now):
+    sent = 0
+    while not tokens.wait(now):
+        tokens.take()
+        sent += 1
+    return sent
+
+
+def test_unlimited_bucket_never_waits():
+    tokens = bucket(0)
+    for _ in range(1000):
+        assert tokens.wait(0.0) == 0.0
+        tokens.take()
+
+
+def test_bucket_refills_at_its_rate():
+    tokens = bucket(10)
+    assert drain(tokens, 0.0) == 1
+    assert tokens.wait(0.0) == pytest.approx(0.1)
+    assert tokens.wait(0.05) == pytest.approx(0.05)
+    assert drain(tokens, 0.1) == 1
+
+
+def test_idle_time_banks_at_most_the_burst():
+    tokens = bucket(10, burst=3)
+    assert drain(tokens, 60.0) == 3
+
+
+def test_default_burst_is_ten_milliseconds_of_tokens():
+    assert bucket(5000).burst == 50
+    assert bucket(20).burst == 1
+
+
+class Sink:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload):
+        self.published.append((time.monotonic(), topic, payload))
+
+
+def test_run_streams_paces_each_topic_at_its_own_rate():
+    sink = Sink()
+    fast = Stream('fast', 'topic/fast', untimed(range(40)), 400)
+    slow = Stream('slow', 'topic/slow', untimed(range(10)), 50)
+    assert run_streams([fast, slow], sink, log_interval=60) == 50
+
+    times = {topic: [t for t, name, _ in sink.published if name == topic] for topic in ('topic/fast', 'topic/slow')}
+    assert [p for _, name, p in sink.published if name == 'topic/fast'] == list(range(40))
+    assert times['topic/slow'][-1] - times['topic/slow'][0] == pytest.approx(9 / 50, abs=0.1)
+    assert times['topic/fast'][-1] - times['topic/fast'][0] < times['topic/slow'][-1] - times['topic/slow'][0]
+
+
+def test_global_rate_caps_all_topics_together():
+    sink = Sink()
+    streams = [Stream(name, f'topic/{name}', untimed(range(10)), 0) for name in ('a', 'b')]
+    started = time.monotonic()
+    run_streams(streams, sink, global_rate=100, log_interval=60)
+    assert time.monotonic() - started == pytest.approx(19 / 100, abs=0.1)
+    # Topics share the cap instead of one draining before the other starts
+    first_half = [name for _, name, _ in sink.published[:10]]
+    assert set(first_half) == {'topic/a', 'topic/b'}
+
+
+def test_failed_publishes_are_counted_not_fatal():
+    class Flaky(Sink):
+        def publish(self, topic, payload):
+            if payload % 2:
+                raise ConnectionError('dropped')
+            super().publish(topic, payload)
+
+    stream = Stream('flaky', 'topic/flaky', untimed(range(6)), 0)
+    assert run_streams([stream], Flaky(), log_interval=60) == 3
+    assert stream.errors == 3
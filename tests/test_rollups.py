@@ -0,0 +1,164 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+from conftest import ROOT
+
+from event_store import EventCollection
+from rollups import EarningsLedger, RevenueRollup, booking_contribution, BASE_PAYOUT_INR
+
+DAY = date(2025, 3, 4)
+OWNERS = {'T1': 'Asha'}
+
+
+def booking(booking_id, amount, **fields):
+    return {'booking_id': booking_id, 'toolid': 'T1', 'amount_inr': amount, 'payment_status': 'SUCCESS',
+            'cancel_status': 'NONE', 'rental_start_iso': '2025-03-04T09:00:00',
+            'rental_end_iso': '2025-03-04T12:00:00', **fields}
+
+
+@pytest.fixture
+def bookings():
+    rollup = RevenueRollup(OWNERS.get)
+    collection = EventCollection('bookings', ('booking_id', 'toolid'))
+    collection.add_listener(rollup.listener(booking_contribution))
+    return rollup, collection
+
+
+def test_inserts_are_counted_per_tool_and_owner(bookings):
+    rollup, collection = bookings
+    collection.extend([booking('B1', 1000), booking('B2', 500)])
+    assert rollup.tool_day('T1', DAY)['revenue_inr'] == 1500
+    assert rollup.owner_day('Asha', DAY) == rollup.tool_day('T1', DAY)
+    assert rollup.tool_day('T1', DAY)['hours'] == 6
+
+
+def test_update_replaces_the_old_contribution(bookings):
+    rollup, collection = bookings
+    collection.append(booking('B1', 1000))
+    collection.update(collection.first('booking_id', 'B1'), {'cancel_status': 'CANCELLED', 'refund_inr': 800})
+    counters = rollup.tool_day('T1', DAY)
+    assert (counters['rentals_count'], counters['hours'], counters['revenue_inr']) == (0, 0, 200)
+
+
+def test_delete_takes_the_record_back_out(bookings):
+    rollup, collection = bookings
+    collection.extend([booking('B1', 1000), booking('B2', 500)])
+    collection.remove_where('booking_id', 'B1')
+    assert rollup.tool_day('T1', DAY)['revenue_inr'] == 500
+
+
+def test_aged_out_records_survive_a_snapshot_restore(bookings):
+    rollup, collection = bookings
+    collection.extend([booking('B1', 1000), booking('B2', 500)])
+    collection.trim(1)
+    assert rollup.tool_day('T1', DAY)['revenue_inr'] == 1500
+
+    restored, rows = RevenueRollup(OWNERS.get), rollup.retired()
+    restored.restore_retired(rows)
+    fresh = EventCollection('bookings', ('booking_id', 'toolid'))
+    fresh.add_listener(restored.listener(booking_contribution))
+    fresh.replace_all(list(collection))
+    assert restored.tool_day('T1', DAY) == rollup.tool_day('T1', DAY)
+    assert restored.owner_day('Asha', DAY) == rollup.owner_day('Asha', DAY)
+
+
+def test_revenue_before_the_tool_is_registered_reaches_its_owner():
+    owners = {}
+    rollup = RevenueRollup(owners.get)
+    collection = EventCollection('bookings', ('booking_id', 'toolid'))
+    collection.add_listener(rollup.listener(booking_contribution))
+    collection.append(booking('B1', 500))
+    assert rollup.owner_day('Asha', DAY)['revenue_inr'] == 0
+
+    owners['T1'] = 'Asha'
+    assert rollup.owner_day('Asha', DAY)['revenue_inr'] == 500
+    assert rollup.owner_days('Asha', [DAY]) == [(DAY, rollup.tool_day('T1', DAY))]
+
+
+def operator_event(booking_id, **fields):
+    return {'booking_id': booking_id, 'operator_name': 'Ravi', 'scheduled_iso': '2025-03-04T09:00:00', **fields}
+
+
+@pytest.fixture
+def operator_events():
+    ledger = EarningsLedger()
+    collection = EventCollection('operator_events', ('booking_id', 'operator_name'))
+    collection.add_listener(ledger.on_event)
+    return ledger, collection
+
+
+def test_ledger_follows_arrival_updates(operator_events):
+    ledger, collection = operator_events
+    collection.append(operator_event('B1'))
+    assert ledger.totals('Ravi')['pending'] == 1
+    collection.update(collection.first('booking_id', 'B1'),
+                      {'arrival_iso': '2025-03-04T09:05:00', 'arrival_status': 'ON_TIME'})
+    totals = ledger.totals('Ravi')
+    assert (totals['jobs'], totals['pending'], totals['on_time'], totals['earnings']) == (1, 0, 1, BASE_PAYOUT_INR)
+
+
+def test_ledger_history_survives_a_snapshot_restore(operator_events):
+    ledger, collection = operator_events
+    collection.extend([
+        operator_event('B1', arrival_iso='2025-03-04T09:05:00', arrival_status='ON_TIME'),
+        operator_event('B2'),
+        operator_event('B3', arrival_iso='2025-03-04T10:00:00', arrival_status='LATE', compensation_to_renter_inr=350)
+    ])
+    collection.trim(1)
+    # Aged-out jobs still count, but an open one no longer counts as pending
+    assert ledger.totals('Ravi')['jobs'] == 3
+    assert ledger.totals('Ravi')['pending'] == 0
+
+    restored = EarningsLedger()
+    restored.restore_retired(ledger.retired())
+    fresh = EventCollection('operator_events', ('booking_id', 'operator_name'))
+    fresh.add_listener(restored.on_event)
+    fresh.replace_all(list(collection))
+    assert restored.totals('Ravi') == ledger.totals('Ravi')
+    assert restored.window('Ravi', DAY, DAY) == ledger.window('Ravi', DAY, DAY)
+
+
+def test_snapshot_carries_the_retired_rollups(server):
+    state = server.capture_state()
+    assert set(state['retired_rollups']) == {'revenue', 'earnings'}
+
+
+BOOT = '''
+import json, sys
+from datetime import date
+sys.path.insert(0, 'tests')
+import server
+from conftest import login
+
+client = server.app.test_client()
+login(client, 'owner', 'Restart Owner')
+if sys.argv[1] == 'first':
+    tool_id = client.post('/api/owner/add-tool', json={
+        'tool_type': 'Drill', 'tool_name': 'Restart drill', 'hourly_rate': 150, 'daily_rate': 1000,
+        'geo_lat': 17.44, 'geo_lng': 78.38}).get_json()['tool_id']
+    server.realtime_data['bookings'].append({
+        'booking_id': 'B-RESTART', 'toolid': tool_id, 'amount_inr': 500, 'payment_status': 'SUCCESS',
+        'cancel_status': 'NONE', 'rental_start_iso': date.today().isoformat() + 'T09:00:00'})
+    server.state_backend.snapshot(server.capture_state)
+print(json.dumps(client.get('/api/owner/revenue?days=1').get_json()['owner_daily']))
+'''
+
+
+def boot(scratch, phase):
+    env = {**os.environ, 'MQTT_TRANSPORT': 'local', 'PASSWORD_HASH_WORKERS': '0', 'STATIC_ASSETS': 'off',
+           'LOG_LEVEL': 'WARNING', 'USER_DB_PATH': str(scratch / 'users.db'), 'EVENT_LOG_DIR': str(scratch / 'eventlog'),
+           'STATE_DB_PATH': str(scratch / 'state.db'), 'IMAGE_CACHE_DIR': str(scratch / 'images')}
+    result = subprocess.run([sys.executable, '-c', BOOT, phase], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=120, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_owner_revenue_survives_a_restart_from_snapshot(tmp_path):
+    before = boot(tmp_path, 'first')
+    assert before[0]['revenue_inr'] == 500
+    assert boot(tmp_path, 'restart') == before
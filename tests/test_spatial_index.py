@@ -0,0 +1,78 @@
+import random
+import time
+
+import pytest
+
+from spatial_index import GridIndex, haversine_km, wrap_lng
+
+
+@pytest.fixture
+def fleet():
+    rng = random.Random(7)
+    index = GridIndex()
+    points = {}
+    for n in range(2000):
+        lat, lng = 17.4 + rng.uniform(-0.5, 0.5), 78.4 + rng.uniform(-0.5, 0.5)
+        index.update(f'T{n}', lat, lng)
+        points[f'T{n}'] = (lat, lng)
+    return index, points
+
+
+def brute_force(points, lat, lng, radius_km):
+    found = [(haversine_km(lat, lng, *p), key) for key, p in points.items()]
+    return sorted(f for f in found if f[0] <= radius_km)
+
+
+@pytest.mark.parametrize('radius_km', [0.5, 3, 15, 80, 3000])
+def test_query_matches_brute_force(fleet, radius_km):
+    index, points = fleet
+    expected = brute_force(points, 17.45, 78.35, radius_km)
+    assert index.query(17.45, 78.35, radius_km) == expected
+    assert index.query(17.45, 78.35, radius_km, limit=25) == expected[:25]
+
+
+def test_query_respects_predicate(fleet):
+    index, points = fleet
+    even = {key for key in points if int(key[1:]) % 2 == 0}
+    expected = [f for f in brute_force(points, 17.4, 78.4, 10) if f[1] in even][:10]
+    assert index.query(17.4, 78.4, 10, limit=10, predicate=even.__contains__) == expected
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_non_positive_limit_returns_nothing(fleet, limit):
+    index, _ = fleet
+    assert index.query(17.4, 78.4, 10, limit=limit) == []
+
+
+def test_huge_radius_cost_is_bounded_by_the_fleet(fleet):
+    index, points = fleet
+    started = time.perf_counter()
+    results = index.query(17.4, 78.4, 20000, limit=5)
+    assert time.perf_counter() - started < 1.0
+    assert results == brute_force(points, 17.4, 78.4, 20000)[:5]
+
+
+def test_moved_and_removed_keys(fleet):
+    index, _ = fleet
+    index.update('T0', 10.0, 10.0)
+    assert index.query(10.0, 10.0, 1) == [(0.0, 'T0')]
+    index.update('T0', float('nan'), 10.0)
+    assert index.query(10.0, 10.0, 1) == []
+    assert len(index) == 1999
+
+
+@pytest.mark.parametrize('center', [(-16.5, 179.95), (-16.5, -179.95), (89.9, 30.0), (80.0, -179.9)])
+@pytest.mark.parametrize('radius_km', [20, 80, 400])
+def test_query_across_the_antimeridian_and_near_the_poles(center, radius_km):
+    rng = random.Random(11)
+    index = GridIndex()
+    points = {}
+    for n in range(1500):
+        lat = min(89.99, center[0] + rng.uniform(-3, 3))
+        lng = rng.uniform(-180, 180) if lat > 85 else wrap_lng(center[1] + rng.uniform(-3, 3))
+        index.update(f'T{n}', lat, lng)
+        points[f'T{n}'] = (lat, lng)
+    expected = brute_force(points, *center, radius_km)
+    assert expected
+    assert [key for _, key in index.query(*center, radius_km)] == [key for _, key in expected]
+    assert [key for _, key in index.query(*center, radius_km, limit=10)] == [key for _, key in expected[:10]]
@@ -0,0 +1,55 @@
+import threading
+
+from sse_broker import SSEBroker
+
+
+def test_events_reach_only_the_addressed_roles():
+    broker = SSEBroker(('renter', 'owner'))
+    renter, owner = broker.subscribe('renter'), broker.subscribe('owner')
+    first = broker.publish({'type': 'booking'}, roles=('renter',))
+    second = broker.publish({'type': 'status'})
+    assert renter.wait(0) == [(first, {'type': 'booking'}), (second, {'type': 'status'})]
+    assert owner.wait(0) == [(second, {'type': 'status'})]
+    assert renter.wait(0) == []
+
+
+def test_reconnect_resumes_after_last_event_id():
+    broker = SSEBroker(('renter',))
+    ids = [broker.publish({'n': n}) for n in range(5)]
+    resumed = broker.subscribe('renter', last_event_id=ids[2])
+    assert [event['n'] for _, event in resumed.wait(0)] == [3, 4]
+
+
+def test_slow_consumer_drops_oldest_events_and_counts_them():
+    broker = SSEBroker(('renter',), buffer_size=3)
+    slow = broker.subscribe('renter')
+    for n in range(5):
+        broker.publish({'n': n})
+    assert [event['n'] for _, event in slow.wait(0)] == [2, 3, 4]
+    assert slow.dropped == broker.dropped == 2
+    assert broker.stats()['roles']['renter']['dropped'] == 2
+
+
+def test_wait_wakes_on_publish_and_close():
+    broker = SSEBroker(('renter',))
+    subscription = broker.subscribe('renter')
+    received = []
+    reader = threading.Thread(target=lambda: received.append(subscription.wait(5)))
+    reader.start()
+    broker.publish({'type': 'wake'})
+    reader.join(2)
+    assert received and received[0][0][1] == {'type': 'wake'}
+
+    reader = threading.Thread(target=lambda: received.append(subscription.wait(5)))
+    reader.start()
+    subscription.close()
+    reader.join(2)
+    assert not reader.is_alive() and received[1] == []
+    assert broker.stats()['roles']['renter']['clients'] == 0
+
+
+def test_external_event_ids_are_kept():
+    broker = SSEBroker(('renter',))
+    subscription = broker.subscribe('renter')
+    assert broker.publish({'type': 'shared'}, event_id=900) == 900
+    assert subscription.wait(0) == [(900, {'type': 'shared'})]
@@ -0,0 +1,90 @@
+import pytest
+
+from event_store import EventCollection
+from state_backend import SQLiteBackend
+
+SEED = [{'booking_id': 'B1', 'renter_id': 'R1'}, {'booking_id': 'B2', 'renter_id': 'R2'}]
+
+
+class Worker:
+    """One process's view of the shared state: its own backend connection and collection"""
+
+    def __init__(self, path):
+        self.backend = SQLiteBackend(path)
+        self.bookings = EventCollection('bookings', ('booking_id', 'renter_id'))
+        self.delivered = []
+        self.stale = []
+        self.backend.bind(self.bookings.replay, lambda event, seq: self.delivered.append((seq, event)),
+                          on_stale=lambda position, compacted: self.stale.append((position, compacted)))
+        snapshot, tail = self.backend.recover(lambda: self.bookings.extend(SEED), self.capture)
+        if snapshot is not None:
+            self.bookings.replace_all(snapshot['bookings'])
+        for entry in tail:
+            self.bookings.replay(entry)
+        self.bookings.attach_journal(self.backend)
+
+    def capture(self):
+        return {'bookings': [dict(record) for record in self.bookings]}
+
+    def records(self):
+        return [dict(record) for record in self.bookings]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'state.db')
+
+
+def test_second_worker_boots_from_the_seed_snapshot(path):
+    first, second = Worker(path), Worker(path)
+    assert second.records() == first.records() == SEED
+
+
+def test_writes_replicate_in_journal_order(path):
+    a, b = Worker(path), Worker(path)
+    a.bookings.append({'booking_id': 'B3', 'renter_id': 'R1'})
+    b.bookings.update(b.bookings.first('booking_id', 'B1'), {'status': 'paid'})
+    # a has not polled yet: its next write first applies b's entry, so both see the same order
+    a.bookings.update(a.bookings.first('booking_id', 'B1'), {'status': 'returned'})
+    b.backend.poll()
+    assert a.records() == b.records()
+    assert a.bookings.first('booking_id', 'B1')['status'] == 'returned'
+    assert [r['booking_id'] for r in b.bookings.lookup('renter_id', 'R1')] == ['B1', 'B3']
+
+
+def test_late_worker_replays_the_tail_after_the_snapshot(path):
+    a = Worker(path)
+    a.bookings.remove_where('booking_id', 'B2')
+    a.bookings.append({'booking_id': 'B3', 'renter_id': 'R3'})
+    assert Worker(path).records() == a.records()
+
+
+def test_notifications_reach_every_worker_with_one_id(path):
+    a, b = Worker(path), Worker(path)
+    a.backend.broadcast({'type': 'booking'})
+    b.backend.poll()
+    assert a.delivered == b.delivered and len(a.delivered) == 1
+
+
+def test_leases_and_settings_are_cluster_wide(path):
+    a, b = Worker(path), Worker(path)
+    assert a.backend.acquire_lease('snapshot', 60)
+    assert not b.backend.acquire_lease('snapshot', 60)
+    a.backend.release_lease('snapshot')
+    assert b.backend.acquire_lease('snapshot', 60)
+    assert a.backend.setting('secret_key', lambda: 'from-a') == b.backend.setting('secret_key', lambda: 'from-b')
+
+
+def test_worker_behind_compacted_entries_is_told_it_is_stale(path):
+    a, b = Worker(path), Worker(path)
+    for n in range(3):
+        a.bookings.append({'booking_id': f'N{n}', 'renter_id': 'R9'})
+        a.backend.snapshot(a.capture)
+    b.backend.poll()
+    assert b.stale and b.stale[0][0] < b.stale[0][1]
+    assert a.stale == []
+
+
+def test_append_outside_a_write_section_is_refused(path):
+    with pytest.raises(RuntimeError):
+        Worker(path).backend.append({'c': 'bookings', 'op': 'trim', 'maxlen': 1})
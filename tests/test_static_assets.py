@@ -0,0 +1,65 @@
+import gzip
+import os
+
+from static_assets import MANIFEST_NAME, AssetManifest, build, hashed_name
+
+
+SCRIPT = b'function update() { return fetch("/api/renter/nearby-tools"); }\n' * 50
+
+
+def make_static(root):
+    root.mkdir()
+    (root / 'js').mkdir()
+    (root / 'js' / 'renter.js').write_bytes(SCRIPT)
+    (root / 'images').mkdir()
+    (root / 'images' / 'logo.png').write_bytes(b'\x89PNG not really')
+    (root / 'data').mkdir()
+    (root / 'data' / 'tools.csv').write_text('tool_id\nT001\n')
+    return root
+
+
+def test_hashed_name_keeps_directory_and_extension():
+    assert hashed_name('css/style.css', '3b9f0c21d4ffff') == 'css/style.3b9f0c21d4.css'
+
+
+def test_build_hashes_assets_and_skips_seed_data(tmp_path):
+    static = make_static(tmp_path / 'static')
+    manifest = build(str(static))
+
+    assets = manifest['assets']
+    assert set(assets) == {'js/renter.js', 'images/logo.png'}
+    script = static / 'dist' / assets['js/renter.js']['path']
+    assert script.read_bytes() == SCRIPT
+    assert 'gzip' in assets['js/renter.js']['encodings']
+    assert gzip.decompress((static / 'dist' / (assets['js/renter.js']['path'] + '.gz')).read_bytes()) == SCRIPT
+    # Binary assets get no compressed siblings
+    assert assets['images/logo.png']['encodings'] == []
+
+
+def test_edited_source_gets_a_new_name_and_old_one_is_kept(tmp_path):
+    static = make_static(tmp_path / 'static')
+    before = build(str(static))['assets']['js/renter.js']['path']
+    (static / 'js' / 'renter.js').write_bytes(SCRIPT + b'// edited\n')
+    after = build(str(static))['assets']['js/renter.js']['path']
+
+    assert before != after
+    assert os.path.exists(static / 'dist' / before)
+
+
+def test_manifest_lookups(tmp_path):
+    static = make_static(tmp_path / 'static')
+    build(str(static))
+    manifest = AssetManifest.load(str(static / 'dist'))
+
+    assert len(manifest) == 2
+    hashed = manifest.path('js/renter.js')
+    assert hashed.startswith('js/renter.') and hashed.endswith('.js')
+    assert 'gzip' in manifest.encodings(hashed)
+    assert manifest.path('js/missing.js') is None
+    assert (static / 'dist' / MANIFEST_NAME).exists()
+
+
+def test_missing_manifest_loads_empty(tmp_path):
+    manifest = AssetManifest.load(str(tmp_path))
+    assert len(manifest) == 0
+    assert manifest.path('js/renter.js') is None
@@ -0,0 +1,60 @@
+import pytest
+
+from timeseries_store import INITIAL_SLOTS, TimeSeriesStore
+
+METRICS = ('temperature_c', 'vibration_hz')
+
+
+@pytest.fixture
+def store():
+    return TimeSeriesStore(METRICS, capacity=100)
+
+
+def fill(store, key, n, start=0):
+    for t in range(start, start + n):
+        store.append(key, float(t), {'temperature_c': t, 'vibration_hz': t * 2})
+
+
+def test_latest_and_raw_range(store):
+    fill(store, 'T1', 10)
+    assert store.latest('T1') == {'ts': 9.0, 'temperature_c': 9.0, 'vibration_hz': 18.0}
+    raw = store.query('T1', 'temperature_c', start=3, end=5)
+    assert raw['ts'] == [3.0, 4.0, 5.0] and raw['mean'] == [3.0, 4.0, 5.0]
+    assert store.latest('T2') is None
+
+
+def test_ring_grows_then_overwrites_the_oldest(store):
+    fill(store, 'T1', INITIAL_SLOTS)
+    assert store.memory_bytes() == INITIAL_SLOTS * (8 + 4 * len(METRICS))
+    fill(store, 'T1', 150, start=INITIAL_SLOTS)
+    assert store.memory_bytes() == 100 * (8 + 4 * len(METRICS))
+    ts = store.query('T1', 'temperature_c')['ts']
+    assert ts == [float(t) for t in range(INITIAL_SLOTS + 50, INITIAL_SLOTS + 150)]
+
+
+def test_out_of_order_samples_are_dropped(store):
+    fill(store, 'T1', 5)
+    assert store.append('T1', 2.0, {'temperature_c': 99}) is False
+    assert store.out_of_order == 1
+    assert 99.0 not in store.query('T1', 'temperature_c')['max']
+
+
+def test_missing_metrics_are_skipped_not_zero(store):
+    store.append('T1', 0.0, {'temperature_c': 20})
+    store.append('T1', 1.0, {'vibration_hz': 3})
+    assert store.latest('T1') == {'ts': 1.0, 'temperature_c': None, 'vibration_hz': 3.0}
+    assert store.query('T1', 'temperature_c')['ts'] == [0.0]
+
+
+def test_downsampling_into_buckets(store):
+    fill(store, 'T1', 10)
+    fixed = store.query('T1', 'temperature_c', bucket_seconds=5)
+    assert fixed == {'ts': [0.0, 5.0], 'min': [0.0, 5.0], 'max': [4.0, 9.0], 'mean': [2.0, 7.0], 'count': [5, 5]}
+    # The sample exactly at `end` joins the last bucket
+    counted = store.query('T1', 'temperature_c', start=0, end=9, buckets=3)
+    assert counted['count'] == [3, 3, 4]
+
+
+def test_unknown_metric_is_an_error(store):
+    with pytest.raises(KeyError):
+        store.query('T1', 'humidity')
@@ -0,0 +1,63 @@
+import pytest
+
+from tool_registry import DEFAULT_IMAGE, DEFAULT_RATES, ToolRegistry
+
+CATALOG = {'Drill': {'hourly_rate': 150, 'daily_rate': 1000}, 'Saw': {'hourly_rate': 90, 'daily_rate': 600}}
+IMAGES = {
+    'Drill': '/static/images/tools/drill.png',
+    'Saw': {'src': '/img/saw-320w.jpg', 'srcset': '/img/saw-160w.jpg 160w, /img/saw-320w.jpg 320w',
+            'sources': {'image/avif': '/img/saw-160w.avif 160w'}}
+}
+
+
+@pytest.fixture
+def registry():
+    return ToolRegistry(CATALOG, IMAGES)
+
+
+def test_views_carry_catalog_rates_and_images(registry):
+    view = registry.upsert({'toolid': 'T1', 'tool_type': 'Saw', 'latitude': 17.4, 'longitude': 78.4})
+    assert (view['hourly_rate'], view['daily_rate']) == (90, 600)
+    assert view['tool_image'] == '/img/saw-320w.jpg'
+    assert view['tool_image_srcset'].endswith('320w')
+    assert view['tool_image_sources'] == {'image/avif': '/img/saw-160w.avif 160w'}
+    assert registry.info('T1') == {'tool_type': 'Saw', 'tool_name': 'Saw', 'tool_image': '/img/saw-320w.jpg'}
+
+
+def test_unknown_types_fall_back_to_defaults(registry):
+    view = registry.upsert({'toolid': 'T1', 'tool_type': 'Lathe', 'battery': float('nan')})
+    assert (view['hourly_rate'], view['daily_rate']) == (DEFAULT_RATES['hourly_rate'], DEFAULT_RATES['daily_rate'])
+    assert view['tool_image'] == DEFAULT_IMAGE
+    # NaN from pandas would not serialize as JSON
+    assert view['battery'] is None
+    assert registry.upsert({'name': 'no id'}) is None
+
+
+def test_upsert_replaces_and_remove_forgets(registry):
+    registry.upsert({'toolid': 'T1', 'tool_type': 'Drill', 'tool_name': 'Old'})
+    registry.upsert({'toolid': 'T1', 'tool_type': 'Drill', 'tool_name': 'New'})
+    assert len(registry) == 1
+    assert registry.info('T1')['tool_name'] == 'New'
+    registry.remove('T1')
+    assert 'T1' not in registry and registry.listing() == []
+
+
+def test_nearby_filters_by_type_and_reports_distance(registry):
+    registry.upsert_many([
+        {'toolid': 'T1', 'tool_type': 'Drill', 'latitude': 17.40, 'longitude': 78.40},
+        {'toolid': 'T2', 'tool_type': 'Saw', 'latitude': 17.41, 'longitude': 78.40},
+        {'toolid': 'T3', 'tool_type': 'Drill', 'latitude': 17.45, 'longitude': 78.40},
+        {'toolid': 'T4', 'tool_type': 'Drill'}
+    ])
+    nearby = registry.nearby(17.40, 78.40, 10)
+    assert [t['toolid'] for t in nearby] == ['T1', 'T2', 'T3']
+    assert nearby[1]['distance_km_from_user'] == pytest.approx(1.11, abs=0.01)
+    assert [t['toolid'] for t in registry.nearby(17.40, 78.40, 10, tool_type='Drill', limit=1)] == ['T1']
+
+
+def test_changes_follow_upserts_and_removals(registry):
+    cursor = registry.changes.version
+    registry.upsert({'toolid': 'T1', 'tool_type': 'Drill'})
+    registry.upsert({'toolid': 'T2', 'tool_type': 'Saw'})
+    registry.remove('T1')
+    assert [(key, deleted) for key, _, deleted in registry.changes.since(cursor)] == [('T2', False), ('T1', True)]
@@ -0,0 +1,45 @@
+import pytest
+
+from transport import LocalBroker, LocalTransport, create_transport, topic_matches
+
+
+@pytest.mark.parametrize('topic_filter, topic, expected', [
+    ('toolease/renter/bookings', 'toolease/renter/bookings', True),
+    ('toolease/+/bookings', 'toolease/renter/bookings', True),
+    ('toolease/#', 'toolease/tools/telemetry', True),
+    ('toolease/+', 'toolease/tools/telemetry', False),
+    ('toolease/renter/bookings', 'toolease/renter', False),
+    ('toolease/renter', 'toolease/renter/bookings', False)
+])
+def test_topic_filters(topic_filter, topic, expected):
+    assert topic_matches(topic_filter, topic) is expected
+
+
+def test_local_publish_reaches_matching_subscribers_with_acks():
+    broker = LocalBroker()
+    subscriber, publisher = LocalTransport('sub', broker), LocalTransport('pub', broker)
+    received, acks = [], []
+    subscriber.subscribe('toolease/+/bookings', lambda client, userdata, message: received.append(message))
+    publisher.publish('toolease/renter/bookings', '{"a":1}', on_ack=acks.append)
+    publisher.publish('toolease/tools/telemetry', b'{}', on_ack=acks.append)
+
+    assert [(m.topic, m.payload) for m in received] == [('toolease/renter/bookings', b'{"a":1}')]
+    assert acks == [1, 2]
+    assert broker.stats() == {'subscriptions': 1, 'published': 2, 'delivered': 1, 'bytes': 9}
+
+
+def test_disconnect_removes_only_that_clients_subscriptions():
+    broker = LocalBroker()
+    first, second = LocalTransport('a', broker), LocalTransport('b', broker)
+    seen = []
+    first.subscribe('#', lambda *args: seen.append('a'))
+    second.subscribe('#', lambda *args: seen.append('b'))
+    first.disconnect()
+    second.publish('toolease/x', b'1')
+    assert seen == ['b']
+
+
+def test_unknown_transport_kind_is_rejected():
+    assert isinstance(create_transport('local', 'client'), LocalTransport)
+    with pytest.raises(ValueError):
+        create_transport('carrier-pigeon', 'client')
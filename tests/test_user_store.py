@@ -0,0 +1,78 @@
+import json
+import threading
+
+import pytest
+
+from user_store import DuplicateUserError, UserStore
+
+
+def account(n, **fields):
+    return {'id': f'U{n}', 'email': f'user{n}@example.com', 'name': f'User {n}', 'phone': '555',
+            'role': 'renter', 'password_hash': 'x', 'rating': 4.5, 'created_at': '2025-01-01', **fields}
+
+
+@pytest.fixture
+def users(tmp_path):
+    return UserStore(str(tmp_path / 'users.db'))
+
+
+def test_create_and_look_up_with_profile_fields(users):
+    users.create(account(1, company='Acme'))
+    by_email = users.get_by_email('user1@example.com')
+    assert by_email == users.get_by_id('U1')
+    assert by_email['company'] == 'Acme' and by_email['rating'] == 4.5
+    assert 'user1@example.com' in users and len(users) == 1
+    assert users.get_by_email('nobody@example.com') is None
+
+
+@pytest.mark.parametrize('clash, field', [({'id': 'U9'}, 'email'), ({'email': 'other@example.com'}, 'id')])
+def test_duplicates_are_rejected(users, clash, field):
+    users.create(account(1))
+    with pytest.raises(DuplicateUserError) as error:
+        users.create({**account(1), **clash})
+    assert error.value.field == field
+    assert len(users) == 1
+
+
+def test_update_changes_columns_and_profile(users):
+    users.create(account(1))
+    updated = users.update('user1@example.com', {'password_hash': 'y', 'company': 'Acme'})
+    assert updated['password_hash'] == 'y'
+    assert users.get_by_email('user1@example.com')['company'] == 'Acme'
+    assert users.update('nobody@example.com', {'name': 'x'}) is None
+
+
+def test_concurrent_signups_each_land_once(users):
+    errors = []
+
+    def signup(n):
+        try:
+            users.create(account(n % 20))
+        except DuplicateUserError:
+            errors.append(n)
+
+    threads = [threading.Thread(target=signup, args=(n,)) for n in range(60)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(users) == 20 and len(errors) == 40
+
+
+def test_json_migration_runs_once(users, tmp_path):
+    legacy = tmp_path / 'users.json'
+    legacy.write_text(json.dumps({' User1@Example.com ': {**account(1), 'email': ' User1@Example.com '},
+                                  'user2@example.com': account(2)}))
+    assert users.migrate_from_json(str(legacy)) == 2
+    assert users.get_by_email('user1@example.com')['id'] == 'U1'
+    assert users.migrate_from_json(str(legacy)) == 0
+    assert users.migrate_from_json(str(tmp_path / 'missing.json')) == 0
+    assert len(users) == 2
+
+
+def test_json_migration_counts_only_inserted_users(users, tmp_path):
+    users.create(account(1))
+    legacy = tmp_path / 'users.json'
+    legacy.write_text(json.dumps({'USER1@example.com': account(1), 'user2@example.com': account(2)}))
+    assert users.migrate_from_json(str(legacy)) == 1
+    assert len(users) == 2
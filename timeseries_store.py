@@ -0,0 +1,155 @@
+"""
+Columnar ring-buffer time-series store for tool telemetry.
+
+Each tool gets one block: a float64 timestamp column plus a float32
+column per metric. A block starts small and doubles as samples arrive
+until it reaches `capacity`; from then on writes overwrite the oldest
+sample, so memory is bounded by
+
+    tools x capacity x (8 + 4 x len(metrics)) bytes
+
+e.g. 3 days of 1 Hz samples for 3 metrics is ~5.2 MB per tool, while a
+large fleet that reports rarely only pays for the samples it has. Range
+reads slice the ring in time order and downsample server-side into
+min/max/mean buckets with NumPy reductions.
+"""
+
+import threading
+
+import numpy as np
+
+
+INITIAL_SLOTS = 64
+
+
+class _Series:
+    def __init__(self, capacity, metrics):
+        size = min(capacity, INITIAL_SLOTS)
+        self.ts = np.zeros(size, dtype=np.float64)
+        self.values = {m: np.full(size, np.nan, dtype=np.float32) for m in metrics}
+        self.head = 0
+        self.count = 0
+
+    def reserve(self, capacity):
+        """Double the columns (up to `capacity`) when full and not yet wrapping"""
+        size = len(self.ts)
+        if self.count < size or size >= capacity:
+            return
+        grown = min(capacity, size * 2)
+        self.ts = np.concatenate((self.ts, np.zeros(grown - size, dtype=np.float64)))
+        for metric, column in self.values.items():
+            self.values[metric] = np.concatenate((column, np.full(grown - size, np.nan, dtype=np.float32)))
+
+    def ordered(self, column):
+        """Return `column` oldest-first without copying when the ring has not wrapped"""
+        if self.count < len(column):
+            return column[:self.count]
+        return np.concatenate((column[self.head:], column[:self.head]))
+
+
+class TimeSeriesStore:
+    """Per-tool, per-metric telemetry history in fixed-size NumPy rings"""
+
+    def __init__(self, metrics, capacity=3 * 24 * 3600):
+        self.metrics = tuple(metrics)
+        self.capacity = capacity
+        self.out_of_order = 0
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._series)
+
+    def __contains__(self, key):
+        return key in self._series
+
+    def memory_bytes(self):
+        with self._lock:
+            slots = sum(len(series.ts) for series in self._series.values())
+        return slots * (8 + 4 * len(self.metrics))
+
+    def append(self, key, ts, values):
+        """Record one sample; `values` maps metric -> number (missing metrics stay NaN)
+
+        Samples older than the newest one already stored for `key` are counted
+        and dropped so every ring stays sorted by time.
+        """
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.capacity, self.metrics)
+            elif series.count and ts < series.ts[(series.head - 1) % self.capacity]:
+                self.out_of_order += 1
+                return False
+            series.reserve(self.capacity)
+            slot = series.head
+            series.ts[slot] = ts
+            for metric, column in series.values.items():
+                value = values.get(metric)
+                column[slot] = np.nan if value is None else value
+            series.head = (slot + 1) % self.capacity
+            series.count = min(series.count + 1, self.capacity)
+            return True
+
+    def latest(self, key):
+        """Newest sample for `key` as {'ts': ..., metric: value}, or None"""
+        with self._lock:
+            series = self._series.get(key)
+            if series is None or not series.count:
+                return None
+            slot = (series.head - 1) % self.capacity
+            sample = {'ts': float(series.ts[slot])}
+            for metric, column in series.values.items():
+                value = column[slot]
+                sample[metric] = None if np.isnan(value) else round(float(value), 3)
+            return sample
+
+    def query(self, key, metric, start=None, end=None, buckets=None, bucket_seconds=None):
+        """Range read of one metric, optionally downsampled
+
+        Without buckets/bucket_seconds the raw samples in [start, end] are
+        returned. Otherwise samples are grouped into fixed-width time buckets
+        and each non-empty bucket reports its start time, min, max, mean and
+        sample count.
+        """
+        if metric not in self.metrics:
+            raise KeyError(metric)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None or not series.count:
+                return {'ts': [], 'min': [], 'max': [], 'mean': [], 'count': []}
+            ts = series.ordered(series.ts)
+            values = series.ordered(series.values[metric])
+
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side='right'))
+        ts, values = ts[lo:hi], values[lo:hi]
+        keep = ~np.isnan(values)
+        ts, values = ts[keep], values[keep].astype(np.float64)
+
+        if not len(ts) or (buckets is None and bucket_seconds is None):
+            rounded = np.round(values, 3).tolist()
+            return {'ts': ts.tolist(), 'min': rounded, 'max': rounded, 'mean': rounded,
+                    'count': [1] * len(ts)}
+
+        origin = ts[0] if start is None else start
+        if bucket_seconds is None:
+            span = (ts[-1] if end is None else end) - origin
+            bucket_seconds = max(span / max(int(buckets), 1), 1e-9)
+
+        bucket_ids = ((ts - origin) // bucket_seconds).astype(np.int64)
+        if buckets is not None:
+            # A sample exactly at `end` belongs to the last bucket, not a new one
+            np.minimum(bucket_ids, int(buckets) - 1, out=bucket_ids)
+        # ts is sorted, so each bucket is a contiguous run starting where its id changes
+        starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+        counts = np.diff(np.r_[starts, len(ts)])
+        sums = np.add.reduceat(values, starts)
+
+        return {
+            'ts': (origin + bucket_ids[starts] * bucket_seconds).tolist(),
+            'min': np.round(np.minimum.reduceat(values, starts), 3).tolist(),
+            'max': np.round(np.maximum.reduceat(values, starts), 3).tolist(),
+            'mean': np.round(sums / counts, 3).tolist(),
+            'count': counts.tolist()
+        }
@@ -0,0 +1,152 @@
+"""
+Single registry of every known tool, keyed by toolid.
+
+CSV/MQTT nearby_tools records and owner-added tools are merged here. The
+display fields the dashboards need (type, name, rates, image) are computed
+once when a tool is written and served as O(1) lookups afterwards.
+
+Images are given per tool type either as a URL or as an image set from
+image_pipeline ({'src', 'srcset', 'sources'}); views carry them as
+tool_image, tool_image_srcset and tool_image_sources.
+
+Every write builds a new view dict. Listeners registered with
+add_listener() are told when a view is retired, as ('expire', old view)
+when it is replaced and ('delete', view) when the tool is removed, which
+is the same callback shape EventCollection uses, so caches keyed by record
+(json_fragments) can let go of it.
+"""
+
+import math
+import threading
+
+from event_store import ChangeLog
+from spatial_index import GridIndex
+
+
+DEFAULT_RATES = {"hourly_rate": 150, "daily_rate": 1000}
+DEFAULT_IMAGE = "/static/images/tools/drill.png"
+
+
+def _image_fields(image):
+    if isinstance(image, str):
+        return {'tool_image': image}
+    fields = {'tool_image': image['src']}
+    if image.get('srcset'):
+        fields['tool_image_srcset'] = image['srcset']
+    if image.get('sources'):
+        fields['tool_image_sources'] = image['sources']
+    return fields
+
+
+def _clean(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class ToolRegistry:
+    """Latest state per toolid plus precomputed enrichment"""
+
+    def __init__(self, catalog, images, default_image=DEFAULT_IMAGE):
+        self.catalog = catalog
+        self.images = {tool_type: _image_fields(image) for tool_type, image in images.items()}
+        self.default_image = _image_fields(default_image)
+        self._tools = {}
+        self._info = {}
+        self._views = {}
+        self._lock = threading.RLock()
+        self.changes = ChangeLog('toolid')
+        self.spatial = GridIndex()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Call `callback(action, view)` whenever a view is replaced ('expire') or removed ('delete')"""
+        self._listeners.append(callback)
+
+    def _emit(self, action, view):
+        for callback in self._listeners:
+            callback(action, view)
+
+    def __len__(self):
+        return len(self._tools)
+
+    def __contains__(self, tool_id):
+        return tool_id in self._tools
+
+    def get(self, tool_id):
+        return self._tools.get(tool_id)
+
+    def info(self, tool_id):
+        """Return {'tool_type', 'tool_name', 'tool_image'} for a tool, or None if unknown"""
+        return self._info.get(tool_id)
+
+    def image_for(self, tool_type):
+        return self.image_fields(tool_type)['tool_image']
+
+    def image_fields(self, tool_type):
+        """{'tool_image', 'tool_image_srcset', 'tool_image_sources'} (as available) for a tool type"""
+        return self.images.get(tool_type, self.default_image)
+
+    def listing(self):
+        """Enriched tool dicts for the renter grid, one per toolid"""
+        with self._lock:
+            return list(self._views.values())
+
+    def nearby(self, lat, lng, radius_km, tool_type=None, limit=None):
+        """Enriched views within `radius_km` of (lat, lng), nearest first, with true distance"""
+        predicate = None
+        if tool_type:
+            predicate = lambda tool_id: self._info[tool_id]['tool_type'] == tool_type
+        with self._lock:
+            matches = self.spatial.query(lat, lng, radius_km, limit=limit, predicate=predicate)
+            return [
+                {**self._views[tool_id], 'distance_km_from_user': round(distance, 2)}
+                for distance, tool_id in matches
+            ]
+
+    def upsert(self, tool):
+        """Register or refresh a tool; call again whenever the tool dict changes"""
+        tool_id = tool.get('toolid')
+        if tool_id is None:
+            return None
+        with self._lock:
+            previous = self._views.get(tool_id)
+            self._tools[tool_id] = tool
+            self._refresh(tool_id, tool)
+            view = self._views[tool_id]
+            self.spatial.update(tool_id, view.get('latitude'), view.get('longitude'))
+            self.changes.touch(view, ref=tool_id)
+            if previous is not None:
+                self._emit('expire', previous)
+            return view
+
+    def upsert_many(self, tools):
+        with self._lock:
+            for tool in tools:
+                self.upsert(tool)
+
+    def remove(self, tool_id):
+        with self._lock:
+            self._tools.pop(tool_id, None)
+            self._info.pop(tool_id, None)
+            view = self._views.pop(tool_id, None)
+            self.spatial.remove(tool_id)
+            if view is not None:
+                self.changes.delete(view, ref=tool_id)
+                self._emit('delete', view)
+
+    def _refresh(self, tool_id, tool):
+        tool_type = tool.get('tool_type') or 'Tool'
+        self._info[tool_id] = {
+            'tool_type': tool_type,
+            'tool_name': tool.get('tool_name') or tool_type,
+            'tool_image': self.image_for(tool_type)
+        }
+
+        view = {key: _clean(value) for key, value in tool.items()}
+        listed_type = view.get('tool_type', 'Drill')
+        rates = self.catalog.get(listed_type, DEFAULT_RATES)
+        view['hourly_rate'] = rates['hourly_rate']
+        view['daily_rate'] = rates['daily_rate']
+        view.update(self.image_fields(listed_type))
+        self._views[tool_id] = view
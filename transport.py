@@ -0,0 +1,150 @@
+"""
+MQTT transports for the server and the CSV publishers.
+
+Both sides talk to one small interface instead of AWSIoTMQTTClient
+directly:
+
+    connect()                                   open the connection
+    subscribe(topic, callback, qos=1)           callback(client, userdata, message), as the SDK calls it
+    publish(topic, payload, qos=1, on_ack=None) on_ack(mid) once the broker has it
+    disconnect()
+
+AWSIoTTransport is the production path through AWS IoT Core. LocalTransport
+connects to a LocalBroker in the same process: topic filters with + and #
+wildcards, synchronous delivery on the publishing thread, no network and no
+certificates, so the whole publish -> ingest -> SSE path can run offline
+(benchmarks/e2e_latency.py, `main.py --sink local`).
+
+create_transport(kind, ...) picks one by name ('aws' or 'local').
+"""
+
+import itertools
+import threading
+from collections import namedtuple
+
+
+LocalMessage = namedtuple('LocalMessage', 'topic payload qos mid')
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT topic filter match with + and # wildcards"""
+    filter_levels, levels = topic_filter.split('/'), topic.split('/')
+    for n, level in enumerate(filter_levels):
+        if level == '#':
+            return True
+        if n >= len(levels) or (level != '+' and level != levels[n]):
+            return False
+    return len(filter_levels) == len(levels)
+
+
+class AWSIoTTransport:
+    """AWS IoT Core over mutual TLS through the AWSIoTPythonSDK client"""
+
+    def __init__(self, client_id, endpoint, ca_path, key_path, cert_path, port=8883):
+        # Imported here so the local transport (and offline CI) does not need the SDK
+        from AWSIoTPythonSDK.MQTTLib import AWSIoTMQTTClient
+        self.client_id = client_id
+        self.endpoint = endpoint
+        self.client = AWSIoTMQTTClient(client_id)
+        self.client.configureEndpoint(endpoint, port)
+        self.client.configureCredentials(ca_path, key_path, cert_path)
+        self.client.configureAutoReconnectBackoffTime(1, 32, 20)
+        self.client.configureOfflinePublishQueueing(-1)
+        self.client.configureDrainingFrequency(2)
+        self.client.configureConnectDisconnectTimeout(10)
+        self.client.configureMQTTOperationTimeout(5)
+
+    def connect(self):
+        self.client.connect()
+
+    def subscribe(self, topic, callback, qos=1):
+        self.client.subscribe(topic, qos, callback)
+
+    def publish(self, topic, payload, qos=1, on_ack=None):
+        if on_ack is None:
+            self.client.publish(topic, payload, qos)
+        else:
+            self.client.publishAsync(topic, payload, qos, ackCallback=on_ack)
+
+    def disconnect(self):
+        self.client.disconnect()
+
+
+class LocalBroker:
+    """In-process stand-in for IoT Core shared by every LocalTransport that connects to it"""
+
+    def __init__(self):
+        self._subscriptions = []
+        self._lock = threading.Lock()
+        self._mids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        self.bytes = 0
+
+    def subscribe(self, owner, topic_filter, callback):
+        with self._lock:
+            # Copy-on-write so publish() can iterate without holding the lock
+            self._subscriptions = self._subscriptions + [(owner, topic_filter, callback)]
+
+    def unsubscribe_all(self, owner):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s[0] is not owner]
+
+    def publish(self, topic, payload, qos=1):
+        data = payload.encode('utf-8') if isinstance(payload, str) else payload
+        message = LocalMessage(topic, data, qos, next(self._mids))
+        for owner, topic_filter, callback in self._subscriptions:
+            if topic_matches(topic_filter, topic):
+                callback(owner, None, message)
+                self.delivered += 1
+        self.published += 1
+        self.bytes += len(data)
+        return message.mid
+
+    def stats(self):
+        return {
+            'subscriptions': len(self._subscriptions),
+            'published': self.published,
+            'delivered': self.delivered,
+            'bytes': self.bytes
+        }
+
+
+_default_broker = LocalBroker()
+
+
+def local_broker():
+    """The process-wide broker LocalTransports use unless given another"""
+    return _default_broker
+
+
+class LocalTransport:
+    """A client connection to a LocalBroker"""
+
+    def __init__(self, client_id, broker=None):
+        self.client_id = client_id
+        self.broker = broker or local_broker()
+        self.endpoint = 'local'
+
+    def connect(self):
+        pass
+
+    def subscribe(self, topic, callback, qos=1):
+        self.broker.subscribe(self, topic, callback)
+
+    def publish(self, topic, payload, qos=1, on_ack=None):
+        mid = self.broker.publish(topic, payload, qos)
+        if on_ack is not None:
+            on_ack(mid)
+
+    def disconnect(self):
+        self.broker.unsubscribe_all(self)
+
+
+def create_transport(kind, client_id, endpoint=None, ca_path=None, key_path=None, cert_path=None):
+    """'aws' -> AWSIoTTransport, 'local' -> LocalTransport on the process-wide broker"""
+    if kind == 'local':
+        return LocalTransport(client_id)
+    if kind == 'aws':
+        return AWSIoTTransport(client_id, endpoint, ca_path, key_path, cert_path)
+    raise ValueError(f"Unknown MQTT transport {kind!r} (expected 'aws' or 'local')")
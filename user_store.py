@@ -0,0 +1,185 @@
+"""
+Embedded SQLite store for user accounts.
+
+Accounts live in one table with unique indexes on email and user id, so
+signup is a single transactional INSERT and login a single indexed
+lookup, both O(log users) instead of rewriting or parsing a JSON file.
+
+The database runs in WAL mode: readers never block the writer and vice
+versa, and concurrent Flask threads serialize only on the short write
+transaction itself (busy_timeout makes a second writer wait rather than
+fail). synchronous=NORMAL means a committed signup survives a process
+crash; on power loss the last few commits may be rolled back, which
+never corrupts the file.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+COLUMNS = ('id', 'email', 'name', 'phone', 'role', 'password_hash', 'rating', 'created_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    name TEXT NOT NULL,
+    phone TEXT,
+    role TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    rating REAL,
+    created_at TEXT,
+    profile TEXT NOT NULL DEFAULT '{}'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users(email);
+CREATE UNIQUE INDEX IF NOT EXISTS users_id ON users(id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class DuplicateUserError(ValueError):
+    """Raised by create() when the email or user id is already taken"""
+
+    def __init__(self, field):
+        super().__init__(f"{field} already exists")
+        self.field = field
+
+
+class UserStore:
+    """Account lookups by email/id and transactional signups over a small connection pool"""
+
+    def __init__(self, path, pool_size=8, busy_timeout_ms=5000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._pool = queue.LifoQueue()
+        self._pool_size = pool_size
+        self._opened = 0
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                spare = self._opened < self._pool_size
+                if spare:
+                    self._opened += 1
+            conn = self._connect() if spare else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @staticmethod
+    def _to_user(row):
+        if row is None:
+            return None
+        user = json.loads(row['profile'])
+        user.update({column: row[column] for column in COLUMNS})
+        return user
+
+    @staticmethod
+    def _to_row(user):
+        profile = {key: value for key, value in user.items() if key not in COLUMNS}
+        return [user.get(column) for column in COLUMNS] + [json.dumps(profile)]
+
+    # ---------- reads ----------
+
+    def get_by_email(self, email):
+        with self._connection() as conn:
+            row = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        return self._to_user(row)
+
+    def get_by_id(self, user_id):
+        with self._connection() as conn:
+            row = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+        return self._to_user(row)
+
+    def __len__(self):
+        with self._connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def __contains__(self, email):
+        with self._connection() as conn:
+            return conn.execute('SELECT 1 FROM users WHERE email = ?', (email,)).fetchone() is not None
+
+    # ---------- writes ----------
+
+    def create(self, user):
+        """Insert one account atomically; raises DuplicateUserError on a taken email or id"""
+        placeholders = ', '.join('?' * (len(COLUMNS) + 1))
+        with self._connection() as conn:
+            try:
+                with conn:
+                    conn.execute('BEGIN IMMEDIATE')
+                    conn.execute(f"INSERT INTO users ({', '.join(COLUMNS)}, profile) VALUES ({placeholders})",
+                                 self._to_row(user))
+            except sqlite3.IntegrityError as e:
+                raise DuplicateUserError('email' if 'email' in str(e) else 'id') from e
+        return user
+
+    def update(self, email, changes):
+        """Overwrite fields of an existing account; returns the updated user or None"""
+        with self._connection() as conn:
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+                if row is None:
+                    return None
+                user = {**self._to_user(row), **changes}
+                values = self._to_row(user)
+                conn.execute(f"UPDATE users SET {', '.join(c + ' = ?' for c in COLUMNS)}, profile = ? WHERE email = ?",
+                             values + [email])
+        return user
+
+    # ---------- migration ----------
+
+    def migrate_from_json(self, json_path):
+        """One-time import of a legacy users.json ({email: user}); returns the number of users inserted
+
+        Runs in a single transaction and records itself in the meta table, so
+        a crash mid-import leaves nothing behind and a finished import never
+        runs twice.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with self._connection() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_users_json'").fetchone()
+            if done:
+                return 0
+            with open(json_path, 'r') as f:
+                legacy = json.load(f)
+            placeholders = ', '.join('?' * (len(COLUMNS) + 1))
+            imported = 0
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                for email, user in legacy.items():
+                    # rowcount is 0 when INSERT OR IGNORE skips an email that is already taken
+                    imported += conn.execute(
+                        f"INSERT OR IGNORE INTO users ({', '.join(COLUMNS)}, profile) VALUES ({placeholders})",
+                        self._to_row({**user, 'email': user.get('email', email).strip().lower()})).rowcount
+                conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_users_json', ?)",
+                             (os.path.abspath(json_path),))
+        return imported